@@ -0,0 +1,70 @@
+import numpy as np
+
+from subtitles import Word
+
+# -------------------------
+# Energy-based word aligner
+# Works on the waveform of a single synthesized segment, so it
+# needs no ASR pass and behaves the same for cached, batched and
+# plain tts.tts() audio. Words share the voiced span in proportion
+# to their letter count, then each boundary snaps to the quietest
+# frame nearby (VITS leaves small energy dips between words).
+# -------------------------
+FRAME_SECONDS = 0.01
+
+# Frames below this fraction of the peak RMS count as silence
+VOICE_THRESHOLD = 0.05
+
+# How far a boundary may move towards an energy dip
+SNAP_SECONDS = 0.08
+
+
+def frame_energy(wav: np.ndarray, sr: int) -> np.ndarray:
+    hop = max(1, int(sr * FRAME_SECONDS))
+    count = len(wav) // hop
+    frames = np.asarray(wav[: count * hop], dtype=np.float32).reshape(count, hop)
+    return np.sqrt(np.mean(frames ** 2, axis=1))
+
+def align_words(
+    words: list[str],
+    wav: np.ndarray,
+    sr: int,
+    offset: float = 0.0,
+) -> list[Word]:
+    if not words:
+        return []
+
+    duration = len(wav) / sr
+    weights = np.array([max(1, sum(c.isalnum() for c in w)) for w in words], dtype=np.float64)
+    shares = np.cumsum(weights)[:-1] / weights.sum()
+
+    energy = frame_energy(wav, sr)
+    voiced = np.flatnonzero(energy > energy.max() * VOICE_THRESHOLD) if energy.size else energy
+
+    if voiced.size == 0:
+        # Nothing to snap to; spread the words over the whole segment
+        edges = [0.0, *(shares * duration), duration]
+    else:
+        first, last = int(voiced[0]), int(voiced[-1]) + 1
+        smoothed = np.convolve(energy, np.ones(3) / 3, mode="same")
+        window = int(SNAP_SECONDS / FRAME_SECONDS)
+
+        boundaries = []
+        previous = first
+        for expected in first + shares * (last - first):
+            lo = max(previous + 1, int(expected) - window)
+            hi = min(last - 1, int(expected) + window)
+            if hi > lo:
+                frame = lo + int(np.argmin(smoothed[lo:hi + 1]))
+            else:
+                frame = min(max(previous + 1, int(round(expected))), last)
+            boundaries.append(frame)
+            previous = frame
+
+        # Leading and trailing silence belong to the first and last word
+        edges = [0.0, *(b * FRAME_SECONDS for b in boundaries), duration]
+
+    return [
+        Word(text, offset + edges[i], offset + edges[i + 1])
+        for i, text in enumerate(words)
+    ]
@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# -------------------------
+# Config
+# -------------------------
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR") or os.path.join("cache", "artifacts")
+ARTIFACT_MAX_MB = int(os.getenv("ARTIFACT_MAX_MB", "20480"))
+# Artifacts untouched for longer than this are dropped (0 = keep forever)
+ARTIFACT_MAX_AGE_DAYS = float(os.getenv("ARTIFACT_MAX_AGE_DAYS", "30"))
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def file_identity(path: str) -> str:
+    # Cheap stand-in for a digest on large, rarely changing assets
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+# -------------------------
+# Artifact store
+# Stage outputs live under <key>.<suffix>, where key hashes the
+# stage name and everything that went into it. A <key>.json
+# manifest is written last, so an entry without one is incomplete.
+# -------------------------
+class ArtifactStore:
+    def __init__(
+        self,
+        directory: str = ARTIFACT_DIR,
+        max_bytes: int = ARTIFACT_MAX_MB * 1024 * 1024,
+        max_age_days: float = ARTIFACT_MAX_AGE_DAYS,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(stage: str, **params) -> str:
+        raw = json.dumps({"stage": stage, **params}, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}{suffix}")
+
+    def _manifest(self, key: str) -> dict | None:
+        try:
+            with open(self._path(key, ".json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def has(self, key: str) -> bool:
+        manifest = self._manifest(key)
+        if manifest is None:
+            return False
+
+        for suffix, size in manifest["files"].items():
+            path = self._path(key, suffix)
+            if not os.path.exists(path) or os.path.getsize(path) != size:
+                return False
+        return True
+
+    def save(self, key: str, files: dict[str, str | None]):
+        files = {suffix: path for suffix, path in files.items() if path}
+        os.makedirs(os.path.dirname(self._path(key, "")), exist_ok=True)
+
+        sizes = {}
+        for suffix, path in files.items():
+            target = self._path(key, suffix)
+            tmp_target = f"{target}.{os.getpid()}.tmp"
+            shutil.copyfile(path, tmp_target)
+            os.replace(tmp_target, target)
+            sizes[suffix] = os.path.getsize(target)
+
+        with open(self._path(key, ".json"), "w", encoding="utf-8") as f:
+            json.dump({"files": sizes, "created_at": time.time()}, f)
+
+        self.evict()
+
+    def restore(self, key: str, files: dict[str, str | None]) -> bool:
+        if not self.has(key):
+            return False
+
+        manifest = self._manifest(key)
+        for suffix, dest in files.items():
+            if not dest:
+                continue
+            if suffix not in manifest["files"]:
+                return False
+
+            os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+            shutil.copyfile(self._path(key, suffix), dest)
+
+        # Bump the LRU clock
+        os.utime(self._path(key, ".json"))
+        return True
+
+    def _entries(self):
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".json"):
+                    continue
+                key = name[:-len(".json")]
+                manifest = self._manifest(key) or {"files": {}}
+                try:
+                    last_used = os.path.getmtime(os.path.join(root, name))
+                except FileNotFoundError:
+                    continue
+                yield key, last_used, sum(manifest["files"].values()), manifest
+
+    def _remove(self, key: str, manifest: dict):
+        for suffix in [*manifest["files"], ".json"]:
+            try:
+                os.remove(self._path(key, suffix))
+            except FileNotFoundError:
+                pass
+
+    def evict(self):
+        with self._lock:
+            now = time.time()
+            entries = sorted(self._entries(), key=lambda entry: entry[1])
+            total = sum(size for _, _, size, _ in entries)
+            removed = 0
+
+            for key, last_used, size, manifest in entries:
+                expired = self.max_age > 0 and now - last_used > self.max_age
+                if not expired and total <= self.max_bytes:
+                    continue
+                self._remove(key, manifest)
+                total -= size
+                removed += 1
+
+            if removed:
+                logger.info("Artifact store evicted %d entries", removed)
+
+
+_default_store = None
+
+def get_default_store() -> ArtifactStore | None:
+    global _default_store
+    if ARTIFACT_MAX_MB <= 0:
+        return None
+    if _default_store is None:
+        _default_store = ArtifactStore()
+    return _default_store
@@ -0,0 +1,250 @@
+import os
+import glob
+import json
+import random
+import logging
+import subprocess
+import threading
+from dataclasses import asdict, dataclass
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# -------------------------
+# Config
+# -------------------------
+MUSIC_DIR = "music"
+CLIPS_DIR = "clips"
+FONTS_DIR = "fonts"
+FONT_FILE = os.path.join(FONTS_DIR, "PressStart2P-Regular.ttf")
+
+ASSET_CACHE_FILE = os.getenv("ASSET_CACHE_FILE") or os.path.join("cache", "assets.json")
+
+# -------------------------
+# Subtitle colors per clip (ASS: &HBBGGRR&)
+# A clips/<name>.json sidecar with {"color": ...} overrides these.
+# -------------------------
+SUBTITLE_COLOR_MAP = {
+    1: "&HFF83D1&",  # neon pink
+    2: "&H4ADFFF&",  # cyan blue
+    3: "&HE042E5&",  # purple-magenta
+    4: "&H7CFF4A&",  # acid green
+    5: "&HFFD84A&",  # warm amber
+}
+DEFAULT_SUBTITLE_COLOR = "&HFFFFFF&"
+
+
+class AssetError(Exception):
+    pass
+
+
+@dataclass
+class Asset:
+    path: str
+    duration: float
+    width: int | None = None
+    height: int | None = None
+    fps: float | None = None
+    sample_rate: int | None = None
+    subtitle_color: str | None = None
+
+
+@dataclass
+class AssetSelection:
+    music: Asset
+    clip: Asset
+
+    @property
+    def subtitle_color(self) -> str:
+        return self.clip.subtitle_color or DEFAULT_SUBTITLE_COLOR
+
+
+# -------------------------
+# Probe
+# -------------------------
+def _identity(path: str) -> str:
+    stat = os.stat(path)
+    return f"{stat.st_size}|{stat.st_mtime_ns}"
+
+def _parse_rate(rate: str | None) -> float | None:
+    if not rate or rate == "0/0":
+        return None
+    num, _, den = rate.partition("/")
+    return float(num) / float(den or 1)
+
+def probe_media(path: str) -> dict:
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe",
+                "-v", "error",
+                "-show_entries",
+                "format=duration:stream=codec_type,width,height,avg_frame_rate,sample_rate",
+                "-of", "json",
+                path,
+            ],
+            check=True,
+            text=True,
+            stdout=subprocess.PIPE,
+        )
+    except FileNotFoundError as e:
+        raise AssetError("ffprobe not found; install ffmpeg") from e
+
+    info = json.loads(result.stdout)
+    meta = {"duration": float(info.get("format", {}).get("duration") or 0)}
+
+    for stream in info.get("streams", []):
+        if stream.get("codec_type") == "video" and "width" not in meta:
+            meta["width"] = stream.get("width")
+            meta["height"] = stream.get("height")
+            meta["fps"] = _parse_rate(stream.get("avg_frame_rate"))
+        elif stream.get("codec_type") == "audio" and "sample_rate" not in meta:
+            meta["sample_rate"] = int(stream.get("sample_rate") or 0) or None
+
+    return meta
+
+def clip_subtitle_color(path: str) -> str | None:
+    sidecar = os.path.splitext(path)[0] + ".json"
+    if os.path.exists(sidecar):
+        with open(sidecar, "r", encoding="utf-8") as f:
+            color = json.load(f).get("color")
+        if color:
+            return color
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return SUBTITLE_COLOR_MAP.get(int(stem)) if stem.isdigit() else None
+
+
+# -------------------------
+# Registry
+# Scans the asset folders once, probes anything new or changed
+# (results cached in ASSET_CACHE_FILE by size + mtime) and only
+# ever hands out files that exist and decoded cleanly.
+# -------------------------
+class AssetRegistry:
+    def __init__(
+        self,
+        music_dir: str = MUSIC_DIR,
+        clips_dir: str = CLIPS_DIR,
+        font_file: str = FONT_FILE,
+        cache_file: str = ASSET_CACHE_FILE,
+    ):
+        self.music_dir = music_dir
+        self.clips_dir = clips_dir
+        self.font_file = font_file
+        self.cache_file = cache_file
+        self.music: list[Asset] = []
+        self.clips: list[Asset] = []
+        self._lock = threading.Lock()
+        self._scanned = False
+
+    def _load_cache(self) -> dict:
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_cache(self, cache: dict):
+        os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+        tmp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_file, self.cache_file)
+
+    def _scan_dir(self, pattern: str, cache: dict, fresh: dict) -> list[Asset]:
+        assets = []
+        for path in sorted(glob.glob(pattern)):
+            identity = _identity(path)
+            entry = cache.get(path)
+
+            if entry is None or entry.get("identity") != identity:
+                try:
+                    entry = {"identity": identity, **probe_media(path)}
+                except subprocess.CalledProcessError:
+                    logger.warning("Skipping unreadable asset: %s", path)
+                    continue
+
+            fresh[path] = entry
+            if entry["duration"] <= 0:
+                logger.warning("Skipping empty asset: %s", path)
+                continue
+
+            assets.append(Asset(
+                path=path,
+                duration=entry["duration"],
+                width=entry.get("width"),
+                height=entry.get("height"),
+                fps=entry.get("fps"),
+                sample_rate=entry.get("sample_rate"),
+            ))
+        return assets
+
+    def scan(self):
+        with self._lock:
+            cache = self._load_cache()
+            fresh = {}
+
+            self.music = self._scan_dir(os.path.join(self.music_dir, "*.mp3"), cache, fresh)
+            self.clips = self._scan_dir(os.path.join(self.clips_dir, "*.mp4"), cache, fresh)
+            for clip in self.clips:
+                clip.subtitle_color = clip_subtitle_color(clip.path)
+
+            if fresh != cache:
+                self._save_cache(fresh)
+            self._scanned = True
+
+        logger.info(
+            "Asset registry: %d music tracks, %d clips",
+            len(self.music),
+            len(self.clips),
+        )
+
+    def validate(self):
+        # Cheap checks first, so a broken checkout fails before any probing
+        if not os.path.exists(self.font_file):
+            raise AssetError(f"Subtitle font missing: {self.font_file}")
+        if not glob.glob(os.path.join(self.music_dir, "*.mp3")):
+            raise AssetError(f"No music found in {self.music_dir}/")
+        if not glob.glob(os.path.join(self.clips_dir, "*.mp4")):
+            raise AssetError(f"No background clips found in {self.clips_dir}/")
+
+        if not self._scanned:
+            self.scan()
+
+        if not self.music:
+            raise AssetError(f"No usable music in {self.music_dir}/")
+        if not self.clips:
+            raise AssetError(f"No usable background clips in {self.clips_dir}/")
+
+    def choose(self, rng: random.Random | None = None) -> AssetSelection:
+        self.validate()
+        rng = rng or random
+        return AssetSelection(music=rng.choice(self.music), clip=rng.choice(self.clips))
+
+    def describe(self) -> dict:
+        return {
+            "music": [asdict(asset) for asset in self.music],
+            "clips": [asdict(asset) for asset in self.clips],
+        }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry() -> AssetRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = AssetRegistry()
+        return _registry
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    registry = get_registry()
+    registry.validate()
+    print(json.dumps(registry.describe(), indent=2))
@@ -1,18 +1,27 @@
 import os
-import requests
 from dotenv import load_dotenv
-from TTS.api import TTS
-import soundfile as sf
-import numpy as np
-import re
 import logging
-import string
 import sys
 from urllib.parse import unquote
-from collections import Counter
 
 from google import genai
 
+from narration import (
+    Narration,
+    NarrationScript,
+    TTSLoader,
+    narrate_script,
+    narrate_stream,
+    normalize_text,
+    sanitize_filename,
+)
+from artifacts import get_default_store
+import gemini_cleanup
+from lysergic_api import get_fetcher
+from segmenter import SEGMENT_MAX_CHARS, segment_text
+from substances import detect_primary_substance_by_frequency, first_substance
+from tts_cache import get_default_cache
+
 # -------------------------
 # Logging setup
 # -------------------------
@@ -27,180 +36,62 @@ logger = logging.getLogger(__name__)
 # -------------------------
 load_dotenv()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-if not GOOGLE_API_KEY:
-    raise RuntimeError("GOOGLE_API_KEY environment variable not set")
 
-# -------------------------
-# Create Gemini client
-# -------------------------
-client = genai.Client(api_key=GOOGLE_API_KEY)
+# Feed cleaned chunks to TTS as they arrive instead of after the
+# whole report is cleaned
+GEMINI_STREAM = os.getenv("GEMINI_STREAM", "1") == "1"
 
-# -------------------------
-# Helpers
-# -------------------------
-def normalize_text(text: str) -> str:
-    return re.sub(r"\s+", " ", text).strip()
-
-def silence(seconds: float, sr: int):
-    return np.zeros(int(seconds * sr), dtype=np.float32)
-
-def sanitize_filename(name: str) -> str:
-    valid_chars = "-_.() %s%s" % (string.ascii_letters, string.digits)
-    return "".join(c for c in name if c in valid_chars).replace(" ", "_")
-
-def split_with_punctuation(text: str):
-    parts = re.findall(r'[^.!?]+[.!?]?', text)
-    result = []
-    for part in parts:
-        part = part.strip()
-        if not part:
-            continue
-        last_char = part[-1]
-        pause = 1.0 if last_char in ".!?" else 0.3
-        result.append((part, pause))
-    return result
+# Slower pacing than audio.py
+SENTENCE_PAUSE = 1.0
+CLAUSE_PAUSE = 0.3
 
 # -------------------------
-# Substance frequency detection
+# Gemini client (created on first use)
 # -------------------------
-SUBSTANCES = [
-    "LSD",
-    "DMT",
-    "Salvia",
-    "MDMA",
-    "Cannabis",
-    "Heroin",
-    "Cocaine",
-    "Ketamine",
-]
-
-def detect_primary_substance_by_frequency(text: str) -> str | None:
-    text_lower = text.lower()
-    counts = Counter()
-
-    for substance in SUBSTANCES:
-        pattern = rf"\b{substance.lower()}\b"
-        matches = re.findall(pattern, text_lower)
-        if matches:
-            counts[substance] += len(matches)
-
-    if not counts:
-        return None
-
-    logger.info("Substance frequency counts: %s", dict(counts))
-    return counts.most_common(1)[0][0]
+_client = None
+
+def get_client():
+    global _client
+    if _client is None:
+        if not GOOGLE_API_KEY:
+            raise RuntimeError("GOOGLE_API_KEY environment variable not set")
+        _client = genai.Client(api_key=GOOGLE_API_KEY)
+    return _client
 
 # -------------------------
 # Gemini cleanup + extract
+# Long reports are cleaned in paragraph-aligned chunks, in parallel,
+# through the on-disk response cache (see gemini_cleanup).
 # -------------------------
 def clean_and_extract(content: str):
-    prompt = (
-        "Clean up the following experience content by fixing punctuation "
-        "and removing repeated sentences. Then return a JSON object with:\n"
-        "{ \"cleaned_content\": string, \"primary_substance\": string }\n"
-        "Do not add extra keys.\n\n"
-        f"Content:\n{content}"
+    return gemini_cleanup.clean_content(
+        content,
+        get_client(),
+        cache=gemini_cleanup.get_default_cache(),
     )
 
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt
-    )
-
-    text_out = response.text.strip()
-
-    import json
-    try:
-        parsed = json.loads(text_out)
-        return (
-            parsed.get("cleaned_content", content),
-            parsed.get("primary_substance", "Unknown"),
-        )
-    except json.JSONDecodeError:
-        logger.warning("Gemini output not JSON; using fallback")
-        match = re.search(
-            r'\b(LSD|DMT|Salvia|MDMA|Cannabis|Heroin)\b',
-            content,
-            re.IGNORECASE
-        )
-        fallback_primary = match.group(0) if match else "Unknown"
-        return content, fallback_primary
-
-# -------------------------
-# Parse experience URL
-# -------------------------
-experience_url = None
-if len(sys.argv) > 1:
-    experience_url = unquote(sys.argv[1])
-    logger.info("Using provided experience URL: %s", experience_url)
-
-# -------------------------
-# Fetch random if none
-# -------------------------
-if not experience_url:
-    logger.info("Fetching random Erowid experience")
-    url = "https://lysergic.kaizenklass.xyz/api/v1/erowid/random/experience?size_per_substance=1"
-    substances = {
-        "urls": [
-            "https://www.erowid.org/chemicals/dmt/dmt.shtml",
-            "https://www.erowid.org/chemicals/lsd/lsd.shtml",
-            "https://www.erowid.org/plants/salvia/salvia.shtml",
-            "https://www.erowid.org/plants/cannabis/cannabis.shtml",
-            "https://www.erowid.org/chemicals/mdma/mdma.shtml",
-            "https://www.erowid.org/chemicals/heroin/heroin.shtml",
-            "https://www.erowid.org/chemicals/cocaine/cocaine.shtml",
-            "https://www.erowid.org/chemicals/ketamine/ketamine.shtml",
-        ]
-    }
-    experience = requests.post(url, json=substances).json()
-    experience_url = experience["experience"]["url"]
-
-# -------------------------
-# Fetch experience details
-# -------------------------
-logger.info("Fetching full experience details")
-resp = requests.post(
-    "https://lysergic.kaizenklass.xyz/api/v1/erowid/experience",
-    json={"url": experience_url},
-)
-data = resp.json().get("data", {})
-
-raw_content = data.get("content", "")
-
-# -------------------------
-# Clean + extract primary substance
-# -------------------------
-cleaned_content, gemini_primary = clean_and_extract(raw_content)
-
 # -------------------------
 # Determine final primary substance
 # -------------------------
-primary_substance = detect_primary_substance_by_frequency(cleaned_content)
+def resolve_primary_substance(cleaned_content: str, gemini_primary: str) -> str:
+    primary_substance = detect_primary_substance_by_frequency(cleaned_content)
 
-if not primary_substance:
-    primary_substance = gemini_primary
+    if not primary_substance:
+        primary_substance = gemini_primary
 
-if not primary_substance or primary_substance == "Unknown":
-    match = re.search(
-        r'\b(LSD|DMT|Salvia|MDMA|Cannabis|Heroin)\b',
-        cleaned_content,
-        re.IGNORECASE
-    )
-    primary_substance = match.group(0) if match else "Unknown"
+    if not primary_substance or primary_substance == "Unknown":
+        primary_substance = first_substance(cleaned_content) or "Unknown"
 
-logger.info("Final primary substance: %s", primary_substance)
+    logger.info("Final primary substance: %s", primary_substance)
+    return primary_substance
 
 # -------------------------
 # Build TTS text
 # -------------------------
-clean_experience = {
-    "title": data.get("title", "Unknown Title"),
-    "username": data.get("author", "Unknown"),
-    "gender": data.get("metadata", {}).get("gender", "Unknown"),
-    "age": data.get("metadata", {}).get("age", "Unknown"),
-}
-
-tts_script = f"""
+OUTRO = "Thank you for listening."
+
+def build_intro(clean_experience: dict, primary_substance: str) -> str:
+    return f"""
 Welcome.
 
 This is a narrated experience report from Erowid.org.
@@ -212,43 +103,173 @@ This is a narrated experience report from Erowid.org.
 Submitted by {clean_experience['username']}.
 Age: {clean_experience['age']}.
 Gender: {clean_experience['gender']}.
+"""
 
+def build_tts_script(
+    clean_experience: dict,
+    primary_substance: str,
+    cleaned_content: str,
+) -> str:
+    return f"""{build_intro(clean_experience, primary_substance)}
 {cleaned_content}
 
-Thank you for listening.
+{OUTRO}
 """
 
+def text_segments(text: str) -> list[tuple[str, float]]:
+    return segment_text(
+        normalize_text(text),
+        sentence_pause=SENTENCE_PAUSE,
+        clause_pause=CLAUSE_PAUSE,
+    )
+
 # -------------------------
-# Generate audio
+# Narration stage
 # -------------------------
-logger.info("Loading TTS model")
-tts = TTS(
-    model_name="tts_models/en/vctk/vits",
-    progress_bar=False,
-    gpu=False
-)
-sr = tts.synthesizer.output_sample_rate
+def fetch_experience(experience_url: str | None = None) -> tuple[str, dict]:
+    fetcher = get_fetcher()
+    if experience_url:
+        logger.info("Fetching full experience details")
+        return experience_url, fetcher.experience(experience_url)
+
+    logger.info("Fetching random Erowid experience")
+    return fetcher.random_experience()
+
+def build_script(
+    experience_url: str,
+    data: dict,
+    primary_substance: str,
+    segments: list[tuple[str, float]],
+) -> NarrationScript:
+    fetcher = get_fetcher()
+    if fetcher.corpus is not None:
+        fetcher.corpus.set_substance(experience_url, primary_substance)
+
+    title = data.get("title", "Unknown Title")
+    base_filename = sanitize_filename(title)
+
+    return NarrationScript(
+        title=title,
+        segments=segments,
+        primary_substance=primary_substance,
+        audio_file=base_filename + ".wav",
+        subtitle_file=base_filename + ".srt",
+        source_url=experience_url,
+    )
+
+def experience_details(data: dict) -> dict:
+    return {
+        "title": data.get("title", "Unknown Title"),
+        "username": data.get("author", "Unknown"),
+        "gender": data.get("metadata", {}).get("gender", "Unknown"),
+        "age": data.get("metadata", {}).get("age", "Unknown"),
+    }
+
+def prepare_script(experience_url: str | None = None) -> NarrationScript:
+    experience_url, data = fetch_experience(experience_url)
+    raw_content = data.get("content", "")
+
+    cleaned_content, gemini_primary = clean_and_extract(raw_content)
+    primary_substance = resolve_primary_substance(cleaned_content, gemini_primary)
+
+    tts_script = build_tts_script(
+        experience_details(data),
+        primary_substance,
+        cleaned_content
+    )
+
+    return build_script(experience_url, data, primary_substance, text_segments(tts_script))
+
+def stream_source(raw_content: str, details: dict, primary_substance: str | None) -> dict:
+    # What a streamed narration is derived from; the store key for it.
+    # primary_substance is None when it came from cleanup.
+    return {
+        "content": raw_content,
+        "details": details,
+        "primary_substance": primary_substance,
+        "cleanup_model": gemini_cleanup.GEMINI_MODEL,
+        "chunk_chars": gemini_cleanup.CLEANUP_CHUNK_CHARS,
+        "segment_chars": SEGMENT_MAX_CHARS,
+        "pauses": [SENTENCE_PAUSE, CLAUSE_PAUSE],
+        "outro": OUTRO,
+    }
 
-segments = split_with_punctuation(normalize_text(tts_script))
-audio_parts = []
-last_spoken = None  # deduplication logic
+def prepare_stream(experience_url: str | None = None):
+    # Returns the script plus an iterator of segment blocks: the intro
+    # right away, then each cleaned chunk as Gemini returns it. The
+    # intro names the substance before any cleaned text exists, so it
+    # is read off the raw report; if that finds nothing, clean first.
+    experience_url, data = fetch_experience(experience_url)
+    raw_content = data.get("content", "")
+    details = experience_details(data)
+
+    primary_substance = detect_primary_substance_by_frequency(raw_content)
+    if not primary_substance:
+        cleaned_content, gemini_primary = clean_and_extract(raw_content)
+        primary_substance = resolve_primary_substance(cleaned_content, gemini_primary)
+        tts_script = build_tts_script(details, primary_substance, cleaned_content)
+        script = build_script(experience_url, data, primary_substance, text_segments(tts_script))
+        script.stream_source = stream_source(raw_content, details, None)
+        return script, iter([script.segments])
+
+    logger.info("Final primary substance: %s", primary_substance)
+
+    intro = text_segments(build_intro(details, primary_substance))
+
+    def blocks():
+        # Cleanup is submitted on the first pull (a narration restored
+        # from the store never asks), so it runs while the intro is
+        # synthesized
+        results = gemini_cleanup.iter_cleaned_chunks(
+            raw_content,
+            get_client(),
+            cache=gemini_cleanup.get_default_cache(),
+        )
+        yield intro
+        for result in results:
+            yield text_segments(result["cleaned_content"])
+        yield text_segments(OUTRO)
+
+    script = build_script(experience_url, data, primary_substance, [])
+    script.stream_source = stream_source(raw_content, details, primary_substance)
+    return script, blocks()
+
+def generate_narration(experience_url: str | None = None, tts=None) -> Narration:
+    # The model loads while the report is fetched and cleaned
+    if tts is None:
+        tts = TTSLoader()
+
+    if GEMINI_STREAM:
+        script, blocks = prepare_stream(experience_url)
+        narration = narrate_stream(
+            script,
+            blocks,
+            tts,
+            cache=get_default_cache(),
+            store=get_default_store(),
+        )
+    else:
+        narration = narrate_script(
+            prepare_script(experience_url),
+            tts,
+            cache=get_default_cache(),
+            store=get_default_store(),
+        )
 
-for text, pause in segments:
-    normalized = normalize_text(text).lower()
-    if normalized == last_spoken:
-        logger.warning("Skipping duplicate segment: %s", text[:60])
-        continue
-    last_spoken = normalized
+    logger.info("Saved audio as %s", narration.audio_file)
+    logger.info("Saved subtitles as %s", narration.subtitle_file)
+    return narration
 
-    logger.info("Synthesizing: %s...", text[:40])
-    wav = tts.tts(text=text, speaker="p232")
-    audio_parts.append(wav)
-    audio_parts.append(silence(pause, sr))
 
-final_audio = np.concatenate(audio_parts)
+if __name__ == "__main__":
+    # -------------------------
+    # Parse experience URL
+    # -------------------------
+    experience_url = None
+    if len(sys.argv) > 1:
+        experience_url = unquote(sys.argv[1])
+        logger.info("Using provided experience URL: %s", experience_url)
 
-audio_filename = sanitize_filename(clean_experience["title"]) + ".wav"
-sf.write(audio_filename, final_audio, sr)
-logger.info("Saved audio as %s", audio_filename)
+    narration = generate_narration(experience_url)
 
-print(f"{audio_filename}|{primary_substance}")
+    print(f"{narration.audio_file}|{narration.primary_substance}")
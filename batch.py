@@ -0,0 +1,187 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from dotenv import load_dotenv
+
+from lysergic_api import PREFETCH_DEPTH, get_fetcher
+from narration import Narration, NarrationScript
+from pipeline import Pipeline
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# -------------------------
+# Per-stage concurrency
+# fetch + upload are network-bound, tts + render are CPU-bound.
+# TTS shares one in-process model, so it stays at 1 unless the
+# synthesis itself fans out through TTS_WORKERS.
+# -------------------------
+STAGE_LIMITS = {
+    "fetch": int(os.getenv("BATCH_FETCH_CONCURRENCY", "4")),
+    "tts": int(os.getenv("BATCH_TTS_CONCURRENCY", "1")),
+    "render": int(os.getenv("BATCH_RENDER_CONCURRENCY", "2")),
+    "upload": int(os.getenv("BATCH_UPLOAD_CONCURRENCY", "2")),
+}
+
+
+@dataclass
+class BatchItem:
+    index: int
+    experience_url: str | None
+    stage: str = "queued"
+    script: NarrationScript | None = None
+    narration: Narration | None = None
+    video_file: str | None = None
+    video_id: str | None = None
+    error: str | None = None
+
+
+# -------------------------
+# Scheduler
+# Each stage has its own executor; when an item finishes one stage
+# it is handed to the next stage's executor, so report B can be
+# synthesizing while A renders and C uploads.
+# -------------------------
+class BatchRunner:
+    def __init__(
+        self,
+        pipeline: Pipeline,
+        upload: bool = False,
+        limits: dict | None = None,
+        prefetch_depth: int = PREFETCH_DEPTH,
+    ):
+        self.pipeline = pipeline
+        self.limits = {**STAGE_LIMITS, **(limits or {})}
+        self.prefetch_depth = prefetch_depth
+        self._urls = []
+
+        self.stages = [
+            ("fetch", self._fetch),
+            ("tts", self._tts),
+            ("render", self._render),
+        ]
+        if upload:
+            self.stages.append(("upload", self._upload))
+
+        self.executors = {
+            name: ThreadPoolExecutor(
+                max_workers=max(1, self.limits[name]),
+                thread_name_prefix=f"batch-{name}",
+            )
+            for name, _ in self.stages
+        }
+
+        self._lock = threading.Lock()
+        self._remaining = 0
+        self._done = threading.Event()
+
+    # -------------------------
+    # Stages
+    # -------------------------
+    def _fetch(self, item: BatchItem):
+        self._prefetch_after(item)
+        item.script = self.pipeline.prepare(item.experience_url)
+
+    def _prefetch_after(self, item: BatchItem):
+        # URL-list runs download the reports queued behind the running
+        # fetches in the background, so they're ready when a fetch slot
+        # frees up (random items are prefetched by the fetcher itself)
+        if self.prefetch_depth <= 0:
+            return
+        first = item.index + max(1, self.limits["fetch"])
+        upcoming = self._urls[first:first + self.prefetch_depth]
+        urls = [url for url in upcoming if url]
+        if urls:
+            get_fetcher().prefetch(urls)
+
+    def _tts(self, item: BatchItem):
+        item.narration = self.pipeline.synthesize(item.script)
+
+    def _render(self, item: BatchItem):
+        item.video_file = self.pipeline.render(item.narration)
+
+    def _upload(self, item: BatchItem):
+        item.video_id = self.pipeline.upload(item.narration, item.video_file)
+
+    # -------------------------
+    # Scheduling
+    # -------------------------
+    def _submit(self, item: BatchItem, stage_index: int):
+        name, _ = self.stages[stage_index]
+        item.stage = name
+        self.executors[name].submit(self._run_stage, item, stage_index)
+
+    def _run_stage(self, item: BatchItem, stage_index: int):
+        name, func = self.stages[stage_index]
+        started = time.monotonic()
+
+        try:
+            func(item)
+        except Exception as e:
+            logger.exception("[%d] %s failed", item.index, name)
+            item.error = f"{name}: {e}"
+            item.stage = "failed"
+            self._finish()
+            return
+
+        logger.info(
+            "[%d] %s done in %.1fs", item.index, name, time.monotonic() - started
+        )
+
+        if stage_index + 1 < len(self.stages):
+            self._submit(item, stage_index + 1)
+        else:
+            item.stage = "done"
+            self._finish()
+
+    def _finish(self):
+        with self._lock:
+            self._remaining -= 1
+            if self._remaining == 0:
+                self._done.set()
+
+    def run(self, experience_urls: list[str | None]) -> list[BatchItem]:
+        items = [
+            BatchItem(index=i, experience_url=url)
+            for i, url in enumerate(experience_urls)
+        ]
+        if not items:
+            return items
+
+        self._urls = list(experience_urls)
+        self._remaining = len(items)
+        self._done.clear()
+        started = time.monotonic()
+
+        for item in items:
+            self._submit(item, 0)
+
+        self._done.wait()
+
+        for executor in self.executors.values():
+            executor.shutdown()
+
+        elapsed = time.monotonic() - started
+        completed = sum(1 for item in items if item.stage == "done")
+        logger.info(
+            "Batch finished: %d/%d videos in %.1fs (%.1f videos/hour)",
+            completed,
+            len(items),
+            elapsed,
+            completed * 3600 / elapsed if elapsed else 0.0,
+        )
+
+        return items
+
+
+def read_url_file(path: str) -> list[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [
+            line.strip() for line in f
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
@@ -0,0 +1,150 @@
+import os
+import math
+import logging
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from clip_cache import CLIP_FPS, CLIP_GOP
+from profiles import PROFILES, EncoderProfile
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# -------------------------
+# Config
+# -------------------------
+# Parallel encodes for RENDER_BACKEND=chunked (0 = one per 4 cores)
+RENDER_CHUNKS = int(os.getenv("RENDER_CHUNKS", "0"))
+
+GOP_SECONDS = CLIP_GOP / CLIP_FPS
+
+
+def default_chunk_count() -> int:
+    return RENDER_CHUNKS or max(2, (os.cpu_count() or 1) // 4)
+
+# -------------------------
+# Plan
+# Chunk starts land on the pre-looped background's keyframes
+# (every GOP_SECONDS; clip_cache trims each clip to whole GOPs, so
+# the grid holds across loop seams), so each chunk seeks without
+# decoding into its neighbour and every chunk is a whole number of
+# frames. Seeking stays frame-accurate off the grid too (input -ss
+# plus a re-encode), only slower.
+# -------------------------
+def plan_chunks(duration: float, chunks: int) -> list[tuple[float, float]]:
+    chunks = max(1, chunks)
+    length = math.ceil(duration / chunks / GOP_SECONDS) * GOP_SECONDS
+
+    plan = []
+    start = 0.0
+    while start < duration:
+        plan.append((start, min(length, duration - start)))
+        start += length
+    return plan
+
+def build_chunk_command(
+    background_file: str,
+    output_file: str,
+    start: float,
+    length: float,
+    subtitle_filter: str | None,
+    threads: int,
+    profile: EncoderProfile = PROFILES["upload"],
+) -> list[str]:
+    # Shift timestamps back to timeline time for the burn, so every
+    # chunk renders its own window of the shared subtitle file
+    if subtitle_filter:
+        subtitle_filter = (
+            f"setpts=PTS+{start:.3f}/TB,"
+            f"{subtitle_filter},"
+            f"setpts=PTS-STARTPTS"
+        )
+    video_filter = profile.video_filter(subtitle_filter) or "null"
+
+    return [
+        "ffmpeg",
+        "-y",
+        "-ss", f"{start:.3f}",
+        "-i", background_file,
+        "-t", f"{length:.3f}",
+        "-an",
+        "-vf", video_filter,
+        *profile.codec_args(threads),
+        output_file,
+    ]
+
+def concat_chunks(chunk_files: list[str], output_file: str):
+    list_file = f"{os.path.splitext(output_file)[0]}_chunks.txt"
+    with open(list_file, "w", encoding="utf-8") as f:
+        for chunk_file in chunk_files:
+            f.write(f"file '{os.path.abspath(chunk_file)}'\n")
+
+    try:
+        subprocess.run(
+            [
+                "ffmpeg",
+                "-y",
+                "-f", "concat",
+                "-safe", "0",
+                "-i", list_file,
+                "-c", "copy",
+                output_file,
+            ],
+            check=True,
+        )
+    finally:
+        os.remove(list_file)
+
+# -------------------------
+# Render
+# Video only: chunks are encoded side by side (each ffmpeg is its
+# own worker process) and joined with stream copy. Audio is left to
+# the final mux, since AAC priming at every chunk join would add
+# gaps and drift.
+# -------------------------
+def render_chunked_video(
+    background_file: str,
+    output_file: str,
+    duration: float,
+    subtitle_filter: str | None = None,
+    chunks: int | None = None,
+    profile: EncoderProfile = PROFILES["upload"],
+) -> str:
+    plan = plan_chunks(duration, chunks or default_chunk_count())
+    threads = max(1, (os.cpu_count() or 1) // len(plan))
+    base_name = os.path.splitext(output_file)[0]
+    chunk_files = [f"{base_name}_chunk{i:03}.mp4" for i in range(len(plan))]
+
+    logger.info(
+        "Encoding %d chunks in parallel (%d threads each)", len(plan), threads
+    )
+
+    def encode(index: int):
+        start, length = plan[index]
+        subprocess.run(
+            build_chunk_command(
+                background_file,
+                chunk_files[index],
+                start,
+                length,
+                subtitle_filter,
+                threads,
+                profile,
+            ),
+            check=True,
+        )
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(plan)) as pool:
+            list(pool.map(encode, range(len(plan))))
+
+        concat_chunks(chunk_files, output_file)
+    finally:
+        for chunk_file in chunk_files:
+            if os.path.exists(chunk_file):
+                os.remove(chunk_file)
+
+    return output_file
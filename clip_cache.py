@@ -0,0 +1,183 @@
+import os
+import math
+import hashlib
+import logging
+import tempfile
+import threading
+import subprocess
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# -------------------------
+# Config
+# -------------------------
+CLIP_CACHE_DIR = os.getenv("CLIP_CACHE_DIR") or os.path.join("cache", "clips")
+
+CLIP_WIDTH = 1920
+CLIP_HEIGHT = 1080
+CLIP_FPS = 30
+# Keyframe every 2 seconds. Normalized clips are a whole number of
+# GOPs long, so the grid carries on across every loop repeat.
+CLIP_GOP = 60
+
+
+# -------------------------
+# Probe
+# -------------------------
+def probe_duration(path: str, entry: str = "format=duration", stream: str | None = None) -> float:
+    result = subprocess.run(
+        [
+            "ffprobe",
+            "-v", "error",
+            *(["-select_streams", stream] if stream else []),
+            "-show_entries", entry,
+            "-of", "default=noprint_wrappers=1:nokey=1",
+            path,
+        ],
+        check=True,
+        text=True,
+        stdout=subprocess.PIPE,
+    )
+    return float(result.stdout.strip())
+
+def probe_video_duration(path: str) -> float:
+    # The video stream's own length; the container's can include a
+    # longer audio track. Some containers (mkv, webm) only have the latter.
+    try:
+        return probe_duration(path, "stream=duration", stream="v:0")
+    except ValueError:
+        return probe_duration(path)
+
+def whole_gop_frames(duration: float) -> int:
+    # Frames kept of a clip: rounded down to whole GOPs, and at least
+    # one GOP (a shorter clip is looped up to it)
+    frames = math.floor(duration * CLIP_FPS)
+    return max(CLIP_GOP, frames // CLIP_GOP * CLIP_GOP)
+
+
+# -------------------------
+# Normalize
+# Re-encode a clip once to a fixed resolution, frame rate and
+# closed GOP, trimmed to whole GOPs, so any number of copies can be
+# concatenated without touching the bitstream and keyframes stay
+# every CLIP_GOP frames across the seams.
+# -------------------------
+def _cache_key(clip_file: str) -> str:
+    stat = os.stat(clip_file)
+    raw = (
+        f"{os.path.abspath(clip_file)}|{stat.st_size}|{stat.st_mtime_ns}|"
+        f"{CLIP_WIDTH}x{CLIP_HEIGHT}@{CLIP_FPS}|gop={CLIP_GOP}|whole-gops"
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+_key_locks = {}
+_key_locks_lock = threading.Lock()
+
+def _key_lock(key: str) -> threading.Lock:
+    with _key_locks_lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+def normalize_clip(clip_file: str) -> str:
+    os.makedirs(CLIP_CACHE_DIR, exist_ok=True)
+
+    base_name = os.path.splitext(os.path.basename(clip_file))[0]
+    key = _cache_key(clip_file)
+    cached = os.path.join(CLIP_CACHE_DIR, f"{base_name}-{key}.mp4")
+
+    # Concurrent renders of the same clip wait for one encode
+    with _key_lock(key):
+        if not os.path.exists(cached):
+            _encode_normalized(clip_file, cached)
+
+    return cached
+
+def _encode_normalized(clip_file: str, cached: str):
+    logger.info("Normalizing background clip: %s", clip_file)
+
+    video_filter = (
+        f"scale={CLIP_WIDTH}:{CLIP_HEIGHT}:force_original_aspect_ratio=decrease,"
+        f"pad={CLIP_WIDTH}:{CLIP_HEIGHT}:(ow-iw)/2:(oh-ih)/2,"
+        f"fps={CLIP_FPS},setsar=1"
+    )
+
+    duration = probe_video_duration(clip_file)
+    frames = whole_gop_frames(duration)
+    # Only a clip shorter than one GOP needs looping to fill it
+    loop_args = ["-stream_loop", "-1"] if frames > duration * CLIP_FPS else []
+
+    # Unique name, so another process normalizing the same clip never
+    # writes into this encode
+    fd, tmp_file = tempfile.mkstemp(dir=CLIP_CACHE_DIR, prefix=os.path.basename(cached), suffix=".tmp.mp4")
+    os.close(fd)
+    try:
+        subprocess.run(
+            [
+                "ffmpeg",
+                "-y",
+                *loop_args,
+                "-i", clip_file,
+                "-an",
+                "-vf", video_filter,
+                "-frames:v", str(frames),
+                "-c:v", "libx264",
+                "-preset", "medium",
+                "-pix_fmt", "yuv420p",
+                "-g", str(CLIP_GOP),
+                "-keyint_min", str(CLIP_GOP),
+                "-sc_threshold", "0",
+                "-flags", "+cgop",
+                "-movflags", "+faststart",
+                tmp_file,
+            ],
+            check=True,
+        )
+        os.replace(tmp_file, cached)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+
+# -------------------------
+# Loop
+# -------------------------
+def build_looped_background(clip_file: str, duration: float, output_file: str) -> str:
+    normalized = normalize_clip(clip_file)
+    clip_duration = probe_duration(normalized)
+
+    # Round up to the next keyframe so the stream-copy cut is clean
+    # (the clip is whole GOPs, so the grid holds past the first loop);
+    # the final encode trims to the exact narration length
+    gop_seconds = CLIP_GOP / CLIP_FPS
+    target = math.ceil(duration / gop_seconds) * gop_seconds
+    repeats = math.ceil(target / clip_duration)
+
+    list_file = f"{os.path.splitext(output_file)[0]}_concat.txt"
+    with open(list_file, "w", encoding="utf-8") as f:
+        for _ in range(repeats):
+            f.write(f"file '{os.path.abspath(normalized)}'\n")
+
+    logger.info("Looping background %d times (stream copy)", repeats)
+
+    try:
+        subprocess.run(
+            [
+                "ffmpeg",
+                "-y",
+                "-f", "concat",
+                "-safe", "0",
+                "-i", list_file,
+                "-c", "copy",
+                "-t", f"{target:.3f}",
+                output_file,
+            ],
+            check=True,
+        )
+    finally:
+        os.remove(list_file)
+
+    return output_file
@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+from dotenv import load_dotenv
+
+from substances import detect_primary_substance
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# -------------------------
+# Config
+# -------------------------
+CORPUS_DB = os.getenv("CORPUS_DB", "corpus.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS experiences (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    author TEXT,
+    metadata TEXT NOT NULL DEFAULT '{}',
+    content TEXT NOT NULL,
+    doses TEXT NOT NULL DEFAULT '[]',
+    substance TEXT,
+    word_count INTEGER NOT NULL DEFAULT 0,
+    fetched_at REAL NOT NULL,
+    rendered_at REAL,
+    video_file TEXT
+);
+
+CREATE INDEX IF NOT EXISTS experiences_substance
+    ON experiences (substance, word_count);
+CREATE INDEX IF NOT EXISTS experiences_rendered
+    ON experiences (rendered_at);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS experiences_fts USING fts5(
+    title, content, content='experiences', content_rowid='id'
+);
+
+CREATE TRIGGER IF NOT EXISTS experiences_ai AFTER INSERT ON experiences BEGIN
+    INSERT INTO experiences_fts (rowid, title, content)
+    VALUES (new.id, new.title, new.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS experiences_ad AFTER DELETE ON experiences BEGIN
+    INSERT INTO experiences_fts (experiences_fts, rowid, title, content)
+    VALUES ('delete', old.id, old.title, old.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS experiences_au AFTER UPDATE OF title, content ON experiences BEGIN
+    INSERT INTO experiences_fts (experiences_fts, rowid, title, content)
+    VALUES ('delete', old.id, old.title, old.content);
+    INSERT INTO experiences_fts (rowid, title, content)
+    VALUES (new.id, new.title, new.content);
+END;
+"""
+
+
+# -------------------------
+# Corpus store
+# Keeps fetched experiences in the same shape the API returns
+# ({title, author, metadata, content, doses}) keyed by source URL.
+# -------------------------
+class Corpus:
+    def __init__(self, path: str = CORPUS_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get(self, url: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM experiences WHERE url = ?", (url,)
+            ).fetchone()
+
+        return self._to_data(row) if row else None
+
+    def put(self, url: str, data: dict, substance: str | None = None):
+        content = data.get("content", "")
+        if substance is None:
+            substance = detect_primary_substance(content, data.get("doses", []))
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO experiences (
+                    url, title, author, metadata, content, doses,
+                    substance, word_count, fetched_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    title = excluded.title,
+                    author = excluded.author,
+                    metadata = excluded.metadata,
+                    content = excluded.content,
+                    doses = excluded.doses,
+                    substance = COALESCE(excluded.substance, substance),
+                    word_count = excluded.word_count,
+                    fetched_at = excluded.fetched_at
+                """,
+                (
+                    url,
+                    data.get("title", "Unknown Title"),
+                    data.get("author"),
+                    json.dumps(data.get("metadata", {})),
+                    content,
+                    json.dumps(data.get("doses", [])),
+                    substance,
+                    len(content.split()),
+                    time.time(),
+                ),
+            )
+
+    def set_substance(self, url: str, substance: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE experiences SET substance = ? WHERE url = ?",
+                (substance, url),
+            )
+
+    def reclassify(self) -> int:
+        # Re-run substance detection over every stored report
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT id, content, doses FROM experiences"
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE experiences SET substance = ? WHERE id = ?",
+                [
+                    (detect_primary_substance(row["content"], json.loads(row["doses"])), row["id"])
+                    for row in rows
+                ],
+            )
+        return len(rows)
+
+    def mark_rendered(self, url: str, video_file: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE experiences SET rendered_at = ?, video_file = ? WHERE url = ?",
+                (time.time(), video_file, url),
+            )
+
+    def query(
+        self,
+        substance: str | None = None,
+        min_words: int | None = None,
+        max_words: int | None = None,
+        unrendered: bool = False,
+        text: str | None = None,
+        limit: int | None = None,
+        random_order: bool = False,
+    ) -> list[str]:
+        sql = "SELECT e.url FROM experiences e"
+        where = []
+        params = []
+
+        if text:
+            sql += " JOIN experiences_fts f ON f.rowid = e.id"
+            where.append("experiences_fts MATCH ?")
+            params.append(text)
+        if substance:
+            where.append("e.substance = ? COLLATE NOCASE")
+            params.append(substance)
+        if min_words is not None:
+            where.append("e.word_count >= ?")
+            params.append(min_words)
+        if max_words is not None:
+            where.append("e.word_count <= ?")
+            params.append(max_words)
+        if unrendered:
+            where.append("e.rendered_at IS NULL")
+
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY RANDOM()" if random_order else " ORDER BY e.id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            return [row["url"] for row in self._conn.execute(sql, params)]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM experiences").fetchone()[0]
+
+    @staticmethod
+    def _to_data(row) -> dict:
+        return {
+            "url": row["url"],
+            "title": row["title"],
+            "author": row["author"],
+            "metadata": json.loads(row["metadata"]),
+            "content": row["content"],
+            "doses": json.loads(row["doses"]),
+        }
+
+
+_corpus = None
+_corpus_lock = threading.Lock()
+
+def get_corpus() -> Corpus:
+    global _corpus
+    with _corpus_lock:
+        if _corpus is None:
+            _corpus = Corpus()
+        return _corpus
@@ -0,0 +1,275 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from substances import canonical_substance, first_substance
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# -------------------------
+# Config
+# -------------------------
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+CLEANUP_CHUNK_CHARS = int(os.getenv("GEMINI_CHUNK_CHARS", "4000"))
+CLEANUP_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "4"))
+CLEANUP_RETRIES = int(os.getenv("GEMINI_RETRIES", "3"))
+CLEANUP_BACKOFF = 1.0
+CLEANUP_CACHE_DIR = os.getenv("GEMINI_CACHE_DIR") or os.path.join("cache", "gemini")
+
+# Cleaned text shorter than this share of the input is treated as a
+# summary or a truncated reply, not a cleanup
+MIN_KEPT_RATIO = 0.5
+
+# Bump when the prompt changes so old cache entries stop matching
+PROMPT_VERSION = 1
+
+PROMPT = (
+    "Clean up the following experience content by fixing punctuation "
+    "and removing repeated sentences. Then return a JSON object with:\n"
+    "{{ \"cleaned_content\": string, \"primary_substance\": string }}\n"
+    "Do not add extra keys.\n\n"
+    "Content:\n{content}"
+)
+
+
+# -------------------------
+# Chunking
+# Paragraphs are packed up to max_chars; a paragraph longer than
+# that is split between sentences.
+# -------------------------
+def _split_long_paragraph(paragraph: str, max_chars: int) -> list[str]:
+    # Every character lands in some sentence, leading "..." or "?!" too
+    sentences = re.findall(r"[^.!?]*[.!?]+\s*|[^.!?]+$", paragraph)
+    pieces = []
+    current = ""
+
+    for sentence in sentences:
+        if current and len(current) + len(sentence) > max_chars:
+            pieces.append(current.strip())
+            current = ""
+        current += sentence
+
+    if current.strip():
+        pieces.append(current.strip())
+    return pieces
+
+def split_paragraph_chunks(content: str, max_chars: int = CLEANUP_CHUNK_CHARS) -> list[str]:
+    paragraphs = []
+    for paragraph in re.split(r"\n\s*\n", content):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) > max_chars:
+            paragraphs.extend(_split_long_paragraph(paragraph, max_chars))
+        else:
+            paragraphs.append(paragraph)
+
+    chunks = []
+    current = []
+    size = 0
+
+    for paragraph in paragraphs:
+        if current and size + len(paragraph) + 2 > max_chars:
+            chunks.append("\n\n".join(current))
+            current = []
+            size = 0
+        current.append(paragraph)
+        size += len(paragraph) + 2
+
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+# -------------------------
+# Response cache
+# One JSON file per (model, prompt version, chunk text).
+# -------------------------
+class CleanupCache:
+    def __init__(self, directory: str = CLEANUP_CACHE_DIR):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(model: str, chunk: str) -> str:
+        raw = f"{model}\0{PROMPT_VERSION}\0{chunk}".encode("utf-8")
+        return hashlib.sha256(raw).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, model: str, chunk: str) -> dict | None:
+        try:
+            with open(self._path(self.key(model, chunk)), "r", encoding="utf-8") as f:
+                result = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return result
+
+    def put(self, model: str, chunk: str, result: dict):
+        path = self._path(self.key(model, chunk))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f"{path}.{os.getpid()}.{id(result)}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+# -------------------------
+# Per-chunk request
+# -------------------------
+def parse_response(text: str, chunk: str) -> dict:
+    text = text.strip()
+    # Tolerate a ```json fence around the object
+    fenced = re.match(r"^```(?:json)?\s*(.*?)\s*```$", text, re.S)
+    if fenced:
+        text = fenced.group(1)
+
+    parsed = json.loads(text)
+    if not isinstance(parsed, dict):
+        raise ValueError("Gemini output is not a JSON object")
+
+    cleaned = parsed.get("cleaned_content")
+    if not isinstance(cleaned, str) or not cleaned.strip():
+        raise ValueError("Gemini output has no cleaned_content")
+    if len(cleaned) < len(chunk) * MIN_KEPT_RATIO:
+        raise ValueError(
+            f"Gemini output dropped too much text ({len(cleaned)} of {len(chunk)} chars)"
+        )
+
+    substance = parsed.get("primary_substance")
+    if not isinstance(substance, str) or not substance.strip():
+        substance = "Unknown"
+
+    return {"cleaned_content": cleaned.strip(), "primary_substance": substance.strip()}
+
+def clean_chunk(
+    client,
+    chunk: str,
+    model: str = GEMINI_MODEL,
+    cache: CleanupCache | None = None,
+    retries: int = CLEANUP_RETRIES,
+    sleep=time.sleep,
+) -> dict:
+    if cache is not None:
+        cached = cache.get(model, chunk)
+        if cached is not None:
+            return cached
+
+    for attempt in range(retries + 1):
+        try:
+            response = client.models.generate_content(
+                model=model,
+                contents=PROMPT.format(content=chunk),
+                config={"response_mime_type": "application/json"},
+            )
+            result = parse_response(response.text or "", chunk)
+        except Exception as e:
+            if attempt == retries:
+                # Only this chunk falls back to its raw text
+                logger.warning("Gemini cleanup failed for chunk; using raw text (%s)", e)
+                return {
+                    "cleaned_content": chunk,
+                    "primary_substance": first_substance(chunk) or "Unknown",
+                }
+            delay = CLEANUP_BACKOFF * (2 ** attempt)
+            logger.info("Gemini chunk attempt %d failed (%s), retrying in %.1fs", attempt + 1, e, delay)
+            sleep(delay)
+            continue
+
+        if cache is not None:
+            cache.put(model, chunk, result)
+        return result
+
+
+# -------------------------
+# Whole report
+# -------------------------
+def vote_primary_substance(results: list[dict]) -> str:
+    votes = Counter()
+    for result in results:
+        name = canonical_substance(result["primary_substance"]) or result["primary_substance"]
+        if name and name != "Unknown":
+            # Longer chunks say more about the report than a short tail
+            votes[name] += len(result["cleaned_content"])
+    return votes.most_common(1)[0][0] if votes else "Unknown"
+
+def iter_cleaned_chunks(
+    content: str,
+    client,
+    model: str = GEMINI_MODEL,
+    cache: CleanupCache | None = None,
+    concurrency: int = CLEANUP_CONCURRENCY,
+    max_chars: int = CLEANUP_CHUNK_CHARS,
+    sleep=time.sleep,
+):
+    # Every chunk is submitted now; the returned iterator yields results
+    # in report order as each one lands, so a consumer can start on
+    # chunk 0 while the rest are still in flight
+    chunks = split_paragraph_chunks(content, max_chars)
+    if not chunks:
+        return iter(())
+
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, min(concurrency, len(chunks))),
+        thread_name_prefix="gemini",
+    )
+    futures = [
+        executor.submit(clean_chunk, client, chunk, model, cache, sleep=sleep)
+        for chunk in chunks
+    ]
+    executor.shutdown(wait=False)
+
+    return (future.result() for future in futures)
+
+def clean_content(
+    content: str,
+    client,
+    model: str = GEMINI_MODEL,
+    cache: CleanupCache | None = None,
+    concurrency: int = CLEANUP_CONCURRENCY,
+    max_chars: int = CLEANUP_CHUNK_CHARS,
+    sleep=time.sleep,
+) -> tuple[str, str]:
+    started = time.perf_counter()
+    hits_before = cache.hits if cache is not None else 0
+
+    results = list(iter_cleaned_chunks(
+        content, client, model, cache, concurrency, max_chars, sleep
+    ))
+    if not results:
+        return content, "Unknown"
+
+    logger.info(
+        "Cleaned %d chunks in %.1fs (%d cached)",
+        len(results),
+        time.perf_counter() - started,
+        (cache.hits - hits_before) if cache is not None else 0,
+    )
+
+    cleaned = "\n\n".join(result["cleaned_content"] for result in results)
+    return cleaned, vote_primary_substance(results)
+
+
+_default_cache = None
+
+def get_default_cache() -> CleanupCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = CleanupCache()
+    return _default_cache
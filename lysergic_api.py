@@ -0,0 +1,239 @@
+import os
+import asyncio
+import logging
+import threading
+from collections import deque
+
+import aiohttp
+from dotenv import load_dotenv
+
+from corpus import CORPUS_DB, Corpus, get_corpus
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# -------------------------
+# Env
+# -------------------------
+LYSERGIC_API = os.getenv("LYSERGIC_API") or "https://lysergic.kaizenklass.xyz"
+
+FETCH_CONCURRENCY = int(os.getenv("LYSERGIC_FETCH_CONCURRENCY", "4"))
+FETCH_TIMEOUT = float(os.getenv("LYSERGIC_FETCH_TIMEOUT", "30"))
+FETCH_RETRIES = int(os.getenv("LYSERGIC_FETCH_RETRIES", "4"))
+FETCH_BACKOFF = float(os.getenv("LYSERGIC_FETCH_BACKOFF", "0.5"))
+
+# Experiences kept fetched ahead of the narrator (random fetches and
+# URL-list batches)
+PREFETCH_DEPTH = int(os.getenv("LYSERGIC_PREFETCH", "0"))
+
+# Serve everything from the local corpus; never touch the network
+OFFLINE = os.getenv("LYSERGIC_OFFLINE", "0") == "1"
+
+RANDOM_SOURCE_URLS = [
+    "https://www.erowid.org/chemicals/dmt/dmt.shtml",
+    "https://www.erowid.org/chemicals/lsd/lsd.shtml",
+    "https://www.erowid.org/plants/salvia/salvia.shtml",
+    "https://www.erowid.org/plants/cannabis/cannabis.shtml",
+    "https://www.erowid.org/chemicals/mdma/mdma.shtml",
+    "https://www.erowid.org/chemicals/heroin/heroin.shtml",
+    "https://www.erowid.org/chemicals/cocaine/cocaine.shtml",
+    "https://www.erowid.org/chemicals/ketamine/ketamine.shtml",
+]
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FetchError(RuntimeError):
+    pass
+
+
+# -------------------------
+# Async client
+# One keep-alive session; every request goes through a semaphore
+# and is retried with exponential backoff on network errors and
+# retryable HTTP statuses.
+# -------------------------
+class LysergicClient:
+    def __init__(
+        self,
+        base_url: str = LYSERGIC_API,
+        concurrency: int = FETCH_CONCURRENCY,
+        timeout: float = FETCH_TIMEOUT,
+        retries: int = FETCH_RETRIES,
+        backoff: float = FETCH_BACKOFF,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self):
+        if self._session is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _post(self, path: str, payload: dict) -> dict:
+        await self.open()
+        url = f"{self.base_url}{path}"
+
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._semaphore:
+                    async with self._session.post(url, json=payload) as resp:
+                        if resp.status in RETRY_STATUSES:
+                            raise FetchError(f"{url} returned {resp.status}")
+                        resp.raise_for_status()
+                        return await resp.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError, FetchError) as e:
+                if isinstance(e, aiohttp.ClientResponseError) and e.status not in RETRY_STATUSES:
+                    raise
+                if attempt == self.retries:
+                    raise FetchError(f"{url} failed after {attempt + 1} attempts: {e}") from e
+
+                delay = self.backoff * (2 ** attempt)
+                logger.warning("Fetch failed (%s), retrying in %.1fs", e, delay)
+                await asyncio.sleep(delay)
+
+    async def random_experience_url(self) -> str:
+        experience = await self._post(
+            "/api/v1/erowid/random/experience?size_per_substance=1",
+            {"urls": RANDOM_SOURCE_URLS},
+        )
+        return experience["experience"]["url"]
+
+    async def experience(self, experience_url: str) -> dict:
+        resp = await self._post(
+            "/api/v1/erowid/experience",
+            {"url": experience_url},
+        )
+        return resp.get("data", {})
+
+    async def random_experience(self) -> tuple[str, dict]:
+        experience_url = await self.random_experience_url()
+        return experience_url, await self.experience(experience_url)
+
+
+# -------------------------
+# Sync facade
+# Runs the client on a background event loop so the (synchronous)
+# pipeline stages can share one pooled session and prefetch ahead.
+# Reads go through the local corpus when one is configured.
+# -------------------------
+class Fetcher:
+    def __init__(
+        self,
+        client: LysergicClient | None = None,
+        prefetch_depth: int = PREFETCH_DEPTH,
+        corpus: Corpus | None = None,
+        offline: bool = OFFLINE,
+    ):
+        self.client = client or LysergicClient()
+        self.prefetch_depth = 0 if offline else prefetch_depth
+        self.corpus = corpus
+        self.offline = offline
+
+        if offline and corpus is None:
+            raise ValueError("Offline mode needs a corpus (set CORPUS_DB)")
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._random = deque()
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def _store(self, experience_url: str, data: dict):
+        if self.corpus is not None and data:
+            self.corpus.put(experience_url, data)
+
+    def prefetch(self, experience_urls: list[str]):
+        with self._lock:
+            for experience_url in experience_urls:
+                if not experience_url or experience_url in self._pending:
+                    continue
+                if self.offline or (self.corpus and self.corpus.get(experience_url)):
+                    continue
+                self._pending[experience_url] = self._submit(
+                    self.client.experience(experience_url)
+                )
+
+    def _fill_random(self):
+        while len(self._random) < self.prefetch_depth:
+            self._random.append(self._submit(self.client.random_experience()))
+
+    def experience(self, experience_url: str) -> dict:
+        if self.corpus is not None:
+            data = self.corpus.get(experience_url)
+            if data is not None:
+                return data
+
+        if self.offline:
+            raise FetchError(f"{experience_url} is not in the local corpus (offline)")
+
+        with self._lock:
+            future = self._pending.pop(experience_url, None)
+        if future is None:
+            future = self._submit(self.client.experience(experience_url))
+
+        data = future.result()
+        self._store(experience_url, data)
+        return data
+
+    def random_experience(self) -> tuple[str, dict]:
+        if self.offline:
+            urls = (
+                self.corpus.query(unrendered=True, limit=1, random_order=True)
+                or self.corpus.query(limit=1, random_order=True)
+            )
+            if not urls:
+                raise FetchError("Local corpus is empty (offline)")
+            return urls[0], self.corpus.get(urls[0])
+
+        with self._lock:
+            future = self._random.popleft() if self._random else None
+            self._fill_random()
+        if future is None:
+            future = self._submit(self.client.random_experience())
+
+        experience_url, data = future.result()
+        self._store(experience_url, data)
+        return experience_url, data
+
+    def close(self):
+        self._submit(self.client.close()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+def get_fetcher() -> Fetcher:
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = Fetcher(corpus=get_corpus() if CORPUS_DB else None)
+        return _fetcher
@@ -1,9 +1,15 @@
-import subprocess
 import logging
 import sys
+from urllib.parse import unquote
 from dotenv import load_dotenv
 import os
 
+from assets import AssetError
+from batch import BatchRunner, read_url_file
+from corpus import get_corpus
+from pipeline import Pipeline
+from profiles import RENDER_PROFILE
+
 load_dotenv()
 
 logging.basicConfig(
@@ -12,118 +18,158 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-AUDIO_SCRIPT = "audio.py"
-GEMINI_AUDIO_SCRIPT = "audio_gemini.py"
-VIDEO_SCRIPT = "video.py"
-YT_SCRIPT = "yt.py"
-
-# -------------------------
-# Parse arguments
-# -------------------------
-experience_url = None
-auto_upload = False
-use_gemini = False
-
-for arg in sys.argv[1:]:
-    if arg == "-y":
-        auto_upload = True
-    elif arg == "-g":
-        use_gemini = True
-    else:
-        experience_url = arg
-
-# -------------------------
-# Choose audio script
-# -------------------------
-audio_script = GEMINI_AUDIO_SCRIPT if use_gemini else AUDIO_SCRIPT
-logger.info("Running %s...", audio_script)
+PLAYLIST_ID = os.getenv("YT_PLAYLIST_ID")
 
-cmd = ["python", audio_script]
-if experience_url:
-    cmd.append(experience_url)
 
 # -------------------------
-# Run audio script
+# Worker mode
+# Reads one experience URL per line from stdin; a blank
+# line renders a random experience. Uploads only with -y.
 # -------------------------
-try:
-    result = subprocess.run(
-        cmd,
-        check=True,
-        text=True,
-        stdout=subprocess.PIPE
-    )
-except subprocess.CalledProcessError:
-    logger.error("%s failed!", audio_script)
-    sys.exit(1)
+def run_worker(pipeline: Pipeline, auto_upload: bool) -> int:
+    logger.info("Worker ready, reading experience URLs from stdin")
+    failed = 0
 
-# -------------------------
-# Parse audio.py output
-# Expected:
-# audio.wav | subtitle.srt | primary_substance | experience_url
-# -------------------------
-output_line = result.stdout.strip().splitlines()[-1]
-parts = [p.strip() for p in output_line.split("|")]
+    for line in sys.stdin:
+        queued_url = unquote(line.strip()) or None
+        logger.info("Processing: %s", queued_url or "random experience")
 
-if len(parts) not in (3, 4):
-    logger.error("Unexpected audio.py output: %s", output_line)
-    sys.exit(1)
+        try:
+            result = pipeline.run(queued_url, upload=auto_upload)
+        except Exception:
+            logger.exception("Pipeline failed for %s", queued_url)
+            failed += 1
+            continue
 
-audio_file = parts[0]
-subtitle_file = parts[1]
-primary_substance = parts[2]
-frontend_experience_url = parts[3] if len(parts) == 4 else None
+        print(result.video_file, flush=True)
 
-logger.info("Generated audio: %s", audio_file)
-logger.info("Generated subtitles: %s", subtitle_file)
-logger.info("Primary substance: %s", primary_substance)
+    logger.info("Worker finished (%d failed)", failed)
+    return 1 if failed else 0
 
-if frontend_experience_url:
-    logger.info("Experience URL: %s", frontend_experience_url)
 
 # -------------------------
-# Run video.py
+# Single run
 # -------------------------
-logger.info("Running video.py...")
-try:
-    result = subprocess.run(
-        ["python", VIDEO_SCRIPT, audio_file],
-        check=True,
-        text=True,
-        stdout=subprocess.PIPE
-    )
-except subprocess.CalledProcessError:
-    logger.error("video.py failed!")
-    sys.exit(1)
-
-video_file = result.stdout.strip().splitlines()[-1]
-logger.info("Generated video: %s", video_file)
+def run_once(pipeline: Pipeline, experience_url: str | None, auto_upload: bool) -> int:
+    try:
+        result = pipeline.run(experience_url)
+    except Exception:
+        logger.exception("Pipeline failed!")
+        return 1
+
+    if result.narration.experience_url:
+        logger.info("Experience URL: %s", result.narration.experience_url)
+
+    # -------------------------
+    # Upload to YouTube
+    # -------------------------
+    logger.info("Preparing to upload to YouTube...")
+
+    if not auto_upload:
+        answer = input("Upload video to YouTube? [y/n]: ").strip().lower()
+        if answer != "y":
+            logger.info("Upload cancelled.")
+            return 0
+
+    logger.info("Uploading to YouTube...")
+    video_id = pipeline.upload(result.narration, result.video_file)
+
+    if video_id:
+        logger.info("YouTube upload completed!")
+    else:
+        logger.info("Video queued for the upload daemon (python upload_queue.py)")
+    logger.info("Pipeline completed successfully!")
+    return 0
+
 
 # -------------------------
-# Upload to YouTube
+# Batch mode
+# Runs fetch / tts / render / upload as overlapping stages,
+# each with its own concurrency limit. Uploads only with -y.
 # -------------------------
-logger.info("Preparing to upload to YouTube...")
-PLAYLIST_ID = os.getenv("YT_PLAYLIST_ID")
-
-if not auto_upload:
-    answer = input("Upload video to YouTube? [y/n]: ").strip().lower()
-    if answer != "y":
-        logger.info("Upload cancelled.")
-        sys.exit(0)
-
-logger.info("Uploading to YouTube...")
-
-yt_cmd = [
-    "python",
-    YT_SCRIPT,
-    video_file,
-    PLAYLIST_ID,
-    primary_substance,
-]
-
-if frontend_experience_url:
-    yt_cmd.append(frontend_experience_url)
-
-subprocess.run(yt_cmd, check=True)
-
-logger.info("YouTube upload completed!")
-logger.info("Pipeline completed successfully!")
+def run_batch(pipeline: Pipeline, experience_urls: list[str | None], auto_upload: bool) -> int:
+    logger.info("Starting batch of %d reports", len(experience_urls))
+
+    items = BatchRunner(pipeline, upload=auto_upload).run(experience_urls)
+
+    for item in items:
+        if item.error:
+            logger.error("[%d] %s -> %s", item.index, item.experience_url, item.error)
+        else:
+            print(item.video_file, flush=True)
+
+    return 1 if any(item.error for item in items) else 0
+
+
+def main() -> int:
+    # -------------------------
+    # Parse arguments
+    # -------------------------
+    experience_url = None
+    auto_upload = False
+    use_gemini = False
+    worker_mode = False
+    batch_file = None
+    batch_count = 0
+    corpus_filter = {}
+    render_profile = RENDER_PROFILE
+
+    args = iter(sys.argv[1:])
+    for arg in args:
+        if arg == "-y":
+            auto_upload = True
+        elif arg == "-g":
+            use_gemini = True
+        elif arg == "-w":
+            worker_mode = True
+        elif arg == "-b":
+            batch_file = next(args, None)
+        elif arg == "-n":
+            batch_count = int(next(args, "0"))
+        elif arg == "-s":
+            corpus_filter["substance"] = next(args, None)
+        elif arg == "-p":
+            render_profile = next(args, RENDER_PROFILE)
+        elif arg == "-l":
+            min_words, _, max_words = next(args, "").partition("-")
+            corpus_filter["min_words"] = int(min_words) if min_words else None
+            corpus_filter["max_words"] = int(max_words) if max_words else None
+        else:
+            experience_url = unquote(arg)
+
+    try:
+        pipeline = Pipeline(
+            use_gemini=use_gemini,
+            playlist_id=PLAYLIST_ID,
+            render_profile=render_profile,
+        )
+    except AssetError as e:
+        logger.error("Asset check failed: %s", e)
+        return 1
+    except ValueError as e:
+        logger.error("%s", e)
+        return 1
+
+    if worker_mode:
+        return run_worker(pipeline, auto_upload)
+
+    if batch_file or batch_count:
+        experience_urls = [unquote(url) for url in read_url_file(batch_file)] if batch_file else []
+
+        if corpus_filter:
+            # Pick unrendered reports from the local corpus, no network needed
+            experience_urls += get_corpus().query(
+                unrendered=True,
+                limit=batch_count or None,
+                **corpus_filter,
+            )
+        else:
+            experience_urls += [None] * batch_count
+
+        return run_batch(pipeline, experience_urls, auto_upload)
+
+    return run_once(pipeline, experience_url, auto_upload)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
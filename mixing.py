@@ -0,0 +1,263 @@
+import os
+import logging
+import tempfile
+
+import numpy as np
+import soundfile as sf
+from dotenv import load_dotenv
+from scipy.ndimage import minimum_filter1d, uniform_filter1d
+from scipy.signal import lfilter
+
+from music_cache import iter_decoded, load_music_bed
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# -------------------------
+# Config
+# -------------------------
+# Mix music + narration here and hand the renderer one finished track
+MIX_AUDIO = os.getenv("MIX_AUDIO", "1") == "1"
+
+MIX_SAMPLE_RATE = 48000
+MIX_CHANNELS = 2
+
+MUSIC_VOLUME = 0.05
+
+# Equal-power crossfade where the music loops back to its start
+LOOP_CROSSFADE = float(os.getenv("MIX_LOOP_CROSSFADE", "2.0"))
+
+# Extra music attenuation while the narrator is speaking
+DUCK_DB = float(os.getenv("MIX_DUCK_DB", "-6"))
+DUCK_THRESHOLD_DB = -40.0
+DUCK_ATTACK = 0.05
+DUCK_RELEASE = 0.4
+
+# Integrated loudness of the final mix (YouTube plays back at -14)
+TARGET_LUFS = float(os.getenv("MIX_TARGET_LUFS", "-14"))
+PEAK_CEILING_DB = -1.0
+
+FRAME_SECONDS = 0.01
+
+# Samples per processing block (10 s); a multiple of the duck frame
+# and the 100 ms loudness step, so block edges line up with both
+MIX_BLOCK = MIX_SAMPLE_RATE * 10
+
+
+def mix_settings() -> dict:
+    return {
+        "sample_rate": MIX_SAMPLE_RATE,
+        "music_volume": MUSIC_VOLUME,
+        "crossfade": LOOP_CROSSFADE,
+        "duck_db": DUCK_DB,
+        "target_lufs": TARGET_LUFS,
+        "ceiling_db": PEAK_CEILING_DB,
+    }
+
+def db_to_gain(db: float) -> float:
+    return 10 ** (db / 20)
+
+# -------------------------
+# Loop
+# -------------------------
+def tile_range(music: np.ndarray, start: int, stop: int, length: int, crossfade: int) -> np.ndarray:
+    # Samples [start, stop) of the bed looped out to `length`. Every
+    # repeat after the first starts with the old tail fading into the
+    # head, so the loop is [head + body] then [seam + body]... Only
+    # the requested range is built; `music` may be memory-mapped.
+    total = len(music)
+    crossfade = min(crossfade, total // 2)
+    index = np.arange(start, stop)
+
+    if length <= total:
+        return np.array(music[start:stop])
+    if crossfade <= 0:
+        return music[index % total]
+
+    first = total - crossfade
+    position = np.where(index < first, index, (index - first) % first)
+    out = np.array(music[position])
+
+    seam = (index >= first) & (position < crossfade)
+    if seam.any():
+        t = np.linspace(0, np.pi / 2, crossfade, dtype=np.float32)[position[seam]][:, None]
+        head = music[position[seam]]
+        tail = music[first + position[seam]]
+        out[seam] = head * np.sin(t) + tail * np.cos(t)
+
+    return out
+
+def tile_with_crossfade(music: np.ndarray, length: int, crossfade: int) -> np.ndarray:
+    return tile_range(music, 0, length, length, crossfade)
+
+# -------------------------
+# Sidechain duck
+# -------------------------
+def frame_rms(voice: np.ndarray, hop: int) -> np.ndarray:
+    # RMS of the mono voice per hop-sized frame; a short last frame
+    # is zero-padded
+    mono = voice.mean(axis=1) if voice.ndim > 1 else voice
+    count = -(-len(mono) // hop)
+    frames = np.zeros(count * hop, dtype=np.float32)
+    frames[: len(mono)] = mono
+    return np.sqrt(np.mean(frames.reshape(count, hop) ** 2, axis=1))
+
+def duck_gains(rms: np.ndarray) -> np.ndarray:
+    gain = np.where(rms > db_to_gain(DUCK_THRESHOLD_DB), db_to_gain(DUCK_DB), 1.0)
+
+    # Hold the duck across short gaps (release), start it slightly
+    # early (look-ahead), then smooth the steps (attack)
+    gain = minimum_filter1d(gain, size=max(1, int(DUCK_RELEASE / FRAME_SECONDS)))
+    return uniform_filter1d(gain, size=max(1, int(DUCK_ATTACK / FRAME_SECONDS)))
+
+def envelope_range(gains: np.ndarray, hop: int, start: int, stop: int) -> np.ndarray:
+    # Per-sample gain for [start, stop), interpolated between frame
+    # centres; only the frames around the range are touched
+    low = max(0, start // hop - 1)
+    high = min(len(gains), stop // hop + 2)
+    positions = (np.arange(low, high) + 0.5) * hop
+    return np.interp(np.arange(start, stop), positions, gains[low:high]).astype(np.float32)
+
+def duck_envelope(voice: np.ndarray, sr: int, length: int) -> np.ndarray:
+    hop = max(1, int(sr * FRAME_SECONDS))
+    return envelope_range(duck_gains(frame_rms(voice, hop)), hop, 0, length)
+
+# -------------------------
+# Loudness (ITU-R BS.1770, K-weighted, gated)
+# -------------------------
+# Pre-filter (high shelf) and RLB high-pass at 48 kHz
+_K_SHELF = (
+    [1.53512485958697, -2.69169618940638, 1.19839281085285],
+    [1.0, -1.69065929318241, 0.73248077421585],
+)
+_K_HIGHPASS = (
+    [1.0, -2.0, 1.0],
+    [1.0, -1.99004745483398, 0.99007225036621],
+)
+
+class LoudnessMeter:
+    # Fed block by block: the K-weighting filters carry their state
+    # (zi) across blocks, and only the energy of each 100 ms step is
+    # kept, so memory doesn't grow with the signal's sample count
+
+    def __init__(self, sr: int = MIX_SAMPLE_RATE, channels: int = MIX_CHANNELS):
+        if sr != 48000:
+            raise ValueError("Loudness filter coefficients are defined for 48 kHz")
+        self.step = int(0.1 * sr)
+        self._shelf_zi = np.zeros((2, channels))
+        self._highpass_zi = np.zeros((2, channels))
+        self._carry = np.zeros(0)
+        self._steps = []
+
+    def add(self, block: np.ndarray):
+        weighted, self._shelf_zi = lfilter(*_K_SHELF, block, axis=0, zi=self._shelf_zi)
+        weighted, self._highpass_zi = lfilter(*_K_HIGHPASS, weighted, axis=0, zi=self._highpass_zi)
+
+        power = np.concatenate([self._carry, (weighted ** 2).sum(axis=1)])
+        count = len(power) // self.step
+        self._steps.append(power[: count * self.step].reshape(count, self.step).sum(axis=1))
+        self._carry = power[count * self.step:]
+
+    def integrated(self) -> float:
+        # 400 ms blocks, 75% overlap: four consecutive steps each
+        steps = np.concatenate(self._steps) if self._steps else np.zeros(0)
+        if len(steps) < 4:
+            return float("-inf")
+
+        power = (steps[:-3] + steps[1:-2] + steps[2:-1] + steps[3:]) / (4 * self.step)
+
+        with np.errstate(divide="ignore"):
+            loudness = -0.691 + 10 * np.log10(power)
+
+        gated = power[loudness > -70]
+        if gated.size == 0:
+            return float("-inf")
+
+        relative = -0.691 + 10 * np.log10(gated.mean()) - 10
+        gated = power[(loudness > -70) & (loudness > relative)]
+        return float(-0.691 + 10 * np.log10(gated.mean()))
+
+def integrated_loudness(audio: np.ndarray, sr: int = MIX_SAMPLE_RATE) -> float:
+    meter = LoudnessMeter(sr, audio.shape[1])
+    for offset in range(0, len(audio), MIX_BLOCK):
+        meter.add(audio[offset:offset + MIX_BLOCK])
+    return meter.integrated()
+
+def loudness_gain(loudness: float, peak: float, target: float = TARGET_LUFS) -> float:
+    if not np.isfinite(loudness):
+        return 1.0
+
+    gain = db_to_gain(target - loudness)
+    ceiling = db_to_gain(PEAK_CEILING_DB)
+    if peak * gain > ceiling:
+        # No limiter; stay under the ceiling and land a bit quieter
+        logger.info("Loudness gain capped by peak ceiling")
+        gain = ceiling / peak
+
+    logger.info("Mix loudness %.1f LUFS -> gain %.1f dB", loudness, 20 * np.log10(gain))
+    return gain
+
+def normalize_loudness(audio: np.ndarray, sr: int = MIX_SAMPLE_RATE, target: float = TARGET_LUFS) -> np.ndarray:
+    loudness = integrated_loudness(audio, sr)
+    if not np.isfinite(loudness):
+        return audio
+    return audio * np.float32(loudness_gain(loudness, float(np.abs(audio).max()), target))
+
+# -------------------------
+# Mix
+# -------------------------
+def mix_audio(narration_file: str, music_file: str, output_file: str) -> str:
+    # Three streaming passes over MIX_BLOCK-sized blocks, so memory
+    # stays flat however long the narration is:
+    #   1. voice frame RMS -> duck gains (one value per 10 ms)
+    #   2. voice + ducked bed -> float temp file, loudness meter, peak
+    #   3. temp file * loudness gain -> 16-bit output
+    logger.info("Mixing narration with %s", music_file)
+
+    sr = MIX_SAMPLE_RATE
+    hop = int(sr * FRAME_SECONDS)
+
+    rms = []
+    length = 0
+    for block in iter_decoded(narration_file, sr, MIX_CHANNELS, MIX_BLOCK):
+        rms.append(frame_rms(block, hop))
+        length += len(block)
+    gains = duck_gains(np.concatenate(rms)) if rms else np.ones(1)
+
+    # Decoded once per track and memory-mapped; only the loop is read
+    music = load_music_bed(music_file, sr, MIX_CHANNELS)
+    crossfade = int(LOOP_CROSSFADE * sr)
+
+    meter = LoudnessMeter(sr, MIX_CHANNELS)
+    peak = 0.0
+
+    fd, raw_file = tempfile.mkstemp(
+        suffix=".wav",
+        dir=os.path.dirname(os.path.abspath(output_file)),
+    )
+    os.close(fd)
+    try:
+        # RF64: float PCM passes the 4 GB WAV limit after ~3 hours
+        with sf.SoundFile(raw_file, "w", samplerate=sr, channels=MIX_CHANNELS, format="RF64", subtype="FLOAT") as raw:
+            offset = 0
+            for voice in iter_decoded(narration_file, sr, MIX_CHANNELS, MIX_BLOCK):
+                stop = offset + len(voice)
+                bed = tile_range(music.loop, offset, stop, length, crossfade)
+                bed *= (MUSIC_VOLUME * envelope_range(gains, hop, offset, stop))[:, None]
+
+                mixed = voice + bed
+                meter.add(mixed)
+                peak = max(peak, float(np.abs(mixed).max()))
+                raw.write(mixed)
+                offset = stop
+
+        gain = np.float32(loudness_gain(meter.integrated(), peak))
+
+        with sf.SoundFile(output_file, "w", samplerate=sr, channels=MIX_CHANNELS, subtype="PCM_16") as out:
+            for block in sf.blocks(raw_file, blocksize=MIX_BLOCK, dtype="float32"):
+                out.write(block * gain)
+    finally:
+        os.remove(raw_file)
+
+    return output_file
@@ -0,0 +1,187 @@
+import os
+import re
+import glob
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+import subprocess
+from dataclasses import dataclass
+
+import numpy as np
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# -------------------------
+# Config
+# -------------------------
+MUSIC_CACHE_DIR = os.getenv("MUSIC_CACHE_DIR") or os.path.join("cache", "music")
+
+# Leading/trailing audio quieter than this is left out of the loop
+LOOP_SILENCE_DB = -50.0
+
+
+@dataclass
+class MusicBed:
+    source: str
+    samples: np.ndarray  # (frames, channels) float32, memory-mapped
+    sample_rate: int
+    loop_start: int
+    loop_end: int
+
+    @property
+    def loop(self) -> np.ndarray:
+        # A view into the mapped file; nothing is copied
+        return self.samples[self.loop_start:self.loop_end]
+
+
+# -------------------------
+# Decode
+# -------------------------
+def decode_audio(path: str, sr: int, channels: int) -> np.ndarray:
+    # ffmpeg resamples and downmixes in one go; returns (frames, channels)
+    result = subprocess.run(
+        [
+            "ffmpeg",
+            "-v", "error",
+            "-i", path,
+            "-f", "f32le",
+            "-ac", str(channels),
+            "-ar", str(sr),
+            "-",
+        ],
+        check=True,
+        stdout=subprocess.PIPE,
+    )
+    return np.frombuffer(result.stdout, dtype=np.float32).reshape(-1, channels)
+
+def iter_decoded(path: str, sr: int, channels: int, block_frames: int):
+    # Same decode as decode_audio, yielded block_frames at a time so a
+    # long narration never sits in memory whole
+    process = subprocess.Popen(
+        [
+            "ffmpeg",
+            "-v", "error",
+            "-i", path,
+            "-f", "f32le",
+            "-ac", str(channels),
+            "-ar", str(sr),
+            "-",
+        ],
+        stdout=subprocess.PIPE,
+    )
+    block_bytes = block_frames * channels * 4
+    try:
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            yield np.frombuffer(data, dtype=np.float32).reshape(-1, channels)
+    finally:
+        process.stdout.close()
+        if process.wait() != 0:
+            raise subprocess.CalledProcessError(process.returncode, "ffmpeg")
+
+# -------------------------
+# Loop points
+# -------------------------
+def find_loop_points(samples: np.ndarray, sr: int) -> tuple[int, int]:
+    hop = max(1, sr // 100)
+    count = len(samples) // hop
+    if count == 0:
+        return 0, len(samples)
+
+    frames = samples[: count * hop].reshape(count, hop, -1)
+    rms = np.sqrt(np.mean(frames ** 2, axis=(1, 2)))
+    audible = np.flatnonzero(rms > 10 ** (LOOP_SILENCE_DB / 20))
+    if audible.size == 0:
+        return 0, len(samples)
+
+    return int(audible[0]) * hop, min(len(samples), (int(audible[-1]) + 1) * hop)
+
+
+# -------------------------
+# Cache
+# One <name>-<key>.npy of decoded PCM plus a <name>-<key>.json
+# with its loop points. The key covers the mp3's size and mtime,
+# so replacing a track decodes it again and drops the old entry.
+# -------------------------
+def _cache_key(music_file: str, sr: int, channels: int) -> str:
+    stat = os.stat(music_file)
+    raw = (
+        f"{os.path.abspath(music_file)}|{stat.st_size}|{stat.st_mtime_ns}|"
+        f"{sr}|{channels}"
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+def _remove_stale(base_name: str, key: str):
+    # Older decodes of the same track (mp3 replaced or re-encoded)
+    for path in glob.glob(os.path.join(MUSIC_CACHE_DIR, f"{glob.escape(base_name)}-*")):
+        suffix = os.path.basename(path)[len(base_name) + 1:]
+        if re.fullmatch(r"[0-9a-f]{16}\.(npy|json)", suffix) and not suffix.startswith(key):
+            os.remove(path)
+
+_key_locks = {}
+_key_locks_lock = threading.Lock()
+
+def _key_lock(key: str) -> threading.Lock:
+    with _key_locks_lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+def _write_atomic(path: str, write):
+    # Unique temp name beside the target, so concurrent writers (other
+    # threads or processes) never share or truncate each other's file
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_file, path)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+def load_music_bed(music_file: str, sr: int, channels: int) -> MusicBed:
+    os.makedirs(MUSIC_CACHE_DIR, exist_ok=True)
+
+    base_name = os.path.splitext(os.path.basename(music_file))[0]
+    key = _cache_key(music_file, sr, channels)
+    pcm_file = os.path.join(MUSIC_CACHE_DIR, f"{base_name}-{key}.npy")
+    meta_file = os.path.join(MUSIC_CACHE_DIR, f"{base_name}-{key}.json")
+
+    # Renders in the same process that pick the same track decode it once
+    with _key_lock(key):
+        if not (os.path.exists(pcm_file) and os.path.exists(meta_file)):
+            logger.info("Decoding music bed: %s", music_file)
+            samples = decode_audio(music_file, sr, channels)
+            loop_start, loop_end = find_loop_points(samples, sr)
+
+            _remove_stale(base_name, key)
+
+            meta = {
+                "source": os.path.abspath(music_file),
+                "sample_rate": sr,
+                "channels": channels,
+                "frames": len(samples),
+                "loop_start": loop_start,
+                "loop_end": loop_end,
+            }
+
+            # Metadata is written last, so a half-written entry is never used
+            _write_atomic(pcm_file, lambda f: np.save(f, samples))
+            _write_atomic(meta_file, lambda f: f.write(json.dumps(meta).encode("utf-8")))
+
+    with open(meta_file, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    return MusicBed(
+        source=music_file,
+        samples=np.load(pcm_file, mmap_mode="r"),
+        sample_rate=meta["sample_rate"],
+        loop_start=meta["loop_start"],
+        loop_end=meta["loop_end"],
+    )
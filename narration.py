@@ -0,0 +1,598 @@
+import os
+import re
+import json
+import logging
+import string
+import threading
+import multiprocessing
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from dotenv import load_dotenv
+import numpy as np
+import soundfile as sf
+import torch
+from TTS.api import TTS
+from TTS.utils.manage import ModelManager
+
+from alignment import align_words
+from artifacts import ArtifactStore
+from segmenter import split_clauses
+from subtitles import (
+    Cue,
+    clean_cue_text,
+    format_srt_cue,
+    group_words,
+    read_srt,
+    split_cue,
+    write_srt,
+)
+from tts_cache import TTSCache
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# -------------------------
+# Model
+# -------------------------
+MODEL_NAME = "tts_models/en/vctk/vits"
+SPEAKER = "p232"
+
+# Segments per VITS forward pass; 1 keeps the plain tts.tts() path
+TTS_BATCH_SIZE = int(os.getenv("TTS_BATCH_SIZE", "1"))
+
+# Synthesis worker processes; 1 synthesizes in the calling process
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "1"))
+
+# Write audio + subtitles incrementally instead of concatenating at the end
+TTS_STREAM = os.getenv("TTS_STREAM", "0") == "1"
+
+# "clause" (one cue per segment), "karaoke" (ASS \k word highlighting)
+# or "words" (short cues of SUBTITLE_GROUP_WORDS words)
+SUBTITLE_MODE = os.getenv("SUBTITLE_MODE", "clause")
+SUBTITLE_GROUP_WORDS = int(os.getenv("SUBTITLE_GROUP_WORDS", "3"))
+
+# Synthesizer.tts() appends this many zero samples after every sentence;
+# the batched path adds the same tail so pacing is unchanged
+SENTENCE_PAD = 10000
+
+
+@dataclass
+class Narration:
+    audio_file: str
+    subtitle_file: str | None
+    primary_substance: str
+    experience_url: str | None = None
+    title: str | None = None
+    source_url: str | None = None
+    # Timed, cleaned cues from the synthesis loop; the renderer styles
+    # these directly instead of re-reading the SRT
+    cues: list[Cue] | None = None
+
+
+@dataclass
+class NarrationScript:
+    title: str
+    segments: list[tuple[str, float]]
+    primary_substance: str
+    audio_file: str
+    subtitle_file: str | None = None
+    experience_url: str | None = None
+    source_url: str | None = None
+    # Streamed scripts only: everything the segments are derived from,
+    # so the store can be checked before any segment exists
+    stream_source: dict | None = None
+
+
+def load_tts(progress_bar: bool = False) -> TTS:
+    logger.info("Loading TTS model: %s", MODEL_NAME)
+    return TTS(
+        model_name=MODEL_NAME,
+        progress_bar=progress_bar,
+        gpu=False
+    )
+
+_model_sample_rate = None
+
+def model_sample_rate() -> int:
+    # Read from the model's config, so a parent that only feeds the
+    # worker pool never loads the weights. Downloads the model if
+    # needed, which also keeps the workers from racing to fetch it.
+    global _model_sample_rate
+    if _model_sample_rate is None:
+        _, config_path, _ = ModelManager(progress_bar=False).download_model(MODEL_NAME)
+        with open(config_path, "r", encoding="utf-8") as f:
+            _model_sample_rate = int(json.load(f)["audio"]["sample_rate"])
+    return _model_sample_rate
+
+class TTSLoader:
+    # Loads the model on a daemon thread so fetching and text cleanup
+    # run meanwhile; get() blocks only if the load is still going.
+    # A narration restored from the store never waits on it. With a
+    # worker pool, each worker loads its own model, so only the
+    # download happens here and get() returns None.
+
+    def __init__(self, progress_bar: bool = False, workers: int = TTS_WORKERS):
+        self._done = threading.Event()
+        self._tts = None
+        self._error = None
+        self._thread = threading.Thread(
+            target=self._load,
+            args=(progress_bar, workers),
+            name="tts-load",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _load(self, progress_bar: bool, workers: int):
+        try:
+            if workers > 1:
+                model_sample_rate()
+            else:
+                self._tts = load_tts(progress_bar)
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._done.set()
+
+    def get(self) -> TTS | None:
+        if not self._done.is_set():
+            logger.info("Waiting for TTS model load")
+            self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._tts
+
+def resolve_tts(tts: TTS | TTSLoader | None, workers: int = TTS_WORKERS) -> TTS | None:
+    # None when synthesis runs in the worker pool
+    if isinstance(tts, TTSLoader):
+        return tts.get()
+    if tts is None and workers <= 1:
+        return load_tts()
+    return tts
+
+# -------------------------
+# Helpers
+# -------------------------
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+def silence(seconds: float, sr: int):
+    return np.zeros(int(seconds * sr), dtype=np.float32)
+
+def sanitize_filename(name: str) -> str:
+    valid_chars = "-_.() %s%s" % (string.ascii_letters, string.digits)
+    return "".join(c for c in name if c in valid_chars).replace(" ", "_")
+
+# -------------------------
+# Batched synthesis
+# -------------------------
+def synthesize_batch(tts: TTS, texts: list[str], speaker: str = SPEAKER) -> list[np.ndarray]:
+    model = tts.synthesizer.tts_model
+    hop_length = model.config.audio.hop_length
+    speaker_id = model.speaker_manager.name_to_id[speaker]
+
+    token_ids = [model.tokenizer.text_to_ids(text) for text in texts]
+    x_lengths = torch.tensor([len(ids) for ids in token_ids], dtype=torch.long)
+
+    x = torch.zeros(len(token_ids), int(x_lengths.max()), dtype=torch.long)
+    for i, ids in enumerate(token_ids):
+        x[i, : len(ids)] = torch.tensor(ids, dtype=torch.long)
+
+    speaker_ids = torch.full((len(token_ids),), speaker_id, dtype=torch.long)
+
+    with torch.no_grad():
+        outputs = model.inference(
+            x,
+            aux_input={
+                "x_lengths": x_lengths,
+                "speaker_ids": speaker_ids,
+                "d_vectors": None,
+                "language_ids": None,
+                "durations": None,
+            },
+        )
+
+    # Each item is padded to the longest one; y_mask marks its real frames
+    frame_counts = outputs["y_mask"].sum(dim=(1, 2)).long().tolist()
+    waveforms = outputs["model_outputs"].squeeze(1).cpu().numpy()
+
+    wavs = []
+    for i, frames in enumerate(frame_counts):
+        wav = waveforms[i, : frames * hop_length].astype(np.float32)
+        wavs.append(np.concatenate([wav, np.zeros(SENTENCE_PAD, dtype=np.float32)]))
+
+    return wavs
+
+def synthesize_group(
+    tts: TTS,
+    texts: list[str],
+    speaker: str = SPEAKER,
+    batch_size: int = 1,
+) -> list[np.ndarray]:
+    if batch_size <= 1:
+        wavs = []
+        for text in texts:
+            logger.debug("Synthesizing: %s...", text[:40])
+            wavs.append(tts.tts(text=text, speaker=speaker))
+        return wavs
+
+    logger.debug("Synthesizing batch of %d segments", len(texts))
+
+    # Sort by length so padding inside the batch stays small
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    wavs = synthesize_batch(tts, [texts[i] for i in order], speaker)
+
+    by_index = dict(zip(order, wavs))
+    return [by_index[i] for i in range(len(texts))]
+
+# -------------------------
+# Process pool synthesis
+# -------------------------
+_worker_tts = None
+_pool = None
+_pool_workers = 0
+
+def _init_worker(threads: int):
+    global _worker_tts
+    torch.set_num_threads(threads)
+    _worker_tts = load_tts()
+
+def _synthesize_job(job):
+    index, texts, speaker, batch_size = job
+    wavs = synthesize_group(_worker_tts, texts, speaker, batch_size)
+    return index, [np.asarray(wav, dtype=np.float32) for wav in wavs]
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    # Kept for the life of the process so each worker loads the model once
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        if _pool is not None:
+            _pool.shutdown()
+
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        logger.info(
+            "Starting %d TTS workers (%d threads each)", workers, threads
+        )
+        _pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(threads,),
+        )
+        _pool_workers = workers
+
+    return _pool
+
+def iter_segment_audio(
+    tts: TTS | None,
+    segments: list[tuple[str, float]],
+    speaker: str = SPEAKER,
+    batch_size: int = 1,
+    workers: int = 1,
+    cache: TTSCache | None = None,
+):
+    ready = {}
+    if cache is not None:
+        for index, (text, _) in enumerate(segments):
+            wav = cache.get(MODEL_NAME, speaker, text)
+            if wav is not None:
+                ready[index] = wav
+
+    pending = [index for index in range(len(segments)) if index not in ready]
+
+    group_size = max(batch_size, 1)
+    groups = [
+        pending[offset:offset + group_size]
+        for offset in range(0, len(pending), group_size)
+    ]
+
+    if workers > 1 and groups:
+        jobs = [
+            (group_index, [segments[i][0] for i in group], speaker, batch_size)
+            for group_index, group in enumerate(groups)
+        ]
+        # map() yields in submission order, so reassembly is sequential
+        results = get_pool(workers).map(_synthesize_job, jobs)
+    else:
+        results = (
+            (group_index, synthesize_group(tts, [segments[i][0] for i in group], speaker, batch_size))
+            for group_index, group in enumerate(groups)
+        )
+
+    next_index = 0
+
+    for group_index, wavs in results:
+        for index, wav in zip(groups[group_index], wavs):
+            ready[index] = wav
+            if cache is not None:
+                cache.put(MODEL_NAME, speaker, segments[index][0], wav)
+
+        while next_index in ready:
+            text, pause = segments[next_index]
+            yield text, pause, ready.pop(next_index)
+            next_index += 1
+
+    while next_index < len(segments):
+        text, pause = segments[next_index]
+        yield text, pause, ready.pop(next_index)
+        next_index += 1
+
+def dedupe_blocks(blocks: Iterable[list[tuple[str, float]]]):
+    # Lazy, so blocks still arriving from a producer are deduped
+    # against the tail of the previous block
+    last_spoken = None
+
+    for block in blocks:
+        result = []
+        for text, pause in block:
+            normalized = normalize_text(text).lower()
+            if normalized == last_spoken:
+                logger.warning("Skipping duplicate segment: %s", text[:60])
+                continue
+
+            last_spoken = normalized
+            result.append((text, pause))
+
+        yield result
+
+def dedupe_segments(segments: list[tuple[str, float]]) -> list[tuple[str, float]]:
+    return next(dedupe_blocks([segments]))
+
+# -------------------------
+# Streaming output
+# Audio and SRT cues go straight to disk as they are produced and
+# are flushed per segment, so a partial narration stays readable.
+# -------------------------
+class StreamingNarrationWriter:
+    def __init__(self, audio_filename: str, subtitle_filename: str | None, sr: int):
+        self.audio = sf.SoundFile(audio_filename, "w", samplerate=sr, channels=1)
+        self.subtitles = (
+            open(subtitle_filename, "w", encoding="utf-8")
+            if subtitle_filename else None
+        )
+        self.cue_count = 0
+
+    def write_audio(self, samples):
+        self.audio.write(np.asarray(samples, dtype=np.float32))
+
+    def write_cue(self, cue: Cue):
+        if self.subtitles is None:
+            return
+        if self.cue_count:
+            self.subtitles.write("\n")
+        self.cue_count += 1
+        self.subtitles.write(format_srt_cue(self.cue_count, cue))
+
+    def flush(self):
+        self.audio.flush()
+        if self.subtitles is not None:
+            self.subtitles.flush()
+
+    def close(self):
+        self.audio.close()
+        if self.subtitles is not None:
+            self.subtitles.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# -------------------------
+# Synthesis
+# -------------------------
+def synthesize_narration(
+    tts: TTS | None,
+    segments: list[tuple[str, float]],
+    audio_filename: str,
+    subtitle_filename: str | None = None,
+    **kwargs,
+) -> list[Cue]:
+    return synthesize_blocks(tts, [segments], audio_filename, subtitle_filename, **kwargs)
+
+def synthesize_blocks(
+    tts: TTS | None,
+    blocks: Iterable[list[tuple[str, float]]],
+    audio_filename: str,
+    subtitle_filename: str | None = None,
+    speaker: str = SPEAKER,
+    batch_size: int = TTS_BATCH_SIZE,
+    workers: int = TTS_WORKERS,
+    cache: TTSCache | None = None,
+    stream: bool = TTS_STREAM,
+    subtitle_mode: str = SUBTITLE_MODE,
+) -> list[Cue]:
+    # tts is None when only the worker pool synthesizes
+    sr = tts.synthesizer.output_sample_rate if tts is not None else model_sample_rate()
+
+    audio_parts = []
+    cues = []
+    current_time = 0.0
+
+    writer = (
+        StreamingNarrationWriter(audio_filename, subtitle_filename, sr)
+        if stream else None
+    )
+
+    # Each block is synthesized as soon as the producer hands it over,
+    # while later blocks are still being prepared
+    def segment_audio():
+        for block in dedupe_blocks(blocks):
+            yield from iter_segment_audio(
+                tts, block, speaker, batch_size, workers, cache
+            )
+
+    try:
+        for text, pause, wav in segment_audio():
+            duration = len(wav) / sr
+
+            start = current_time
+            end = start + duration
+
+            # Timing comes straight from the sample count and the text is
+            # cleaned once here, so nothing downstream rescans the SRT
+            cue = Cue(start, end, clean_cue_text(text))
+            clauses = [clean_cue_text(clause) for clause, _ in split_clauses(text)]
+            if subtitle_mode in ("karaoke", "words") or len(clauses) > 1:
+                cue.words = align_words(cue.text.split(), wav, sr, start)
+
+            # A unit packs several clauses; subtitles stay per clause
+            segment_cues = (
+                group_words(cue, SUBTITLE_GROUP_WORDS)
+                if subtitle_mode == "words" else split_cue(cue, clauses)
+            )
+            if subtitle_mode == "clause":
+                for segment_cue in segment_cues:
+                    segment_cue.words = []
+            cues.extend(segment_cues)
+            current_time = end
+
+            if writer is not None:
+                writer.write_audio(wav)
+                for segment_cue in segment_cues:
+                    writer.write_cue(segment_cue)
+            else:
+                audio_parts.append(wav)
+
+            if pause > 0:
+                if writer is not None:
+                    writer.write_audio(silence(pause, sr))
+                else:
+                    audio_parts.append(silence(pause, sr))
+                current_time += pause
+
+            if writer is not None:
+                writer.flush()
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if cache is not None:
+        logger.info("TTS cache stats: %s", cache.stats())
+
+    if writer is not None:
+        return cues
+
+    final_audio = np.concatenate(audio_parts)
+    sf.write(audio_filename, final_audio, sr)
+
+    if subtitle_filename:
+        write_srt(cues, subtitle_filename)
+
+    return cues
+
+def _narration_key(store: ArtifactStore, script: NarrationScript) -> str:
+    return store.key(
+        "narration",
+        model=MODEL_NAME,
+        speaker=SPEAKER,
+        segments=script.segments,
+        subtitles=bool(script.subtitle_file),
+        subtitle_mode=SUBTITLE_MODE,
+        group_words=SUBTITLE_GROUP_WORDS,
+    )
+
+def _stream_key(store: ArtifactStore, script: NarrationScript) -> str:
+    return store.key(
+        "narration-stream",
+        model=MODEL_NAME,
+        speaker=SPEAKER,
+        source=script.stream_source,
+        subtitles=bool(script.subtitle_file),
+        subtitle_mode=SUBTITLE_MODE,
+        group_words=SUBTITLE_GROUP_WORDS,
+    )
+
+def _restore(store: ArtifactStore, key: str, script: NarrationScript, narration: Narration) -> bool:
+    if not store.restore(key, _outputs(script)):
+        return False
+
+    logger.info("Reusing stored narration for: %s", script.title)
+    # Word timings are not in the SRT, so a restored karaoke
+    # narration burns clause-level cues
+    if script.subtitle_file:
+        narration.cues = read_srt(script.subtitle_file)
+    return True
+
+def _narration_for(script: NarrationScript) -> Narration:
+    return Narration(
+        audio_file=script.audio_file,
+        subtitle_file=script.subtitle_file,
+        primary_substance=script.primary_substance,
+        experience_url=script.experience_url,
+        title=script.title,
+        source_url=script.source_url,
+    )
+
+def _outputs(script: NarrationScript) -> dict:
+    return {".wav": script.audio_file, ".srt": script.subtitle_file}
+
+def narrate_script(
+    script: NarrationScript,
+    tts: TTS | TTSLoader | None = None,
+    cache: TTSCache | None = None,
+    store: ArtifactStore | None = None,
+) -> Narration:
+    narration = _narration_for(script)
+    outputs = _outputs(script)
+    key = None
+
+    if store is not None:
+        key = _narration_key(store, script)
+        if _restore(store, key, script, narration):
+            return narration
+
+    narration.cues = synthesize_narration(
+        resolve_tts(tts),
+        script.segments,
+        script.audio_file,
+        script.subtitle_file,
+        cache=cache,
+    )
+
+    if store is not None:
+        store.save(key, outputs)
+
+    return narration
+
+def narrate_stream(
+    script: NarrationScript,
+    blocks: Iterable[list[tuple[str, float]]],
+    tts: TTS | TTSLoader | None = None,
+    cache: TTSCache | None = None,
+    store: ArtifactStore | None = None,
+) -> Narration:
+    # script.segments fills in as blocks arrive, so the store is keyed
+    # on script.stream_source instead; a hit never pulls a block.
+    # Without a stream_source the narration is neither restored nor saved.
+    narration = _narration_for(script)
+    key = None
+
+    if store is not None and script.stream_source is not None:
+        key = _stream_key(store, script)
+        if _restore(store, key, script, narration):
+            return narration
+
+    script.segments = []
+
+    def collect():
+        for block in blocks:
+            script.segments.extend(block)
+            yield block
+
+    narration.cues = synthesize_blocks(
+        resolve_tts(tts),
+        collect(),
+        script.audio_file,
+        script.subtitle_file,
+        cache=cache,
+    )
+
+    if key is not None:
+        store.save(key, _outputs(script))
+
+    return narration
@@ -0,0 +1,133 @@
+import logging
+from dataclasses import dataclass
+
+from artifacts import get_default_store
+from assets import get_registry
+from corpus import CORPUS_DB, get_corpus
+from narration import Narration, NarrationScript, TTSLoader, narrate_script, narrate_stream
+from profiles import PROFILES, RENDER_PROFILE
+from tts_cache import get_default_cache
+from upload_queue import UPLOAD_QUEUE, get_upload_queue
+
+logger = logging.getLogger(__name__)
+
+# -------------------------
+# Stage results
+# -------------------------
+@dataclass
+class PipelineResult:
+    narration: Narration
+    video_file: str
+    video_id: str | None = None
+
+# -------------------------
+# Pipeline
+# -------------------------
+class Pipeline:
+    # Holds the TTS model (and the MoviePy / Google imports) for the
+    # lifetime of the process, so a queue of reports pays the load once.
+
+    def __init__(
+        self,
+        use_gemini: bool = False,
+        playlist_id: str | None = None,
+        render_profile: str = RENDER_PROFILE,
+    ):
+        self.use_gemini = use_gemini
+        self.playlist_id = playlist_id
+
+        if render_profile != "auto" and render_profile not in PROFILES:
+            raise ValueError(f"Unknown render profile: {render_profile}")
+        self.render_profile = render_profile
+
+        # Missing music/clips/fonts should stop the run before the
+        # model load and TTS, not after
+        self.assets = get_registry()
+        self.assets.validate()
+
+        # Loads in the background; the first synthesis waits for it,
+        # so fetching and cleanup overlap the load
+        self.tts = TTSLoader()
+
+    def prepare(self, experience_url: str | None = None) -> NarrationScript:
+        if self.use_gemini:
+            import audio_gemini
+            return audio_gemini.prepare_script(experience_url)
+
+        import audio
+        return audio.prepare_script(experience_url)
+
+    def synthesize(self, script: NarrationScript) -> Narration:
+        return narrate_script(
+            script,
+            self.tts,
+            cache=get_default_cache(),
+            store=get_default_store(),
+        )
+
+    def narrate(self, experience_url: str | None = None) -> Narration:
+        if self.use_gemini:
+            import audio_gemini
+            if audio_gemini.GEMINI_STREAM:
+                script, blocks = audio_gemini.prepare_stream(experience_url)
+                return narrate_stream(
+                    script,
+                    blocks,
+                    self.tts,
+                    cache=get_default_cache(),
+                    store=get_default_store(),
+                )
+
+        return self.synthesize(self.prepare(experience_url))
+
+    def render(self, narration: Narration) -> str:
+        import video
+        video_file = video.render_video(
+            narration.audio_file,
+            narration.subtitle_file,
+            store=get_default_store(),
+            cues=narration.cues,
+            assets=self.assets,
+            profile=self.render_profile,
+        )
+
+        if narration.source_url and CORPUS_DB:
+            get_corpus().mark_rendered(narration.source_url, video_file)
+
+        return video_file
+
+    def upload(self, narration: Narration, video_file: str) -> str | None:
+        import yt
+        title = yt.build_title(video_file, narration.primary_substance)
+
+        # Hand off to the upload daemon; rendering never waits on YouTube
+        if UPLOAD_QUEUE:
+            get_upload_queue().enqueue(
+                video_file,
+                title,
+                experience_url=narration.experience_url,
+                playlist_id=self.playlist_id,
+            )
+            return None
+
+        return yt.upload_video(
+            video_file,
+            title,
+            playlist_id=self.playlist_id,
+            experience_url=narration.experience_url,
+        )
+
+    def run(self, experience_url: str | None = None, upload: bool = False) -> PipelineResult:
+        narration = self.narrate(experience_url)
+        logger.info("Generated audio: %s", narration.audio_file)
+        logger.info("Generated subtitles: %s", narration.subtitle_file)
+        logger.info("Primary substance: %s", narration.primary_substance)
+
+        video_file = self.render(narration)
+        logger.info("Generated video: %s", video_file)
+
+        result = PipelineResult(narration=narration, video_file=video_file)
+        if upload:
+            result.video_id = self.upload(narration, video_file)
+
+        return result
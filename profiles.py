@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import logging
+import platform
+import subprocess
+import tempfile
+from dataclasses import asdict, dataclass, replace
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# -------------------------
+# Config
+# -------------------------
+# draft | upload | archive | auto
+RENDER_PROFILE = os.getenv("RENDER_PROFILE", "upload")
+
+# Auto mode: fastest preset whose sample stays under this bitrate
+AUTO_TARGET_KBPS = int(os.getenv("RENDER_AUTO_TARGET_KBPS", "8000"))
+AUTO_SAMPLE_SECONDS = 4
+AUTO_PRESETS = ["ultrafast", "superfast", "veryfast", "faster", "fast", "medium"]
+AUTO_CACHE_FILE = os.getenv("RENDER_AUTO_CACHE") or os.path.join("cache", "render_auto.json")
+
+
+@dataclass(frozen=True)
+class EncoderProfile:
+    name: str
+    codec: str = "libx264"
+    preset: str = "medium"
+    crf: int = 23
+    # "stillimage", "animation", "film", ... or None
+    tune: str | None = None
+    # Output height (width follows the aspect ratio); None keeps the source
+    height: int | None = None
+    # 0 lets the encoder use every core
+    threads: int = 0
+
+    def codec_args(self, threads: int | None = None) -> list[str]:
+        args = [
+            "-c:v", self.codec,
+            "-preset", self.preset,
+            "-crf", str(self.crf),
+        ]
+        if self.tune:
+            args += ["-tune", self.tune]
+
+        threads = self.threads if threads is None else threads
+        if threads:
+            args += ["-threads", str(threads)]
+
+        return [*args, "-pix_fmt", "yuv420p"]
+
+    def scale_filter(self) -> str | None:
+        return f"scale=-2:{self.height}" if self.height else None
+
+    def video_filter(self, subtitle_filter: str | None = None) -> str | None:
+        # Scale first so the subtitle burn happens at output resolution
+        filters = [f for f in (self.scale_filter(), subtitle_filter) if f]
+        return ",".join(filters) or None
+
+
+PROFILES = {
+    # Review copies: small and fast, quality barely matters
+    "draft": EncoderProfile("draft", preset="ultrafast", crf=32, height=480),
+    # What goes to YouTube; the original single-profile settings
+    "upload": EncoderProfile("upload", preset="medium", crf=23),
+    # Keep-forever masters
+    "archive": EncoderProfile("archive", preset="slow", crf=16, tune="animation"),
+}
+
+
+def _apply_overrides(profile: EncoderProfile) -> EncoderProfile:
+    overrides = {}
+    if os.getenv("RENDER_PRESET"):
+        overrides["preset"] = os.getenv("RENDER_PRESET")
+    if os.getenv("RENDER_CRF"):
+        overrides["crf"] = int(os.getenv("RENDER_CRF"))
+    if os.getenv("RENDER_TUNE"):
+        overrides["tune"] = os.getenv("RENDER_TUNE")
+    if os.getenv("RENDER_THREADS"):
+        overrides["threads"] = int(os.getenv("RENDER_THREADS"))
+    return replace(profile, **overrides) if overrides else profile
+
+# -------------------------
+# Auto mode
+# Encodes a short sample with each preset (fastest first) at the
+# upload CRF and keeps the first one under AUTO_TARGET_KBPS. The
+# pick is cached per host, so the benchmark runs once.
+# -------------------------
+def _host_key() -> str:
+    return f"{platform.node()}|{platform.machine()}|{os.cpu_count()}"
+
+def benchmark_preset(sample_file: str, base: EncoderProfile, preset: str) -> tuple[float, float]:
+    profile = replace(base, preset=preset)
+    with tempfile.TemporaryDirectory() as tmp:
+        output_file = os.path.join(tmp, "sample.mp4")
+
+        started = time.perf_counter()
+        subprocess.run(
+            [
+                "ffmpeg",
+                "-y",
+                "-v", "error",
+                "-i", sample_file,
+                "-t", str(AUTO_SAMPLE_SECONDS),
+                "-an",
+                *profile.codec_args(),
+                output_file,
+            ],
+            check=True,
+        )
+        elapsed = time.perf_counter() - started
+
+        kbps = os.path.getsize(output_file) * 8 / 1000 / AUTO_SAMPLE_SECONDS
+    return elapsed, kbps
+
+def pick_auto_profile(sample_file: str) -> EncoderProfile:
+    base = PROFILES["upload"]
+
+    try:
+        with open(AUTO_CACHE_FILE, "r", encoding="utf-8") as f:
+            cached = json.load(f).get(_host_key())
+    except (FileNotFoundError, json.JSONDecodeError):
+        cached = None
+
+    if cached and cached.get("target_kbps") == AUTO_TARGET_KBPS:
+        return replace(base, name="auto", preset=cached["preset"])
+
+    chosen = AUTO_PRESETS[-1]
+    for preset in AUTO_PRESETS:
+        elapsed, kbps = benchmark_preset(sample_file, base, preset)
+        logger.info(
+            "Benchmark preset=%s: %.2fs for %ds sample, %.0f kbps",
+            preset, elapsed, AUTO_SAMPLE_SECONDS, kbps,
+        )
+        if kbps <= AUTO_TARGET_KBPS:
+            chosen = preset
+            break
+
+    logger.info("Auto render profile picked preset=%s", chosen)
+
+    os.makedirs(os.path.dirname(AUTO_CACHE_FILE) or ".", exist_ok=True)
+    with open(AUTO_CACHE_FILE, "w", encoding="utf-8") as f:
+        json.dump({_host_key(): {"preset": chosen, "target_kbps": AUTO_TARGET_KBPS}}, f)
+
+    return replace(base, name="auto", preset=chosen)
+
+# -------------------------
+# Lookup
+# -------------------------
+def get_profile(name: str = RENDER_PROFILE, sample_file: str | None = None) -> EncoderProfile:
+    if name == "auto":
+        if sample_file is None:
+            raise ValueError("Auto render profile needs a sample clip to benchmark")
+        profile = pick_auto_profile(sample_file)
+    elif name in PROFILES:
+        profile = PROFILES[name]
+    else:
+        raise ValueError(f"Unknown render profile: {name} (expected {', '.join([*PROFILES, 'auto'])})")
+
+    return _apply_overrides(profile)
+
+def describe(profile: EncoderProfile) -> dict:
+    return asdict(profile)
@@ -0,0 +1,161 @@
+import os
+import re
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# -------------------------
+# Config
+# -------------------------
+# Characters per synthesis unit; clauses are packed up to this.
+# 0 keeps one unit per clause.
+SEGMENT_MAX_CHARS = int(os.getenv("TTS_SEGMENT_CHARS", "160"))
+
+SENTENCE_PAUSE = 0.6
+CLAUSE_PAUSE = 0.15
+
+# Words that end in a period without ending the sentence
+ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "st", "jr", "sr", "prof", "vs", "approx",
+    "appx", "ca", "e.g", "i.e", "vol", "fig",
+}
+# Only abbreviations after a number ("30 min. of"); elsewhere they're
+# words ("for a min. Then")
+UNIT_ABBREVIATIONS = {"min", "hr", "hrs"}
+
+# Terminal punctuation (plus closing quotes / brackets) before a space.
+# "1.5 g", "T+1:30" and "1,000" never match: no space follows.
+_SENTENCE_END = re.compile(r"[.!?]+[\"'”’)\]]*(?=\s|$)")
+_CLAUSE_END = re.compile(r"[,;:](?=\s|$)")
+
+
+# -------------------------
+# Sentences
+# -------------------------
+def _is_abbreviation(text: str, start: int, end: int) -> bool:
+    if text[start:end] != ".":
+        return False
+
+    following = text[end:].lstrip()
+    capitalized = bool(following) and following[0].isupper()
+
+    words = text[:start].split()
+    if words:
+        token = words[-1].lstrip("(\"'")
+        previous = words[-2] if len(words) > 1 else ""
+
+        # Initials ("J. Smith", "John F. Kennedy"), but not a letter
+        # after a lowercase word ("vitamin C. Then")
+        if len(token) == 1 and token.isupper():
+            return not previous[:1].islower()
+
+        word = token.lower()
+        if word in ABBREVIATIONS:
+            return True
+
+        # "No. 5", but "I said no. Then"
+        if word == "no":
+            return following[:1].isdigit()
+
+        # A unit after a number, unless a new sentence follows ("30 min. Then")
+        if word in UNIT_ABBREVIATIONS:
+            return previous.replace(".", "").replace(",", "").isdigit() and not capitalized
+
+    # "100 ug. then" -- a sentence doesn't start in lowercase
+    return bool(following) and not capitalized and following[0].islower()
+
+def split_sentences(text: str) -> list[str]:
+    sentences = []
+    start = 0
+
+    for match in _SENTENCE_END.finditer(text):
+        if _is_abbreviation(text, match.start(), match.end()):
+            continue
+        sentence = text[start:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+# -------------------------
+# Clauses
+# -------------------------
+def split_clauses(
+    sentence: str,
+    sentence_pause: float = SENTENCE_PAUSE,
+    clause_pause: float = CLAUSE_PAUSE,
+) -> list[tuple[str, float]]:
+    clauses = []
+    start = 0
+
+    for match in _CLAUSE_END.finditer(sentence):
+        clause = sentence[start:match.end()].strip()
+        if clause:
+            clauses.append((clause, clause_pause))
+        start = match.end()
+
+    tail = sentence[start:].strip()
+    if tail:
+        pause = sentence_pause if tail.rstrip("\"'”’)]")[-1:] in ".!?" else clause_pause
+        clauses.append((tail, pause))
+    return clauses
+
+def _wrap(clause: str, max_chars: int) -> list[str]:
+    # A clause longer than the budget is cut between words
+    if max_chars <= 0 or len(clause) <= max_chars:
+        return [clause]
+
+    pieces = []
+    current = ""
+    for word in clause.split():
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+# -------------------------
+# Synthesis units
+# Clauses of one sentence are packed up to max_chars, so VITS runs
+# once per unit instead of once per comma. A unit never spans a
+# sentence; its pause is that of its last clause. split_clauses() on
+# a unit's text recovers the clauses for per-clause subtitle cues.
+# -------------------------
+def segment_text(
+    text: str,
+    max_chars: int = SEGMENT_MAX_CHARS,
+    sentence_pause: float = SENTENCE_PAUSE,
+    clause_pause: float = CLAUSE_PAUSE,
+) -> list[tuple[str, float]]:
+    units = []
+
+    for sentence in split_sentences(text):
+        current = []
+        size = 0
+
+        for clause, pause in split_clauses(sentence, sentence_pause, clause_pause):
+            pieces = _wrap(clause, max_chars)
+            for index, piece in enumerate(pieces):
+                # Cuts inside a clause get no added silence
+                piece_pause = pause if index == len(pieces) - 1 else 0.0
+
+                if current and (max_chars <= 0 or size + 1 + len(piece) > max_chars):
+                    units.append((" ".join(text for text, _ in current), current[-1][1]))
+                    current = []
+                    size = 0
+
+                current.append((piece, piece_pause))
+                size += len(piece) + (1 if size else 0)
+
+        if current:
+            units.append((" ".join(text for text, _ in current), current[-1][1]))
+
+    return units
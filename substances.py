@@ -0,0 +1,112 @@
+import re
+import logging
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# -------------------------
+# Substances + aliases
+# -------------------------
+SUBSTANCES = [
+    "LSD",
+    "DMT",
+    "5-MeO-DMT",
+    "Salvia",
+    "MDMA",
+    "Cannabis",
+    "Heroin",
+    "Cocaine",
+    "Ketamine",
+]
+
+ALIASES = {
+    "LSD": ["lsd", "lsd-25", "acid"],
+    "DMT": ["dmt", "n,n-dmt", "changa"],
+    # A different compound; its own entry keeps "dmt" from matching inside it
+    "5-MeO-DMT": ["5-meo-dmt", "5-meo"],
+    "Salvia": ["salvia", "salvia divinorum", "salvinorin"],
+    "MDMA": ["mdma", "molly", "ecstasy", "xtc"],
+    "Cannabis": ["cannabis", "marijuana", "weed", "thc"],
+    "Heroin": ["heroin", "diamorphine"],
+    "Cocaine": ["cocaine", "coke"],
+    "Ketamine": ["ketamine", "ket", "special k", "k-hole"],
+}
+
+# Weight of each dose-list entry relative to a mention in the text
+DOSE_WEIGHT = 2
+
+_CANONICAL = {
+    alias: substance
+    for substance, aliases in ALIASES.items()
+    for alias in aliases
+}
+
+# One alternation for every alias, grouped by first letter so the regex
+# engine only tries the branch that can match; longest first within a
+# group so "lsd-25" wins over "lsd". Text is lowercased once up front.
+def _build_pattern(aliases) -> re.Pattern:
+    groups = {}
+    for alias in sorted(aliases, key=len, reverse=True):
+        groups.setdefault(alias[0], []).append(re.escape(alias[1:]))
+
+    branches = "|".join(
+        f"{re.escape(first)}(?:{'|'.join(rests)})"
+        for first, rests in groups.items()
+    )
+    return re.compile(rf"\b(?:{branches})\b")
+
+_PATTERN = _build_pattern(_CANONICAL)
+
+_ORDER = {substance: i for i, substance in enumerate(SUBSTANCES)}
+
+# -------------------------
+# Scanning
+# -------------------------
+def count_substances(text: str) -> Counter:
+    counts = Counter()
+    for match in _PATTERN.finditer(text.lower()):
+        counts[_CANONICAL[match.group(0)]] += 1
+    return counts
+
+def canonical_substance(name: str) -> str | None:
+    match = _PATTERN.search(name.lower())
+    return _CANONICAL[match.group(0)] if match else None
+
+def first_substance(text: str) -> str | None:
+    return canonical_substance(text)
+
+def _most_common(counts: Counter) -> str | None:
+    if not counts:
+        return None
+    # Ties resolve in SUBSTANCES order, like the old per-substance loop
+    return max(counts, key=lambda s: (counts[s], -_ORDER.get(s, len(_ORDER))))
+
+# -------------------------
+# Classification
+# -------------------------
+def detect_primary_substance(content: str, doses: list) -> str:
+    counts = count_substances(content)
+
+    dose_substances = []
+    for d in doses:
+        sub = d.get("substance")
+        if sub:
+            dose_substances.append(sub)
+            canonical = canonical_substance(sub)
+            if canonical:
+                counts[canonical] += DOSE_WEIGHT
+
+    unique_substances = set(dose_substances)
+
+    if len(unique_substances) == 1:
+        return unique_substances.pop()
+
+    return _most_common(counts) or "Unknown"
+
+def detect_primary_substance_by_frequency(text: str) -> str | None:
+    counts = count_substances(text)
+    if not counts:
+        return None
+
+    logger.info("Substance frequency counts: %s", dict(counts))
+    return _most_common(counts)
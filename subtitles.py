@@ -0,0 +1,197 @@
+import re
+from dataclasses import dataclass, field
+
+# -------------------------
+# Style (baked into the ASS header)
+# -------------------------
+FONT_NAME = "Press Start 2P"
+FONT_SIZE = 12
+
+# Colour of karaoke words not yet spoken (ASS SecondaryColour)
+KARAOKE_COLOUR = "&HFFFFFF&"
+
+# libass' default canvas for converted SRT; keeps FONT_SIZE looking
+# the same as the old force_style burn
+PLAY_RES_X = 384
+PLAY_RES_Y = 288
+
+
+@dataclass
+class Word:
+    text: str
+    start: float
+    end: float
+
+
+@dataclass
+class Cue:
+    start: float
+    end: float
+    text: str
+    # Per-word timings for karaoke; empty for clause-level cues
+    words: list[Word] = field(default_factory=list)
+
+
+# -------------------------
+# Text cleanup (punctuation + spacing only)
+# -------------------------
+def clean_cue_text(text: str) -> str:
+    text = text.strip()
+    text = re.sub(r"\s+([,.!?])", r"\1", text)
+    text = re.sub(r"([,.!?])([A-Za-z])", r"\1 \2", text)
+    text = re.sub(r"\s+", " ", text)
+    return text
+
+def group_words(cue: Cue, size: int) -> list[Cue]:
+    # Short cues of `size` words each, timed from the word alignment
+    if not cue.words:
+        return [cue]
+
+    size = max(1, size)
+    return [
+        Cue(
+            chunk[0].start,
+            chunk[-1].end,
+            " ".join(word.text for word in chunk),
+        )
+        for chunk in (
+            cue.words[i:i + size] for i in range(0, len(cue.words), size)
+        )
+    ]
+
+def split_cue(cue: Cue, clauses: list[str]) -> list[Cue]:
+    # One cue per clause of a packed synthesis unit, timed from the
+    # word alignment; each stays up until the next one starts
+    counts = [len(clause.split()) for clause in clauses]
+    if len(clauses) < 2 or not cue.words or sum(counts) != len(cue.words):
+        return [cue]
+
+    cues = []
+    offset = 0
+    for clause, count in zip(clauses, counts):
+        if not count:
+            continue
+        words = cue.words[offset:offset + count]
+        offset += count
+        start = cue.start if not cues else words[0].start
+        cues.append(Cue(start, words[-1].end, clause, words))
+
+    for current, following in zip(cues, cues[1:]):
+        current.end = following.start
+    cues[-1].end = cue.end
+    return cues
+
+# -------------------------
+# SRT
+# -------------------------
+def format_timestamp(seconds: float) -> str:
+    ms = int((seconds % 1) * 1000)
+    s = int(seconds) % 60
+    m = (int(seconds) // 60) % 60
+    h = int(seconds) // 3600
+    return f"{h:02}:{m:02}:{s:02},{ms:03}"
+
+def format_srt_cue(index: int, cue: Cue) -> str:
+    return (
+        f"{index}\n"
+        f"{format_timestamp(cue.start)} --> {format_timestamp(cue.end)}\n"
+        f"{cue.text}\n"
+    )
+
+def write_srt(cues: list[Cue], path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(format_srt_cue(i, cue) for i, cue in enumerate(cues, 1)))
+
+def _parse_timestamp(value: str) -> float:
+    h, m, rest = value.strip().split(":")
+    s, ms = rest.replace(".", ",").split(",")
+    return int(h) * 3600 + int(m) * 60 + int(s) + int(ms) / 1000
+
+def read_srt(path: str) -> list[Cue]:
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        blocks = re.split(r"\n\s*\n", f.read().strip())
+
+    cues = []
+    for block in blocks:
+        lines = [line for line in block.splitlines() if line.strip()]
+        timing = next((i for i, line in enumerate(lines) if "-->" in line), None)
+        if timing is None:
+            continue
+
+        start, end = lines[timing].split("-->")
+        text = clean_cue_text(" ".join(lines[timing + 1:]))
+        cues.append(Cue(_parse_timestamp(start), _parse_timestamp(end), text))
+
+    return cues
+
+# -------------------------
+# ASS
+# -------------------------
+def format_ass_timestamp(seconds: float) -> str:
+    cs = int(round(seconds * 100))
+    h, cs = divmod(cs, 360000)
+    m, cs = divmod(cs, 6000)
+    s, cs = divmod(cs, 100)
+    return f"{h}:{m:02}:{s:02}.{cs:02}"
+
+def ass_colour(colour: str) -> str:
+    # "&HBBGGRR&" -> "&H00BBGGRR" (alpha first, fully opaque)
+    value = colour.strip("&").upper().removeprefix("H")
+    return f"&H{value.rjust(8, '0')}"
+
+def escape_ass_text(text: str) -> str:
+    return (
+        text.replace("{", "(")
+        .replace("}", ")")
+        .replace("\n", r"\N")
+    )
+
+def karaoke_text(cue: Cue) -> str:
+    # \k durations in centiseconds, rounded on the running total so
+    # the tags add up to the cue length
+    parts = []
+    elapsed = round(cue.start * 100)
+    for word in cue.words:
+        end = round(word.end * 100)
+        parts.append(f"{{\\k{max(0, end - elapsed)}}}{escape_ass_text(word.text)}")
+        elapsed = max(elapsed, end)
+    return " ".join(parts)
+
+def build_ass(
+    cues: list[Cue],
+    colour: str,
+    font_name: str = FONT_NAME,
+    font_size: int = FONT_SIZE,
+) -> str:
+    header = (
+        "[Script Info]\n"
+        "ScriptType: v4.00+\n"
+        f"PlayResX: {PLAY_RES_X}\n"
+        f"PlayResY: {PLAY_RES_Y}\n"
+        "WrapStyle: 0\n"
+        "ScaledBorderAndShadow: yes\n"
+        "\n"
+        "[V4+ Styles]\n"
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, "
+        "OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, "
+        "ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding\n"
+        f"Style: Default,{font_name},{font_size},{ass_colour(colour)},"
+        f"{ass_colour(KARAOKE_COLOUR)},&H00000000,&H00000000,"
+        "0,0,0,0,100,100,0,0,1,0,0,2,10,10,10,1\n"
+        "\n"
+        "[Events]\n"
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+    )
+
+    events = [
+        f"Dialogue: 0,{format_ass_timestamp(cue.start)},{format_ass_timestamp(cue.end)},"
+        f"Default,,0,0,0,,{karaoke_text(cue) if cue.words else escape_ass_text(cue.text)}\n"
+        for cue in cues
+    ]
+
+    return header + "".join(events)
+
+def write_ass(cues: list[Cue], path: str, colour: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(build_ass(cues, colour))
@@ -0,0 +1,119 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from artifacts import ArtifactStore
+
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_entry_needs_its_manifest(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ArtifactStore(os.path.join(tmp, "store"))
+        key = store.key("narration", text="hello")
+        wav = write(os.path.join(tmp, "a.wav"), b"wav" * 100)
+        srt = write(os.path.join(tmp, "a.srt"), b"1\n00:00:00,000 --> 00:00:01,000\nhello\n")
+
+        # A save that dies after the first file leaves no manifest
+        copy = shutil.copyfile
+        calls = []
+
+        def flaky_copy(src, dst):
+            calls.append(src)
+            if len(calls) == 2:
+                raise OSError("disk full")
+            return copy(src, dst)
+
+        monkeypatch.setattr(shutil, "copyfile", flaky_copy)
+        with pytest.raises(OSError):
+            store.save(key, {".wav": wav, ".srt": srt})
+        monkeypatch.setattr(shutil, "copyfile", copy)
+
+        assert os.path.exists(store._path(key, ".wav"))
+        assert not store.has(key)
+        assert not store.restore(key, {".wav": os.path.join(tmp, "out.wav")})
+
+        store.save(key, {".wav": wav, ".srt": srt})
+        assert store.has(key)
+
+        # A payload that no longer matches the manifest is not trusted
+        write(store._path(key, ".srt"), b"truncated")
+        assert not store.has(key)
+
+
+def test_restore_round_trip():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ArtifactStore(os.path.join(tmp, "store"))
+        key = store.key("narration", text="hello", speaker="p1")
+        wav = write(os.path.join(tmp, "a.wav"), b"\x00\x01" * 500)
+        srt = write(os.path.join(tmp, "a.srt"), b"subtitle")
+
+        store.save(key, {".wav": wav, ".srt": srt, ".words": None})
+
+        out = os.path.join(tmp, "restored")
+        assert store.restore(key, {".wav": os.path.join(out, "b.wav"), ".srt": os.path.join(out, "b.srt")})
+        assert read(os.path.join(out, "b.wav")) == read(wav)
+        assert read(os.path.join(out, "b.srt")) == read(srt)
+
+        # Asking for a file the entry never had is a miss
+        assert not store.restore(key, {".words": os.path.join(out, "b.json")})
+        assert not store.restore(store.key("narration", text="other"), {".wav": os.path.join(out, "c.wav")})
+
+
+def test_evicts_by_age():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ArtifactStore(os.path.join(tmp, "store"), max_age_days=1)
+        source = write(os.path.join(tmp, "a.bin"), b"x" * 100)
+
+        old = store.key("stage", n=1)
+        store.save(old, {".bin": source})
+        stale = time.time() - 2 * 86400
+        os.utime(store._path(old, ".json"), (stale, stale))
+
+        fresh = store.key("stage", n=2)
+        store.save(fresh, {".bin": source})
+
+        assert not store.has(old)
+        assert not os.path.exists(store._path(old, ".bin"))
+        assert store.has(fresh)
+
+
+def test_evicts_least_recently_used_over_size():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ArtifactStore(os.path.join(tmp, "store"), max_bytes=250, max_age_days=0)
+        source = write(os.path.join(tmp, "a.bin"), b"x" * 100)
+        keys = [store.key("stage", n=i) for i in range(3)]
+
+        for i, key in enumerate(keys[:2]):
+            store.save(key, {".bin": source})
+            os.utime(store._path(key, ".json"), (1000 + i, 1000 + i))
+
+        # Restoring the first entry makes the second the oldest
+        assert store.restore(keys[0], {".bin": os.path.join(tmp, "out.bin")})
+        store.save(keys[2], {".bin": source})
+
+        assert [store.has(key) for key in keys] == [True, False, True]
+
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_entry_needs_its_manifest(monkeypatch)
+    test_restore_round_trip()
+    test_evicts_by_age()
+    test_evicts_least_recently_used_over_size()
+    print("✅ artifacts tests passed")
@@ -0,0 +1,59 @@
+import os
+import sys
+import json
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assets import AssetError, AssetRegistry, SUBTITLE_COLOR_MAP, clip_subtitle_color
+
+
+def make_registry(root: str) -> AssetRegistry:
+    return AssetRegistry(
+        music_dir=os.path.join(root, "music"),
+        clips_dir=os.path.join(root, "clips"),
+        font_file=os.path.join(root, "fonts", "font.ttf"),
+        cache_file=os.path.join(root, "cache", "assets.json"),
+    )
+
+
+def touch(path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+
+
+def test_validate_fails_fast_on_missing_assets():
+    with tempfile.TemporaryDirectory() as root:
+        registry = make_registry(root)
+
+        with pytest.raises(AssetError, match="font"):
+            registry.validate()
+
+        touch(os.path.join(root, "fonts", "font.ttf"))
+        with pytest.raises(AssetError, match="music"):
+            registry.validate()
+
+        touch(os.path.join(root, "music", "1.mp3"))
+        with pytest.raises(AssetError, match="clips"):
+            registry.validate()
+
+
+def test_clip_subtitle_colors():
+    with tempfile.TemporaryDirectory() as root:
+        numbered = os.path.join(root, "3.mp4")
+        named = os.path.join(root, "forest.mp4")
+        styled = os.path.join(root, "sea.mp4")
+        with open(os.path.join(root, "sea.json"), "w", encoding="utf-8") as f:
+            json.dump({"color": "&H00FF00&"}, f)
+
+        assert clip_subtitle_color(numbered) == SUBTITLE_COLOR_MAP[3]
+        assert clip_subtitle_color(named) is None
+        assert clip_subtitle_color(styled) == "&H00FF00&"
+
+
+if __name__ == "__main__":
+    test_validate_fails_fast_on_missing_assets()
+    test_clip_subtitle_colors()
+    print("✅ asset tests passed")
@@ -0,0 +1,35 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chunked_render import GOP_SECONDS, build_chunk_command, plan_chunks
+
+
+def test_plan_chunks_on_keyframes():
+    plan = plan_chunks(61.5, 4)
+
+    assert [start for start, _ in plan] == [0.0, 16.0, 32.0, 48.0]
+    assert all(start % GOP_SECONDS == 0 for start, _ in plan)
+    assert abs(sum(length for _, length in plan) - 61.5) < 1e-9
+
+
+def test_plan_chunks_short_input():
+    assert plan_chunks(1.2, 8) == [(0.0, 1.2)]
+
+
+def test_chunk_command_shifts_subtitles():
+    cmd = build_chunk_command("bg.mp4", "out.mp4", 16.0, 16.0, "subtitles='a.ass'", 2)
+
+    assert cmd[cmd.index("-ss") + 1] == "16.000"
+    assert cmd[cmd.index("-vf") + 1] == (
+        "setpts=PTS+16.000/TB,subtitles='a.ass',setpts=PTS-STARTPTS"
+    )
+    assert "-an" in cmd
+
+
+if __name__ == "__main__":
+    test_plan_chunks_on_keyframes()
+    test_plan_chunks_short_input()
+    test_chunk_command_shifts_subtitles()
+    print("✅ chunked render tests passed")
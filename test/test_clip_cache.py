@@ -0,0 +1,27 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clip_cache import CLIP_FPS, CLIP_GOP, whole_gop_frames
+
+
+def test_clips_trim_to_whole_gops():
+    # 7.3 s at 30 fps is 219 frames: three GOPs are kept
+    assert whole_gop_frames(7.3) == 3 * CLIP_GOP
+    assert whole_gop_frames(8.0) == 4 * CLIP_GOP
+
+    # So every loop repeat starts on the keyframe grid
+    for duration in (2.0, 7.3, 59.99, 61.0):
+        assert whole_gop_frames(duration) % CLIP_GOP == 0
+        assert whole_gop_frames(duration) <= max(CLIP_GOP, duration * CLIP_FPS)
+
+
+def test_short_clip_fills_one_gop():
+    assert whole_gop_frames(0.5) == CLIP_GOP
+
+
+if __name__ == "__main__":
+    test_clips_trim_to_whole_gops()
+    test_short_clip_fills_one_gop()
+    print("✅ clip cache tests passed")
@@ -0,0 +1,49 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import Corpus
+
+
+def make_corpus():
+    corpus = Corpus(":memory:")
+    corpus.put("u1", {
+        "title": "Long Acid Night",
+        "author": "anon",
+        "metadata": {"age": "24"},
+        "content": "acid visuals " * 1500,
+        "doses": [{"substance": "LSD"}],
+    }, substance="LSD")
+    corpus.put("u2", {"title": "Short Walk", "content": "mushroom walk"})
+    return corpus
+
+
+def test_read_back_matches_api_shape():
+    data = make_corpus().get("u1")
+    assert data["title"] == "Long Acid Night"
+    assert data["metadata"] == {"age": "24"}
+    assert data["doses"] == [{"substance": "LSD"}]
+
+
+def test_query_filters():
+    corpus = make_corpus()
+    assert corpus.query(substance="lsd", min_words=2000, max_words=5000) == ["u1"]
+    assert corpus.query(text="mushroom") == ["u2"]
+
+    corpus.mark_rendered("u1", "output/Long_Acid_Night.mp4")
+    assert corpus.query(unrendered=True) == ["u2"]
+
+
+def test_update_reindexes_content():
+    corpus = make_corpus()
+    corpus.put("u2", {"title": "Short Walk", "content": "changed text"})
+    assert corpus.query(text="mushroom") == []
+    assert corpus.query(text="changed") == ["u2"]
+
+
+if __name__ == "__main__":
+    test_read_back_matches_api_shape()
+    test_query_filters()
+    test_update_reindexes_content()
+    print("✅ corpus tests passed")
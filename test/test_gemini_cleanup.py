@@ -0,0 +1,148 @@
+import os
+import re
+import sys
+import json
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gemini_cleanup import CleanupCache, clean_content, iter_cleaned_chunks, split_paragraph_chunks
+
+
+# -------------------------
+# Local stand-in for genai.Client
+# Echoes each chunk back as JSON; scripted replies fail chosen chunks.
+# -------------------------
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModels:
+    def __init__(self, substance="LSD", bad_replies=None):
+        self.substance = substance
+        self.bad_replies = dict(bad_replies or {})
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def generate_content(self, model, contents, config=None):
+        chunk = contents.split("Content:\n", 1)[1]
+        with self.lock:
+            self.calls.append(chunk)
+            for marker, replies in self.bad_replies.items():
+                if marker in chunk and replies:
+                    return StubResponse(replies.pop(0))
+
+        cleaned = re.sub(r"\s+", " ", chunk.replace("\n\n", "\0")).replace("\0", "\n\n")
+        return StubResponse(json.dumps({"cleaned_content": cleaned, "primary_substance": self.substance}))
+
+
+class StubClient:
+    def __init__(self, **kwargs):
+        self.models = StubModels(**kwargs)
+
+
+def report(paragraphs=6, size=300):
+    return "\n\n".join(f"Paragraph {i}." + " word" * (size // 5) for i in range(paragraphs))
+
+
+def test_chunks_follow_paragraphs():
+    content = report(paragraphs=6, size=300)
+    chunks = split_paragraph_chunks(content, max_chars=700)
+
+    assert len(chunks) == 3
+    assert all(len(chunk) <= 700 for chunk in chunks)
+    assert "\n\n".join(chunks) == content.strip()
+
+    # A single oversize paragraph is split between sentences
+    long = " ".join(f"Sentence {i} is here." for i in range(100))
+    pieces = split_paragraph_chunks(long, max_chars=200)
+    assert all(len(piece) <= 200 for piece in pieces)
+    assert all(piece.endswith(".") for piece in pieces)
+
+    # Nothing is dropped, including leading punctuation and an unended tail
+    odd = "...and then?! " + " ".join(f"Line {i} went on." for i in range(40)) + " ?! no end"
+    pieces = split_paragraph_chunks(odd, max_chars=120)
+    assert all(len(piece) <= 120 for piece in pieces)
+    assert "".join("".join(pieces).split()) == "".join(odd.split())
+
+
+def test_cleans_in_order_and_caches():
+    content = report()
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = CleanupCache(tmp)
+        client = StubClient()
+
+        cleaned, substance = clean_content(content, client, cache=cache, concurrency=3, max_chars=700)
+        assert cleaned == content
+        assert substance == "LSD"
+        assert len(client.models.calls) == 3
+
+        # Second pass is served entirely from disk
+        again = StubClient()
+        assert clean_content(content, again, cache=CleanupCache(tmp), max_chars=700)[0] == cleaned
+        assert again.models.calls == []
+
+        # A different model is a different key
+        clean_content(content, again, model="other-model", cache=cache, max_chars=700)
+        assert len(again.models.calls) == 3
+
+
+def test_bad_chunk_is_retried_alone():
+    content = report()
+    client = StubClient(bad_replies={"Paragraph 2.": ["not json", '{"cleaned_content": "short"}']})
+
+    cleaned, _ = clean_content(content, client, max_chars=700, sleep=lambda _: None)
+
+    # Two rejected replies for the middle chunk, then it succeeds
+    assert len(client.models.calls) == 5
+    assert sum("Paragraph 2." in call for call in client.models.calls) == 3
+    assert "Paragraph 2." in cleaned
+
+
+def test_falls_back_per_chunk():
+    content = report()
+    client = StubClient(
+        substance="Unknown",
+        bad_replies={"Paragraph 4.": ["```json\nnope\n```"] * 10},
+    )
+
+    cleaned, substance = clean_content(content, client, max_chars=700, sleep=lambda _: None)
+
+    # The failed chunk keeps its raw text; its neighbours are still cleaned
+    assert cleaned.split("\n\n") == content.split("\n\n")
+    assert sum("Paragraph 4." in call for call in client.models.calls) == 4
+    assert substance == "Unknown"
+
+
+def test_first_chunk_streams_before_the_rest():
+    release = threading.Event()
+
+    class SlowTail(StubModels):
+        def generate_content(self, model, contents, config=None):
+            if "Paragraph 0." not in contents:
+                release.wait(5)
+            return super().generate_content(model, contents, config)
+
+    client = StubClient()
+    client.models = SlowTail()
+
+    results = iter_cleaned_chunks(report(), client, concurrency=3, max_chars=700)
+
+    # Chunk 0 is ready while chunks 1 and 2 are still blocked
+    first = next(results)
+    assert first["cleaned_content"].startswith("Paragraph 0.")
+    assert not release.is_set()
+
+    release.set()
+    assert len(list(results)) == 2
+
+
+if __name__ == "__main__":
+    test_chunks_follow_paragraphs()
+    test_cleans_in_order_and_caches()
+    test_bad_chunk_is_retried_alone()
+    test_falls_back_per_chunk()
+    test_first_chunk_streams_before_the_rest()
+    print("✅ gemini cleanup tests passed")
@@ -0,0 +1,109 @@
+import os
+import sys
+import json
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lysergic_api import Fetcher, FetchError, LysergicClient
+
+# -------------------------
+# Local stub of the Lysergic API
+# -------------------------
+EXPERIENCE_URL = "https://www.erowid.org/experiences/exp.php?ID=1"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    failures_left = 0
+    requests_seen = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        StubHandler.requests_seen.append((self.path, body))
+
+        if StubHandler.failures_left > 0:
+            StubHandler.failures_left -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        if self.path.startswith("/api/v1/erowid/random/experience"):
+            payload = {"experience": {"url": EXPERIENCE_URL}}
+        else:
+            payload = {"data": {"title": "Stub Trip", "url": body["url"]}}
+
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_retries_then_succeeds():
+    server, base_url = start_stub()
+    StubHandler.failures_left = 2
+    StubHandler.requests_seen = []
+
+    async def run():
+        async with LysergicClient(base_url, retries=3, backoff=0.01) as client:
+            return await client.experience(EXPERIENCE_URL)
+
+    data = asyncio.run(run())
+    server.shutdown()
+
+    assert data["title"] == "Stub Trip"
+    assert len(StubHandler.requests_seen) == 3
+
+
+def test_gives_up_after_retries():
+    server, base_url = start_stub()
+    StubHandler.failures_left = 10
+
+    async def run():
+        async with LysergicClient(base_url, retries=1, backoff=0.01) as client:
+            return await client.experience(EXPERIENCE_URL)
+
+    try:
+        asyncio.run(run())
+        raised = False
+    except FetchError:
+        raised = True
+    server.shutdown()
+    StubHandler.failures_left = 0
+
+    assert raised
+
+
+def test_fetcher_prefetches_random():
+    server, base_url = start_stub()
+    StubHandler.failures_left = 0
+    StubHandler.requests_seen = []
+
+    fetcher = Fetcher(LysergicClient(base_url, backoff=0.01), prefetch_depth=2)
+    url, data = fetcher.random_experience()
+    fetcher.prefetch([EXPERIENCE_URL])
+    assert fetcher.experience(EXPERIENCE_URL)["url"] == EXPERIENCE_URL
+    fetcher.close()
+    server.shutdown()
+
+    assert url == EXPERIENCE_URL
+    assert data["url"] == EXPERIENCE_URL
+
+
+if __name__ == "__main__":
+    test_retries_then_succeeds()
+    test_gives_up_after_retries()
+    test_fetcher_prefetches_random()
+    print("✅ lysergic_api stub tests passed")
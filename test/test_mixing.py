@@ -0,0 +1,113 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mixing import (
+    DUCK_DB,
+    LoudnessMeter,
+    db_to_gain,
+    duck_envelope,
+    duck_gains,
+    envelope_range,
+    frame_rms,
+    integrated_loudness,
+    normalize_loudness,
+    tile_range,
+    tile_with_crossfade,
+)
+from music_cache import find_loop_points
+
+SR = 48000
+
+
+def test_tile_with_crossfade_length_and_seam():
+    music = np.ones((1000, 2), dtype=np.float32)
+    tiled = tile_with_crossfade(music, 3500, crossfade=100)
+
+    assert tiled.shape == (3500, 2)
+    # Equal-power fade of two identical signals never dips below 1
+    assert tiled.min() >= 0.99
+    np.testing.assert_array_equal(tiled[:900], music[:900])
+
+
+def test_tile_without_crossfade():
+    music = np.arange(10, dtype=np.float32).reshape(5, 2)
+    tiled = tile_with_crossfade(music, 12, crossfade=0)
+    np.testing.assert_array_equal(tiled[5:10], music)
+
+
+def test_duck_envelope_follows_voice():
+    voice = np.zeros((SR * 3, 1), dtype=np.float32)
+    voice[SR:2 * SR] = 0.5
+
+    gain = duck_envelope(voice, SR, len(voice))
+
+    assert gain.shape == (len(voice),)
+    assert gain[SR // 2] == 1.0
+    assert abs(gain[SR + SR // 2] - db_to_gain(DUCK_DB)) < 1e-6
+    assert gain[-1] == 1.0
+
+
+def test_loudness_reference_sine():
+    # BS.1770: a full-scale 1 kHz sine in one channel reads -3.01 LKFS
+    t = np.arange(SR * 5) / SR
+    audio = np.zeros((len(t), 2))
+    audio[:, 0] = np.sin(2 * np.pi * 1000 * t)
+
+    assert abs(integrated_loudness(audio, SR) - (-3.01)) < 0.1
+
+
+def test_normalize_loudness_hits_target():
+    t = np.arange(SR * 5) / SR
+    tone = (0.01 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    audio = np.stack([tone, tone], axis=1)
+
+    normalized = normalize_loudness(audio, SR, target=-20)
+    assert abs(integrated_loudness(normalized, SR) - (-20)) < 0.1
+
+
+def test_loop_points_skip_silence():
+    samples = np.zeros((SR * 3, 2), dtype=np.float32)
+    samples[SR // 2: 2 * SR] = 0.3
+
+    start, end = find_loop_points(samples, SR)
+    assert start == SR // 2
+    assert end == 2 * SR
+
+
+def test_blocks_match_whole_signal():
+    rng = np.random.default_rng(0)
+    music = rng.standard_normal((1000, 2)).astype(np.float32)
+    voice = np.zeros((SR * 3, 2), dtype=np.float32)
+    voice[SR // 2:2 * SR] = 0.4 * rng.standard_normal((SR + SR // 2, 2))
+
+    # Odd block edges, not aligned to frames or loop repeats
+    edges = [0, 7001, 30000, 77777, len(voice)]
+    pieces = list(zip(edges, edges[1:]))
+
+    tiled = np.concatenate([tile_range(music, a, b, len(voice), 100) for a, b in pieces])
+    np.testing.assert_allclose(tiled, tile_with_crossfade(music, len(voice), 100), atol=1e-6)
+
+    hop = SR // 100
+    gains = duck_gains(frame_rms(voice, hop))
+    envelope = np.concatenate([envelope_range(gains, hop, a, b) for a, b in pieces])
+    np.testing.assert_allclose(envelope, duck_envelope(voice, SR, len(voice)), atol=1e-6)
+
+    meter = LoudnessMeter(SR, 2)
+    for a, b in pieces:
+        meter.add(voice[a:b])
+    assert abs(meter.integrated() - integrated_loudness(voice, SR)) < 1e-6
+
+
+if __name__ == "__main__":
+    test_tile_with_crossfade_length_and_seam()
+    test_tile_without_crossfade()
+    test_duck_envelope_follows_voice()
+    test_loudness_reference_sine()
+    test_normalize_loudness_hits_target()
+    test_loop_points_skip_silence()
+    test_blocks_match_whole_signal()
+    print("✅ mixing tests passed")
@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+import tempfile
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import music_cache
+
+SR = 48000
+
+
+def test_concurrent_cold_loads_share_one_decode(monkeypatch):
+    decodes = []
+
+    def slow_decode(path, sr, channels):
+        decodes.append(path)
+        time.sleep(0.2)
+        return np.full((SR, channels), 0.25, dtype=np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        monkeypatch.setattr(music_cache, "MUSIC_CACHE_DIR", os.path.join(tmp, "cache"))
+        monkeypatch.setattr(music_cache, "decode_audio", slow_decode)
+
+        track = os.path.join(tmp, "track.mp3")
+        with open(track, "wb") as f:
+            f.write(b"not really an mp3")
+
+        beds, errors = [], []
+
+        def load():
+            try:
+                beds.append(music_cache.load_music_bed(track, SR, 2))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=load) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert len(decodes) == 1
+        assert [bed.loop.shape for bed in beds] == [(SR, 2), (SR, 2)]
+        # Only the entry itself is left, no temp files
+        assert sorted(os.path.splitext(name)[1] for name in os.listdir(music_cache.MUSIC_CACHE_DIR)) == [".json", ".npy"]
+
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as patch:
+        test_concurrent_cold_loads_share_one_decode(patch)
+    print("✅ music cache tests passed")
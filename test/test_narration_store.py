@@ -0,0 +1,88 @@
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from artifacts import ArtifactStore
+from narration import NarrationScript, narrate_stream
+
+SR = 22050
+
+
+# -------------------------
+# Stand-in for the TTS model: a short tone per segment
+# -------------------------
+class FakeTTS:
+    def __init__(self):
+        self.synthesizer = SimpleNamespace(output_sample_rate=SR)
+        self.calls = []
+
+    def tts(self, text, speaker=None):
+        self.calls.append(text)
+        return 0.1 * np.sin(np.arange(SR // 2) / 10).astype(np.float32)
+
+
+class NoTTS:
+    synthesizer = SimpleNamespace(output_sample_rate=SR)
+
+    def tts(self, text, speaker=None):
+        raise AssertionError("a restored narration must not synthesize")
+
+
+def make_script(tmp, source):
+    return NarrationScript(
+        title="Streamed",
+        segments=[],
+        primary_substance="LSD",
+        audio_file=os.path.join(tmp, "streamed.wav"),
+        subtitle_file=os.path.join(tmp, "streamed.srt"),
+        stream_source=source,
+    )
+
+
+def test_streamed_narration_is_restored():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ArtifactStore(os.path.join(tmp, "store"))
+        source = {"content": "raw report", "primary_substance": "LSD"}
+        blocks = [[("Welcome.", 0.6)], [("The walls moved.", 0.6), ("Then it ended.", 0.6)]]
+
+        tts = FakeTTS()
+        first = narrate_stream(make_script(tmp, source), iter(blocks), tts, store=store)
+        assert len(tts.calls) == 3
+        with open(first.subtitle_file, "rb") as f:
+            subtitles = f.read()
+        os.remove(first.audio_file)
+
+        # Same source: restored up front, no block is ever pulled
+        def untouched():
+            raise AssertionError("a restored narration must not pull blocks")
+            yield
+
+        again = narrate_stream(make_script(tmp, source), untouched(), NoTTS(), store=store)
+        assert os.path.exists(again.audio_file)
+        with open(again.subtitle_file, "rb") as f:
+            assert f.read() == subtitles
+        assert [cue.text for cue in again.cues] == [cue.text for cue in first.cues]
+
+        # A different source is a different narration
+        tts = FakeTTS()
+        narrate_stream(make_script(tmp, {**source, "content": "other"}), iter(blocks), tts, store=store)
+        assert len(tts.calls) == 3
+
+
+def test_stream_without_source_is_not_stored():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ArtifactStore(os.path.join(tmp, "store"))
+        narrate_stream(make_script(tmp, None), iter([[("Welcome.", 0.6)]]), FakeTTS(), store=store)
+
+        assert [name for _, _, names in os.walk(store.directory) for name in names] == []
+
+
+if __name__ == "__main__":
+    test_streamed_narration_is_restored()
+    test_stream_without_source_is_not_stored()
+    print("✅ narration store tests passed")
@@ -0,0 +1,56 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from profiles import PROFILES, get_profile
+
+
+def test_codec_args():
+    archive = PROFILES["archive"]
+    assert archive.codec_args(threads=8) == [
+        "-c:v", "libx264",
+        "-preset", "slow",
+        "-crf", "16",
+        "-tune", "animation",
+        "-threads", "8",
+        "-pix_fmt", "yuv420p",
+    ]
+    assert "-threads" not in PROFILES["upload"].codec_args()
+
+    # The default render is unchanged from before profiles existed
+    upload = PROFILES["upload"].codec_args()
+    assert upload[upload.index("-preset") + 1] == "medium"
+    assert upload[upload.index("-crf") + 1] == "23"
+
+
+def test_scale_runs_before_subtitles():
+    draft = PROFILES["draft"]
+    assert draft.video_filter("subtitles='a.ass'") == "scale=-2:480,subtitles='a.ass'"
+    assert PROFILES["upload"].video_filter() is None
+
+
+def test_env_overrides(monkeypatch):
+    monkeypatch.setenv("RENDER_CRF", "28")
+    monkeypatch.setenv("RENDER_TUNE", "stillimage")
+
+    profile = get_profile("upload")
+    assert profile.crf == 28
+    assert profile.tune == "stillimage"
+    assert profile.preset == PROFILES["upload"].preset
+
+
+def test_unknown_and_auto_without_sample():
+    with pytest.raises(ValueError):
+        get_profile("fastest")
+    with pytest.raises(ValueError):
+        get_profile("auto")
+
+
+if __name__ == "__main__":
+    test_codec_args()
+    test_scale_runs_before_subtitles()
+    test_unknown_and_auto_without_sample()
+    print("✅ profile tests passed")
@@ -0,0 +1,90 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from segmenter import segment_text, split_clauses, split_sentences
+
+
+def test_sentences_keep_doses_and_abbreviations():
+    text = (
+        "I took 1.5 g of mushrooms and 100 ug. of LSD at T+1:30. "
+        "Dr. Smith, e.g. my friend, was there! \"Wow.\" Then nothing"
+    )
+    assert split_sentences(text) == [
+        "I took 1.5 g of mushrooms and 100 ug. of LSD at T+1:30.",
+        "Dr. Smith, e.g. my friend, was there!",
+        "\"Wow.\"",
+        "Then nothing",
+    ]
+
+
+def test_sentence_final_units_and_letters():
+    assert [text for text, _ in segment_text("I took 1.5 g. Then I waited. At T+1:30, things began.", max_chars=0)] == [
+        "I took 1.5 g.", "Then I waited.", "At T+1:30,", "things began.",
+    ]
+    assert split_sentences("I took vitamin C. Then I slept.") == ["I took vitamin C.", "Then I slept."]
+    assert split_sentences("After 30 min. The walls moved.") == ["After 30 min.", "The walls moved."]
+
+    # Words that are only sometimes abbreviations
+    assert split_sentences("I said no. Then it hit me.") == ["I said no.", "Then it hit me."]
+    assert split_sentences("I sat for a min. Then I stood.") == ["I sat for a min.", "Then I stood."]
+    assert split_sentences("See No. 5 after 30 min. of waiting.") == ["See No. 5 after 30 min. of waiting."]
+
+    # Still not sentence ends: initials, and abbreviations without a number
+    assert split_sentences("J. Smith met John F. Kennedy, approx. Ten.") == [
+        "J. Smith met John F. Kennedy, approx. Ten.",
+    ]
+
+
+def test_clause_pauses():
+    assert split_clauses("Around 1,000 ft up, at 7:30: calm.", 1.0, 0.3) == [
+        ("Around 1,000 ft up,", 0.3),
+        ("at 7:30:", 0.3),
+        ("calm.", 1.0),
+    ]
+    assert split_clauses("no ending") == [("no ending", 0.15)]
+
+
+def test_clauses_packed_within_budget():
+    text = "Reported age: 25, Reported gender: Male. Welcome."
+    assert segment_text(text, max_chars=60) == [
+        ("Reported age: 25, Reported gender: Male.", 0.6),
+        ("Welcome.", 0.6),
+    ]
+
+    # Over budget: cut at the clause boundary, keeping its pause
+    assert segment_text(text, max_chars=25) == [
+        ("Reported age: 25,", 0.15),
+        ("Reported gender: Male.", 0.6),
+        ("Welcome.", 0.6),
+    ]
+
+    # 0 disables packing
+    assert len(segment_text(text, max_chars=0)) == 5
+
+
+def test_long_clause_cut_between_words():
+    units = segment_text(" ".join(["word"] * 50) + ".", max_chars=40)
+
+    assert all(len(text) <= 40 for text, _ in units)
+    assert [pause for _, pause in units[:-1]] == [0.0] * (len(units) - 1)
+    assert units[-1] == (units[-1][0], 0.6)
+    assert " ".join(text for text, _ in units).split() == ["word"] * 49 + ["word."]
+
+
+def test_unit_recovers_its_clauses():
+    (unit, _), = segment_text("First part, second part; third part.", max_chars=100)
+    assert [clause for clause, _ in split_clauses(unit)] == [
+        "First part,", "second part;", "third part.",
+    ]
+
+
+if __name__ == "__main__":
+    test_sentences_keep_doses_and_abbreviations()
+    test_sentence_final_units_and_letters()
+    test_clause_pauses()
+    test_clauses_packed_within_budget()
+    test_long_clause_cut_between_words()
+    test_unit_recovers_its_clauses()
+    print("✅ segmenter tests passed")
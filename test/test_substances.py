@@ -0,0 +1,55 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from substances import (
+    count_substances,
+    detect_primary_substance,
+    detect_primary_substance_by_frequency,
+    first_substance,
+)
+
+
+def test_aliases_counted_in_one_scan():
+    counts = count_substances("Some acid, then Molly. Later LSD-25 and a k-hole on ket.")
+    assert counts == {"LSD": 2, "MDMA": 1, "Ketamine": 2}
+
+
+def test_word_boundaries():
+    assert count_substances("placid ketchup") == {}
+
+
+def test_5_meo_dmt_is_not_dmt():
+    assert count_substances("5-MeO-DMT, later N,N-DMT") == {"5-MeO-DMT": 1, "DMT": 1}
+    assert first_substance("a 5-meo trip") == "5-MeO-DMT"
+
+
+def test_dose_weighting():
+    doses = [{"substance": "MDMA"}, {"substance": "LSD (blotter)"}]
+    assert detect_primary_substance("molly molly acid", doses) == "MDMA"
+
+
+def test_single_dose_substance_wins():
+    assert detect_primary_substance("acid acid acid", [{"substance": "Mushrooms"}]) == "Mushrooms"
+
+
+def test_ties_follow_substance_order():
+    assert detect_primary_substance("ketamine lsd", []) == "LSD"
+    assert detect_primary_substance("", []) == "Unknown"
+
+
+def test_frequency_and_first_match():
+    assert detect_primary_substance_by_frequency("nothing here") is None
+    assert first_substance("then cocaine and lsd") == "Cocaine"
+
+
+if __name__ == "__main__":
+    test_aliases_counted_in_one_scan()
+    test_word_boundaries()
+    test_5_meo_dmt_is_not_dmt()
+    test_dose_weighting()
+    test_single_dose_substance_wins()
+    test_ties_follow_substance_order()
+    test_frequency_and_first_match()
+    print("✅ substance tests passed")
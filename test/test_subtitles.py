@@ -0,0 +1,102 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alignment import align_words
+from subtitles import (
+    Cue,
+    Word,
+    ass_colour,
+    build_ass,
+    clean_cue_text,
+    format_ass_timestamp,
+    group_words,
+    karaoke_text,
+    read_srt,
+    split_cue,
+    write_srt,
+)
+
+
+def test_clean_cue_text():
+    assert clean_cue_text("  hello , world .Then  more ") == "hello, world. Then more"
+
+
+def test_srt_round_trip():
+    cues = [Cue(0.0, 1.25, "first line"), Cue(1.85, 3.5, "second, line")]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "narration.srt")
+        write_srt(cues, path)
+
+        with open(path, encoding="utf-8") as f:
+            assert f.read().startswith("1\n00:00:00,000 --> 00:00:01,250\nfirst line\n\n2\n")
+
+        assert read_srt(path) == cues
+
+
+def test_ass_timestamps_and_colour():
+    assert format_ass_timestamp(0) == "0:00:00.00"
+    assert format_ass_timestamp(3725.456) == "1:02:05.46"
+    assert ass_colour("&HFF83D1&") == "&H00FF83D1"
+
+
+def test_build_ass_bakes_style():
+    document = build_ass([Cue(0.5, 2.0, "a {tag} here")], "&H4ADFFF&")
+
+    assert "Style: Default,Press Start 2P,12,&H004ADFFF," in document
+    assert "Dialogue: 0,0:00:00.50,0:00:02.00,Default,,0,0,0,,a (tag) here\n" in document
+
+
+def test_align_words_snaps_to_gaps():
+    sr = 1000
+    rng = np.random.default_rng(0)
+    # Three bursts of "speech" separated by short gaps, plus a silent tail
+    wav = np.concatenate([
+        rng.standard_normal(300), np.zeros(60),
+        rng.standard_normal(300), np.zeros(60),
+        rng.standard_normal(300), np.zeros(200),
+    ]).astype(np.float32)
+
+    words = align_words(["one", "two", "six"], wav, sr, offset=5.0)
+
+    assert [w.text for w in words] == ["one", "two", "six"]
+    assert words[0].start == 5.0
+    assert abs(words[-1].end - (5.0 + len(wav) / sr)) < 1e-9
+    assert 5.30 <= words[0].end <= 5.36
+    assert 5.66 <= words[1].end <= 5.72
+
+
+def test_karaoke_and_word_groups():
+    cue = Cue(1.0, 2.0, "a b c", [Word("a", 1.0, 1.3), Word("b", 1.3, 1.55), Word("c", 1.55, 2.0)])
+
+    assert karaoke_text(cue) == r"{\k30}a {\k25}b {\k45}c"
+    assert group_words(cue, 2) == [Cue(1.0, 1.55, "a b"), Cue(1.55, 2.0, "c")]
+
+
+def test_split_cue_per_clause():
+    words = [Word("one,", 0.1, 0.4), Word("two", 0.6, 0.9), Word("three.", 1.0, 1.4)]
+    cue = Cue(0.0, 1.8, "one, two three.", words)
+
+    first, second = split_cue(cue, ["one,", "two three."])
+    assert (first.start, first.end, first.text) == (0.0, 0.6, "one,")
+    assert (second.start, second.end, second.text) == (0.6, 1.8, "two three.")
+    assert second.words == words[1:]
+
+    # Word counts that don't line up keep the unit as one cue
+    assert split_cue(cue, ["one, two", "three four."]) == [cue]
+
+
+if __name__ == "__main__":
+    test_clean_cue_text()
+    test_srt_round_trip()
+    test_ass_timestamps_and_colour()
+    test_build_ass_bakes_style()
+    test_align_words_snaps_to_gaps()
+    test_karaoke_and_word_groups()
+    test_split_cue_per_clause()
+    print("✅ subtitle tests passed")
@@ -0,0 +1,105 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tts_cache import TTSCache
+
+MODEL = "tts_models/en/vctk/vits"
+
+
+def segment(value, samples=1000):
+    return np.full(samples, value, dtype=np.float32)
+
+
+def age(cache, text, seconds):
+    path = cache._path(cache.key(MODEL, "p1", text))
+    os.utime(path, (seconds, seconds))
+
+
+def test_put_then_get():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TTSCache(tmp)
+        cache.put(MODEL, "p1", "Hello there.", segment(0.5))
+
+        np.testing.assert_array_equal(cache.get(MODEL, "p1", "Hello   there."), segment(0.5))
+        assert cache.get(MODEL, "p2", "Hello there.") is None
+        assert cache.get("other", "p1", "Hello there.") is None
+
+        # A new instance sees what the last one wrote
+        assert TTSCache(tmp).get(MODEL, "p1", "Hello there.") is not None
+
+
+def test_overwrite_keeps_size():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TTSCache(tmp)
+        cache.put(MODEL, "p1", "Hello.", segment(0.1))
+        size = cache.stats()["bytes"]
+
+        cache.put(MODEL, "p1", "Hello.", segment(0.2))
+        assert cache.stats()["bytes"] == size
+        assert TTSCache(tmp).stats()["bytes"] == size
+
+
+def test_evicts_least_recently_used():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TTSCache(tmp)
+        for i, text in enumerate(["a", "b", "c"]):
+            cache.put(MODEL, "p1", text, segment(i))
+            age(cache, text, 1000 + i)
+        entry = cache.stats()["bytes"] // 3
+
+        # Reading "a" makes it the newest, so "b" is now the oldest
+        assert cache.get(MODEL, "p1", "a") is not None
+
+        cache.max_bytes = 3 * entry
+        cache.put(MODEL, "p1", "d", segment(3))
+
+        assert cache.get(MODEL, "p1", "b") is None
+        for text in ["a", "c", "d"]:
+            assert cache.get(MODEL, "p1", text) is not None
+        assert cache.stats()["bytes"] == 3 * entry
+
+
+def test_size_limit():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TTSCache(tmp, max_bytes=10_000)
+        for i in range(10):
+            cache.put(MODEL, "p1", f"segment {i}", segment(i))
+            assert cache.stats()["bytes"] <= 10_000
+
+        # 4 kB segments: only the last two fit
+        kept = [i for i in range(10) if cache.get(MODEL, "p1", f"segment {i}") is not None]
+        assert kept == [8, 9]
+
+        # 0 disables the cache
+        disabled = TTSCache(os.path.join(tmp, "off"), max_bytes=0)
+        disabled.put(MODEL, "p1", "x", segment(1))
+        assert disabled.get(MODEL, "p1", "x") is None
+
+
+def test_hit_and_miss_stats():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TTSCache(tmp)
+        assert cache.stats()["hit_rate"] == 0.0
+
+        cache.get(MODEL, "p1", "x")
+        cache.put(MODEL, "p1", "x", segment(1))
+        cache.get(MODEL, "p1", "x")
+        cache.get(MODEL, "p1", "x")
+
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"]) == (2, 1)
+        assert abs(stats["hit_rate"] - 2 / 3) < 1e-9
+
+
+if __name__ == "__main__":
+    test_put_then_get()
+    test_overwrite_keeps_size()
+    test_evicts_least_recently_used()
+    test_size_limit()
+    test_hit_and_miss_stats()
+    print("✅ tts cache tests passed")
@@ -0,0 +1,224 @@
+import os
+import sys
+import json
+import time
+import tempfile
+from datetime import datetime, timezone
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yt
+from upload_queue import QUOTA_COSTS, UploadDaemon, UploadQueue, quota_day, retry_delay, seconds_until_quota_reset
+
+
+class FakeBatch:
+    def __init__(self, callback):
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        for request_id, _ in self.requests:
+            self.callback(request_id, {}, None)
+
+
+def http_error(status, reason):
+    content = json.dumps({"error": {"errors": [{"reason": reason}]}}).encode("utf-8")
+    return HttpError(httplib2.Response({"status": status}), content)
+
+
+def fake_insert(outcomes):
+    # Stands in for yt.insert_video: each call pops the next outcome (a
+    # video id or an exception). A session is opened, and billed, unless
+    # one is saved or the API refused the insert outright
+    def insert_video(youtube, video_path, title, experience_url=None, on_new_session=None):
+        outcome = outcomes.pop(0)
+        if not yt.has_session(video_path) and not yt.is_quota_error(outcome):
+            on_new_session()
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    return insert_video
+
+
+class FakeYouTube:
+    def __init__(self):
+        self.batches = []
+
+    def new_batch_http_request(self, callback):
+        batch = FakeBatch(callback)
+        self.batches.append(batch)
+        return batch
+
+    def playlistItems(self):
+        return self
+
+    def insert(self, part, body):
+        return body
+
+
+def test_queue_survives_reopen():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "queue.sqlite3")
+        queue = UploadQueue(path)
+        first = queue.enqueue("a.mp4", "A", playlist_id="PL1")
+        queue.enqueue("b.mp4", "B")
+        queue.close()
+
+        queue = UploadQueue(path)
+        job = queue.next_pending()
+        assert job["id"] == first
+
+        queue.mark_uploaded(job, "vid-a")
+        second = queue.next_pending()
+        queue.mark_uploaded(second, "vid-b")
+
+        # Only videos with a playlist wait for the playlist step
+        assert queue.counts() == {"uploaded": 1, "done": 1}
+        assert [row["video_id"] for row in queue.awaiting_playlist()] == ["vid-a"]
+        queue.close()
+
+
+def test_quota_tracking():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = UploadQueue(os.path.join(tmp, "queue.sqlite3"), daily_quota=5000)
+
+        queue.record_quota("videos.insert", 3)
+        assert queue.quota_remaining() == 5000 - 3 * QUOTA_COSTS["videos.insert"]
+        assert not queue.can_afford("videos.insert")
+        assert queue.can_afford("playlistItems.insert", 4)
+
+        # Yesterday's usage doesn't count
+        assert queue.quota_remaining("2000-01-01") == 5000
+        queue.close()
+
+
+def test_quota_day_is_pacific():
+    # 03:00 UTC is still the previous day in California
+    now = datetime(2024, 3, 2, 3, 0, tzinfo=timezone.utc)
+    assert quota_day(now) == "2024-03-01"
+    assert seconds_until_quota_reset(now) == 5 * 3600
+
+
+def test_playlist_inserts_are_batched():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = UploadQueue(os.path.join(tmp, "queue.sqlite3"))
+        for i in range(5):
+            job_id = queue.enqueue(f"{i}.mp4", str(i), playlist_id="PL1")
+            queue._update(job_id, status="uploaded", video_id=f"vid-{i}")
+
+        youtube = FakeYouTube()
+        daemon = UploadDaemon(queue, batch_size=3)
+
+        assert daemon.flush_playlists(youtube) == 3
+        # The remainder waits for a full batch unless forced
+        assert daemon.flush_playlists(youtube) == 0
+        assert daemon.flush_playlists(youtube, force=True) == 2
+
+        assert len(youtube.batches) == 2
+        assert queue.counts() == {"done": 5}
+        assert queue.quota_used() == {"playlistItems.insert": 5 * QUOTA_COSTS["playlistItems.insert"]}
+        queue.close()
+
+
+def test_missing_video_fails_without_quota():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = UploadQueue(os.path.join(tmp, "queue.sqlite3"))
+        queue.enqueue(os.path.join(tmp, "gone.mp4"), "Gone")
+
+        assert UploadDaemon(queue).upload_next(youtube=None)
+        assert queue.counts() == {"failed": 1}
+        assert queue.quota_used() == {}
+        queue.close()
+
+
+def test_failed_jobs_back_off():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = UploadQueue(os.path.join(tmp, "queue.sqlite3"))
+        first = queue.enqueue("a.mp4", "A")
+        second = queue.enqueue("b.mp4", "B")
+
+        queue.mark_error(queue.next_pending(), "boom")
+        queue.mark_error(queue.next_pending(), "boom")
+
+        # Both are waiting out their delay; nothing is due yet
+        assert queue.next_pending() is None
+        assert queue.has_pending()
+
+        later = time.time() + retry_delay(1) + 1
+        assert queue.next_pending(now=later)["id"] == first
+        assert retry_delay(2) == 2 * retry_delay(1)
+        assert retry_delay(100) == retry_delay(1000)
+
+        # Failing again doubles the first job's wait, so the second goes next
+        queue.mark_error(queue.next_pending(now=later), "boom")
+        assert queue.next_pending(now=later)["id"] == second
+        queue.close()
+
+
+def test_quota_is_charged_per_new_session(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        video = os.path.join(tmp, "a.mp4")
+        open(video, "wb").close()
+
+        queue = UploadQueue(os.path.join(tmp, "queue.sqlite3"))
+        daemon = UploadDaemon(queue)
+        outcomes = [ConnectionError("dropped"), "resumed-vid"]
+        monkeypatch.setattr(yt, "insert_video", fake_insert(outcomes))
+
+        # First try opens a session (billed), then fails
+        job_id = queue.enqueue(video, "A")
+        monkeypatch.setattr(yt, "has_session", lambda path: False)
+        assert daemon.upload_next(youtube=None)
+        assert queue.quota_used() == {"videos.insert": QUOTA_COSTS["videos.insert"]}
+
+        # The retry resumes the saved session: no new charge, and it
+        # goes ahead even with no quota left for a fresh insert
+        queue._update(job_id, next_attempt_at=0)
+        queue.record_quota("videos.insert", 10)
+        monkeypatch.setattr(yt, "has_session", lambda path: True)
+        assert daemon.upload_next(youtube=None)
+
+        assert queue.counts() == {"done": 1}
+        assert queue.quota_used() == {"videos.insert": 11 * QUOTA_COSTS["videos.insert"]}
+        queue.close()
+
+
+def test_quota_exceeded_is_not_an_attempt(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        video = os.path.join(tmp, "a.mp4")
+        open(video, "wb").close()
+
+        queue = UploadQueue(os.path.join(tmp, "queue.sqlite3"))
+        queue.enqueue(video, "A")
+        monkeypatch.setattr(yt, "has_session", lambda path: False)
+        monkeypatch.setattr(yt, "insert_video", fake_insert([http_error(403, "quotaExceeded")]))
+
+        assert UploadDaemon(queue).upload_next(youtube=None)
+
+        # The job is untouched; the day's quota is booked as spent
+        job = queue.next_pending()
+        assert job["attempts"] == 0 and job["error"] is None
+        assert queue.quota_remaining() == 0
+        assert not queue.can_afford("videos.insert")
+        queue.close()
+
+
+if __name__ == "__main__":
+    test_queue_survives_reopen()
+    test_quota_tracking()
+    test_quota_day_is_pacific()
+    test_playlist_inserts_are_batched()
+    test_missing_video_fails_without_quota()
+    test_failed_jobs_back_off()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_quota_is_charged_per_new_session(monkeypatch)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_quota_exceeded_is_not_an_attempt(monkeypatch)
+    print("✅ upload queue tests passed")
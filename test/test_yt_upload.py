@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest, MediaFileUpload, build_http
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yt
+
+CHUNK = 256 * 1024
+
+# -------------------------
+# Local fake of the resumable upload protocol
+# -------------------------
+class FakeUploadHandler(BaseHTTPRequestHandler):
+    received = bytearray()
+    total = 0
+    starts = 0
+    offsets = []
+    fail_on_chunk = None
+    failures_left = 0
+
+    def _reply(self, status, headers=None, payload=None):
+        data = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _progress(self):
+        cls = FakeUploadHandler
+        if len(cls.received) == cls.total:
+            self._reply(200, {"Content-Type": "application/json"}, {"id": "fake-video"})
+        elif cls.received:
+            self._reply(308, {"Range": f"bytes=0-{len(cls.received) - 1}"})
+        else:
+            self._reply(308)
+
+    def do_POST(self):
+        cls = FakeUploadHandler
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        cls.starts += 1
+        cls.total = int(self.headers["X-Upload-Content-Length"])
+        port = self.server.server_address[1]
+        self._reply(200, {"Location": f"http://127.0.0.1:{port}/session"})
+
+    def do_PUT(self):
+        cls = FakeUploadHandler
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        content_range = self.headers.get("Content-Range", "")
+
+        if content_range.startswith("bytes */"):
+            self._progress()
+            return
+
+        start = int(content_range.split(" ")[1].split("-")[0])
+        chunk_index = start // CHUNK
+        cls.offsets.append(start)
+
+        if chunk_index == cls.fail_on_chunk and cls.failures_left > 0:
+            cls.failures_left -= 1
+            self._reply(503)
+            return
+
+        if start == len(cls.received):
+            cls.received.extend(body)
+        self._progress()
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake(fail_on_chunk=None, failures=0):
+    FakeUploadHandler.received = bytearray()
+    FakeUploadHandler.starts = 0
+    FakeUploadHandler.offsets = []
+    FakeUploadHandler.fail_on_chunk = fail_on_chunk
+    FakeUploadHandler.failures_left = failures
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeUploadHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def make_request(base_url, path):
+    media = MediaFileUpload(path, mimetype="video/*", chunksize=CHUNK, resumable=True)
+    return HttpRequest(
+        build_http(),
+        lambda resp, content: json.loads(content),
+        f"{base_url}/upload?uploadType=resumable",
+        method="POST",
+        body="{}",
+        headers={"content-type": "application/json"},
+        resumable=media,
+    )
+
+
+def make_video(tmp):
+    path = os.path.join(tmp, "video.mp4")
+    data = os.urandom(CHUNK * 4 + 1234)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path, data
+
+
+def test_retries_chunk_then_completes(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        monkeypatch.setattr(yt, "UPLOAD_SESSION_DIR", os.path.join(tmp, "sessions"))
+        path, data = make_video(tmp)
+        server, base_url = start_fake(fail_on_chunk=2, failures=2)
+
+        response = yt.run_resumable_upload(make_request(base_url, path), path, sleep=lambda _: None)
+        server.shutdown()
+
+        assert response == {"id": "fake-video"}
+        assert bytes(FakeUploadHandler.received) == data
+        assert FakeUploadHandler.offsets.count(2 * CHUNK) == 3
+        assert not os.path.exists(yt.session_path(path))
+
+
+def test_resumes_after_crash(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        monkeypatch.setattr(yt, "UPLOAD_SESSION_DIR", os.path.join(tmp, "sessions"))
+        path, data = make_video(tmp)
+        server, base_url = start_fake(fail_on_chunk=2, failures=1)
+
+        try:
+            yt.run_resumable_upload(make_request(base_url, path), path, retries=0, sleep=lambda _: None)
+            crashed = False
+        except HttpError:
+            crashed = True
+
+        assert crashed
+        assert os.path.exists(yt.session_path(path))
+
+        # A fresh request (new process) picks up the saved session
+        FakeUploadHandler.offsets = []
+        response = yt.run_resumable_upload(make_request(base_url, path), path, sleep=lambda _: None)
+        server.shutdown()
+
+        assert response == {"id": "fake-video"}
+        assert FakeUploadHandler.starts == 1
+        assert FakeUploadHandler.offsets[0] == 2 * CHUNK
+        assert bytes(FakeUploadHandler.received) == data
+        assert not os.path.exists(yt.session_path(path))
+
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_retries_chunk_then_completes(monkeypatch)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_resumes_after_crash(monkeypatch)
+    print("✅ upload tests passed")
@@ -0,0 +1,135 @@
+import os
+import re
+import hashlib
+import logging
+import tempfile
+
+import numpy as np
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# -------------------------
+# Config
+# -------------------------
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR") or os.path.join("cache", "tts")
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "2048"))
+
+
+# -------------------------
+# Segment cache
+# One float32 .npy per (model, speaker, text); file mtime is the
+# LRU clock, bumped on every hit.
+# -------------------------
+class TTSCache:
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._size = sum(size for _, _, size in self._entries())
+
+    @staticmethod
+    def key(model_name: str, speaker: str, text: str) -> str:
+        normalized = re.sub(r"\s+", " ", text).strip()
+        raw = f"{model_name}\0{speaker}\0{normalized}".encode("utf-8")
+        return hashlib.sha256(raw).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.npy")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".npy"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+    def get(self, model_name: str, speaker: str, text: str) -> np.ndarray | None:
+        path = self._path(self.key(model_name, speaker, text))
+
+        try:
+            wav = np.load(path, mmap_mode="r")
+            os.utime(path)
+        except (FileNotFoundError, ValueError, OSError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return wav
+
+    def put(self, model_name: str, speaker: str, text: str, wav) -> None:
+        if self.max_bytes <= 0:
+            return
+
+        path = self._path(self.key(model_name, speaker, text))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # An overwrite replaces the old entry's bytes, not adds to them
+        try:
+            old_size = os.path.getsize(path)
+        except FileNotFoundError:
+            old_size = 0
+
+        # Write beside the target then rename, so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, np.asarray(wav, dtype=np.float32))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._size += os.path.getsize(path) - old_size
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self) -> None:
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        removed = 0
+
+        for path, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+
+        self._size = total
+        if removed:
+            logger.info("TTS cache evicted %d segments", removed)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes": self._size,
+        }
+
+
+_default_cache = None
+
+def get_default_cache() -> TTSCache | None:
+    global _default_cache
+    if TTS_CACHE_MAX_MB <= 0:
+        return None
+    if _default_cache is None:
+        _default_cache = TTSCache()
+    return _default_cache
@@ -0,0 +1,374 @@
+import os
+import sys
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# -------------------------
+# Config
+# -------------------------
+# Hand finished videos to the queue instead of uploading inline
+UPLOAD_QUEUE = os.getenv("UPLOAD_QUEUE", "0") == "1"
+UPLOAD_QUEUE_DB = os.getenv("UPLOAD_QUEUE_DB", "upload_queue.sqlite3")
+
+# Daily Data API quota (resets at midnight Pacific)
+YT_DAILY_QUOTA = int(os.getenv("YT_DAILY_QUOTA", "10000"))
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+QUOTA_COSTS = {
+    "videos.insert": 1600,
+    "playlistItems.insert": 50,
+}
+
+PLAYLIST_BATCH_SIZE = int(os.getenv("UPLOAD_PLAYLIST_BATCH", "10"))
+UPLOAD_MAX_ATTEMPTS = int(os.getenv("UPLOAD_MAX_ATTEMPTS", "5"))
+# Failed jobs wait base * 2^(attempts - 1) seconds before the next try
+UPLOAD_RETRY_BASE = float(os.getenv("UPLOAD_RETRY_BASE", "60"))
+UPLOAD_RETRY_MAX = 6 * 3600.0
+POLL_INTERVAL = 10.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    id INTEGER PRIMARY KEY,
+    video_path TEXT NOT NULL,
+    title TEXT NOT NULL,
+    experience_url TEXT,
+    playlist_id TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    video_id TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS uploads_status ON uploads (status, id);
+
+CREATE TABLE IF NOT EXISTS quota_usage (
+    day TEXT NOT NULL,
+    call TEXT NOT NULL,
+    units INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, call)
+);
+"""
+
+
+def quota_day(now: datetime | None = None) -> str:
+    return (now or datetime.now(QUOTA_TIMEZONE)).astimezone(QUOTA_TIMEZONE).date().isoformat()
+
+def retry_delay(attempts: int) -> float:
+    return min(UPLOAD_RETRY_MAX, UPLOAD_RETRY_BASE * 2 ** max(0, attempts - 1))
+
+def seconds_until_quota_reset(now: datetime | None = None) -> float:
+    now = (now or datetime.now(QUOTA_TIMEZONE)).astimezone(QUOTA_TIMEZONE)
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), QUOTA_TIMEZONE)
+    return (midnight - now).total_seconds()
+
+
+# -------------------------
+# Queue store
+# Statuses: pending -> uploaded -> done (or failed). Videos with no
+# playlist go straight to done. Rows survive restarts; an upload
+# interrupted mid-way is picked up again (and resumes through yt's
+# saved session).
+# -------------------------
+class UploadQueue:
+    def __init__(self, path: str = UPLOAD_QUEUE_DB, daily_quota: int = YT_DAILY_QUOTA):
+        self.path = path
+        self.daily_quota = daily_quota
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # -------------------------
+    # Jobs
+    # -------------------------
+    def enqueue(
+        self,
+        video_path: str,
+        title: str,
+        experience_url: str | None = None,
+        playlist_id: str | None = None,
+    ) -> int:
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                """
+                INSERT INTO uploads (video_path, title, experience_url, playlist_id, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (os.path.abspath(video_path), title, experience_url, playlist_id, now, now),
+            )
+        logger.info("Queued upload #%d: %s", cursor.lastrowid, title)
+        return cursor.lastrowid
+
+    def next_pending(self, now: float | None = None) -> sqlite3.Row | None:
+        # Jobs backing off after a failure are skipped until they're due
+        with self._lock:
+            return self._conn.execute(
+                """
+                SELECT * FROM uploads
+                WHERE status = 'pending' AND next_attempt_at <= ?
+                ORDER BY id LIMIT 1
+                """,
+                (time.time() if now is None else now,),
+            ).fetchone()
+
+    def has_pending(self) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM uploads WHERE status = 'pending' LIMIT 1"
+            ).fetchone() is not None
+
+    def awaiting_playlist(self, limit: int | None = None, now: float | None = None) -> list[sqlite3.Row]:
+        sql = "SELECT * FROM uploads WHERE status = 'uploaded' AND next_attempt_at <= ? ORDER BY id"
+        params = [time.time() if now is None else now]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _update(self, job_id: int, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE uploads SET {assignments} WHERE id = ?",
+                (*fields.values(), job_id),
+            )
+
+    def mark_uploaded(self, job: sqlite3.Row, video_id: str):
+        status = "uploaded" if job["playlist_id"] else "done"
+        self._update(job["id"], status=status, video_id=video_id, error=None)
+
+    def mark_done(self, job_id: int):
+        self._update(job_id, status="done", error=None)
+
+    def mark_error(self, job: sqlite3.Row, error: str, status: str | None = None):
+        attempts = job["attempts"] + 1
+        if status is None:
+            status = "failed" if attempts >= UPLOAD_MAX_ATTEMPTS else job["status"]
+        self._update(
+            job["id"],
+            attempts=attempts,
+            error=error,
+            status=status,
+            next_attempt_at=time.time() + retry_delay(attempts),
+        )
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) AS n FROM uploads GROUP BY status"
+            ).fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    # -------------------------
+    # Quota
+    # -------------------------
+    def record_quota(self, call: str, count: int = 1, day: str | None = None):
+        units = QUOTA_COSTS[call] * count
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO quota_usage (day, call, units) VALUES (?, ?, ?)
+                ON CONFLICT (day, call) DO UPDATE SET units = units + excluded.units
+                """,
+                (day or quota_day(), call, units),
+            )
+
+    def quota_used(self, day: str | None = None) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT call, units FROM quota_usage WHERE day = ?",
+                (day or quota_day(),),
+            ).fetchall()
+        return {row["call"]: row["units"] for row in rows}
+
+    def quota_remaining(self, day: str | None = None) -> int:
+        return self.daily_quota - sum(self.quota_used(day).values())
+
+    def can_afford(self, call: str, count: int = 1) -> bool:
+        return self.quota_remaining() >= QUOTA_COSTS[call] * count
+
+    def exhaust_quota(self, day: str | None = None):
+        # The API said the quota is gone (our count may be off, e.g.
+        # other clients share the project); book the rest of the day
+        remaining = self.quota_remaining(day)
+        if remaining <= 0:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO quota_usage (day, call, units) VALUES (?, 'quotaExceeded', ?)
+                ON CONFLICT (day, call) DO UPDATE SET units = units + excluded.units
+                """,
+                (day or quota_day(), remaining),
+            )
+
+
+# -------------------------
+# Daemon
+# Uploads one video at a time with a single cached client, then
+# adds finished videos to their playlists in batched requests.
+# Waits for the quota reset instead of burning failed calls.
+# -------------------------
+class UploadDaemon:
+    def __init__(self, queue: UploadQueue, batch_size: int = PLAYLIST_BATCH_SIZE):
+        self.queue = queue
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def upload_next(self, youtube) -> bool:
+        import yt
+
+        job = self.queue.next_pending()
+        if job is None:
+            return False
+
+        if not os.path.exists(job["video_path"]):
+            self.queue.mark_error(job, "video file missing", status="failed")
+            return True
+
+        # A saved session resumes for free; only a new one is billed
+        if not yt.has_session(job["video_path"]) and not self.queue.can_afford("videos.insert"):
+            return False
+
+        try:
+            video_id = yt.insert_video(
+                youtube,
+                job["video_path"],
+                job["title"],
+                job["experience_url"],
+                on_new_session=lambda: self.queue.record_quota("videos.insert"),
+            )
+        except Exception as e:
+            if yt.is_quota_error(e):
+                # Not the job's fault: it stays pending, untouched
+                logger.warning("YouTube quota exceeded; holding uploads until the reset")
+                self.queue.exhaust_quota()
+            else:
+                logger.exception("Upload #%d failed", job["id"])
+                self.queue.mark_error(job, str(e))
+            return True
+
+        self.queue.mark_uploaded(job, video_id)
+        return True
+
+    def flush_playlists(self, youtube, force: bool = False) -> int:
+        import yt
+
+        jobs = self.queue.awaiting_playlist(self.batch_size)
+        if not jobs or (len(jobs) < self.batch_size and not force):
+            return 0
+
+        affordable = self.queue.quota_remaining() // QUOTA_COSTS["playlistItems.insert"]
+        jobs = jobs[:affordable]
+        if not jobs:
+            return 0
+
+        by_request = {}
+
+        def on_result(request_id, response, exception):
+            job = by_request[request_id]
+            if exception is None:
+                self.queue.mark_done(job["id"])
+            elif yt.is_quota_error(exception):
+                self.queue.exhaust_quota()
+            else:
+                logger.error("Playlist insert failed for #%d: %s", job["id"], exception)
+                self.queue.mark_error(job, str(exception))
+
+        # One HTTP round trip; each item is still billed separately
+        batch = youtube.new_batch_http_request(callback=on_result)
+        for job in jobs:
+            request_id = str(job["id"])
+            by_request[request_id] = job
+            batch.add(
+                youtube.playlistItems().insert(
+                    part="snippet",
+                    body=yt.build_playlist_item(job["playlist_id"], job["video_id"]),
+                ),
+                request_id=request_id,
+            )
+
+        self.queue.record_quota("playlistItems.insert", len(jobs))
+        batch.execute()
+
+        logger.info("Added %d videos to playlists", len(jobs))
+        return len(jobs)
+
+    def run(self, poll_interval: float = POLL_INTERVAL):
+        import yt
+
+        youtube = yt.get_youtube()
+        logger.info("Upload daemon started (%s)", self.queue.counts())
+
+        while not self._stop.is_set():
+            worked = self.upload_next(youtube)
+
+            # Flush partial batches whenever the upload side is idle
+            flushed = self.flush_playlists(youtube, force=not worked)
+
+            if worked or flushed:
+                continue
+
+            if self.queue.has_pending() and not self.queue.can_afford("videos.insert"):
+                wait = seconds_until_quota_reset()
+                logger.info(
+                    "Quota exhausted (%s), sleeping %.0f min until reset",
+                    self.queue.quota_used(),
+                    wait / 60,
+                )
+                self._stop.wait(wait)
+            else:
+                self._stop.wait(poll_interval)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_upload_queue() -> UploadQueue:
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = UploadQueue()
+        return _queue
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+    )
+
+    queue = get_upload_queue()
+
+    if len(sys.argv) > 1 and sys.argv[1] == "status":
+        print(queue.counts())
+        print(f"Quota used today: {queue.quota_used()} ({queue.quota_remaining()} left)")
+        sys.exit(0)
+
+    try:
+        UploadDaemon(queue).run()
+    except KeyboardInterrupt:
+        logger.info("Upload daemon stopped")
@@ -1,10 +1,11 @@
 import sys
 import os
 import logging
-import random
 import subprocess
-import re
+from dataclasses import replace
 
+import soundfile as sf
+from dotenv import load_dotenv
 from moviepy.editor import (
     VideoFileClip,
     AudioFileClip,
@@ -12,56 +13,28 @@ from moviepy.editor import (
 )
 from moviepy.audio.fx.all import volumex, audio_loop
 
+from artifacts import ArtifactStore, file_digest, file_identity
+from assets import FONT_FILE, AssetRegistry, get_registry
+from chunked_render import render_chunked_video
+from clip_cache import build_looped_background
+from mixing import MIX_AUDIO, MUSIC_VOLUME, mix_audio, mix_settings
+from profiles import PROFILES, RENDER_PROFILE, EncoderProfile, describe, get_profile
+from subtitles import Cue, read_srt, write_ass
+
 # -------------------------
 # Logging
 # -------------------------
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# -------------------------
-# Args
-# -------------------------
-if len(sys.argv) < 2:
-    logger.error("Usage: python video.py <tts_audio_file>")
-    sys.exit(1)
-
-tts_audio_file = sys.argv[1]
-base_name = os.path.splitext(os.path.basename(tts_audio_file))[0]
-
-# SRT lives next to wav (temp/)
-subtitle_file = os.path.splitext(tts_audio_file)[0] + ".srt"
-
-# -------------------------
-# Random assets
-# -------------------------
-random_music_index = random.randint(1, 7)
-random_clip_index = random.randint(1, 5)
-
-music_file = f"music/{random_music_index}.mp3"
-clip_file = f"clips/{random_clip_index}.mp4"
+load_dotenv()
 
 # -------------------------
 # Fonts (absolute paths required)
 # -------------------------
-font_path = os.path.abspath("fonts/PressStart2P-Regular.ttf")
+font_path = os.path.abspath(FONT_FILE)
 fonts_dir = os.path.dirname(font_path)
 
-# -------------------------
-# Subtitle colors per clip (ASS: &HBBGGRR&)
-# -------------------------
-SUBTITLE_COLOR_MAP = {
-    1: "&HFF83D1&",  # neon pink
-    2: "&H4ADFFF&",  # cyan blue
-    3: "&HE042E5&",  # purple-magenta
-    4: "&H7CFF4A&",  # acid green
-    5: "&HFFD84A&",  # warm amber
-}
-
-subtitle_color = SUBTITLE_COLOR_MAP.get(
-    random_clip_index,
-    "&HFFFFFF&"
-)
-
 # -------------------------
 # Folders
 # -------------------------
@@ -71,140 +44,469 @@ OUTPUT_DIR = "output"
 os.makedirs(TEMP_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-temp_video = os.path.join(TEMP_DIR, f"{base_name}_nosubs.mp4")
-output_file = os.path.join(OUTPUT_DIR, f"{base_name}.mp4")
-
-# -------------------------
-# Clean SRT (punctuation + spacing only)
-# -------------------------
-def clean_srt(path: str):
-    logger.info("Cleaning subtitles: %s", path)
-
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-        lines = f.readlines()
-
-    cleaned = []
-    for line in lines:
-        stripped = line.strip()
-
-        if stripped.isdigit():
-            cleaned.append(line)
-            continue
-
-        if "-->" in line:
-            cleaned.append(line)
-            continue
-
-        if not stripped:
-            cleaned.append("\n")
-            continue
-
-        text = stripped
-        text = re.sub(r"\s+([,.!?])", r"\1", text)
-        text = re.sub(r"([,.!?])([A-Za-z])", r"\1 \2", text)
-        text = re.sub(r"\s+", " ", text)
-
-        cleaned.append(text + "\n")
-
-    with open(path, "w", encoding="utf-8") as f:
-        f.writelines(cleaned)
-
 # -------------------------
-# Load clips
+# Render options
 # -------------------------
-logger.info("Loading TTS audio: %s", tts_audio_file)
-tts_clip = AudioFileClip(tts_audio_file)
+# Burn subtitles during the main encode instead of a second ffmpeg pass
+SINGLE_PASS_RENDER = os.getenv("SINGLE_PASS_RENDER", "1") == "1"
 
-logger.info("Loading background music: %s", music_file)
-music_clip = AudioFileClip(music_file)
+# "moviepy", "ffmpeg" (one filtergraph, no per-frame Python) or
+# "chunked" (parallel ffmpeg encodes joined with stream copy)
+RENDER_BACKEND = os.getenv("RENDER_BACKEND", "moviepy")
 
-logger.info("Loading video clip: %s", clip_file)
-video_clip = VideoFileClip(clip_file)
+# Build the looped background by stream-copying a cached, normalized clip
+PRELOOP_BACKGROUND = os.getenv("PRELOOP_BACKGROUND", "1") == "1"
 
-# -------------------------
-# Loop video to match TTS
-# -------------------------
-loops = int(tts_clip.duration // video_clip.duration) + 1
-video_clip = video_clip.loop(n=loops).subclip(0, tts_clip.duration)
+# Leave the narration wav/srt in temp/ after rendering
+KEEP_TEMP_FILES = os.getenv("KEEP_TEMP_FILES", "0") == "1"
 
 # -------------------------
-# Loop + mix music
+# Subtitle burn filter
+# Font, size, colour and alignment are baked into the ASS
+# header, so libass only needs to find the font file.
 # -------------------------
-music_clip = audio_loop(music_clip, duration=tts_clip.duration)
-music_clip = volumex(music_clip, 0.05)
-
-combined_audio = CompositeAudioClip([music_clip, tts_clip])
-video_clip = video_clip.set_audio(combined_audio)
+def build_subtitle_filter(ass_file: str) -> str:
+    return (
+        f"subtitles='{ass_file}':"
+        f"fontsdir='{fonts_dir}'"
+    )
 
 # -------------------------
-# Export base video (NO subtitles)
+# MoviePy backend
 # -------------------------
-logger.info("Rendering base video (no subtitles)")
-video_clip.write_videofile(
-    temp_video,
-    codec="libx264",
-    audio_codec="aac",
-    preset="medium",
-    threads=4,
-    logger=None
-)
+def render_moviepy(
+    clip_file: str,
+    music_file: str,
+    tts_audio_file: str,
+    output_file: str,
+    subtitle_filter: str | None = None,
+    single_pass: bool = SINGLE_PASS_RENDER,
+    mixed_audio_file: str | None = None,
+    profile: EncoderProfile = PROFILES["upload"],
+):
+    base_name = os.path.splitext(os.path.basename(output_file))[0]
+    temp_video = os.path.join(TEMP_DIR, f"{base_name}_nosubs.mp4")
+
+    # -------------------------
+    # Load clips
+    # -------------------------
+    logger.info("Loading TTS audio: %s", tts_audio_file)
+    tts_clip = AudioFileClip(tts_audio_file)
+
+    logger.info("Loading video clip: %s", clip_file)
+    video_clip = VideoFileClip(clip_file)
+
+    # -------------------------
+    # Loop video to match TTS
+    # -------------------------
+    loops = int(tts_clip.duration // video_clip.duration) + 1
+    video_clip = video_clip.loop(n=loops).subclip(0, tts_clip.duration)
+
+    # -------------------------
+    # Loop + mix music
+    # A pre-mixed track is handed to ffmpeg as-is instead
+    # -------------------------
+    music_clip = None
+    if mixed_audio_file is None:
+        logger.info("Loading background music: %s", music_file)
+        music_clip = AudioFileClip(music_file)
+        music_clip = audio_loop(music_clip, duration=tts_clip.duration)
+        music_clip = volumex(music_clip, MUSIC_VOLUME)
+
+        combined_audio = CompositeAudioClip([music_clip, tts_clip])
+        video_clip = video_clip.set_audio(combined_audio)
+
+    # -------------------------
+    # Export
+    # Single pass hands the subtitle burn to the same ffmpeg
+    # process that encodes MoviePy's frames, so every frame is
+    # encoded once and no intermediate file is written.
+    # MoviePy 1.x stream-copies a file passed as audio=, which would
+    # put mixing.py's PCM in the MP4, so a premixed track is muxed
+    # and AAC-encoded by ffmpeg afterwards instead.
+    # -------------------------
+    premixed = mixed_audio_file is not None
+    silent_video = os.path.join(TEMP_DIR, f"{base_name}_silent.mp4")
+
+    if subtitle_filter and single_pass:
+        logger.info("Rendering with subtitles (single pass)")
+        target_file = silent_video if premixed else output_file
+        video_filter = profile.video_filter(subtitle_filter)
+    elif subtitle_filter:
+        logger.info("Rendering base video (no subtitles)")
+        target_file = temp_video
+        video_filter = profile.video_filter()
+    else:
+        logger.info("Rendering video")
+        target_file = silent_video if premixed else output_file
+        video_filter = profile.video_filter()
+
+    # Codec, preset and threads go through MoviePy's own arguments
+    ffmpeg_params = ["-crf", str(profile.crf)]
+    if profile.tune:
+        ffmpeg_params += ["-tune", profile.tune]
+    if video_filter:
+        ffmpeg_params += ["-vf", video_filter]
+
+    logger.info("Encoder profile: %s", describe(profile))
+
+    video_clip.write_videofile(
+        target_file,
+        codec=profile.codec,
+        audio_codec="aac",
+        preset=profile.preset,
+        threads=profile.threads or None,
+        audio=not premixed,
+        ffmpeg_params=ffmpeg_params,
+        logger=None
+    )
 
-video_clip.close()
-tts_clip.close()
-music_clip.close()
+    video_clip.close()
+    tts_clip.close()
+    if music_clip is not None:
+        music_clip.close()
+
+    # -------------------------
+    # Burn subtitles with FFmpeg (two-pass mode)
+    # -------------------------
+    if subtitle_filter and not single_pass:
+        logger.info("Burning subtitles")
+
+        if premixed:
+            audio_inputs = ["-i", mixed_audio_file]
+            audio_outputs = ["-map", "0:v", "-map", "1:a", "-c:a", "aac", "-shortest"]
+        else:
+            audio_inputs = []
+            audio_outputs = ["-c:a", "copy"]
+
+        ffmpeg_cmd = [
+            "ffmpeg",
+            "-y",
+            "-i", temp_video,
+            *audio_inputs,
+            "-vf", subtitle_filter,
+            *profile.codec_args(),
+            *audio_outputs,
+            output_file,
+        ]
+
+        subprocess.run(ffmpeg_cmd, check=True)
+        os.remove(temp_video)
+    elif premixed:
+        logger.info("Muxing mixed audio")
+        subprocess.run(build_mux_command(silent_video, mixed_audio_file, output_file), check=True)
+        os.remove(silent_video)
+
+def build_mux_command(video_file: str, audio_file: str, output_file: str) -> list[str]:
+    # Video is copied as-is; the mix is encoded to AAC for the MP4
+    return [
+        "ffmpeg",
+        "-y",
+        "-i", video_file,
+        "-i", audio_file,
+        "-map", "0:v",
+        "-map", "1:a",
+        "-c:v", "copy",
+        "-c:a", "aac",
+        "-shortest",
+        output_file,
+    ]
 
 # -------------------------
-# Burn subtitles with FFmpeg
+# FFmpeg backend
+# One filtergraph: looped clip + subtitle burn on the video side,
+# looped music at MUSIC_VOLUME mixed under the narration on the
+# audio side (unless mixing.py already produced the track).
+# No frames pass through Python.
 # -------------------------
-if os.path.exists(subtitle_file):
-    clean_srt(subtitle_file)
-
-    logger.info(
-        "Burning subtitles | clip=%s | color=%s",
-        random_clip_index,
-        subtitle_color
-    )
-
-    subtitle_filter = (
-        f"subtitles='{subtitle_file}':"
-        f"fontsdir='{fonts_dir}':"
-        f"force_style="
-        f"'FontName=Press Start 2P,"
-        f"FontSize=12,"
-        f"PrimaryColour={subtitle_color},"
-        f"Outline=0,"
-        f"Shadow=0,"
-        f"Alignment=2'"
-    )
-
-    ffmpeg_cmd = [
+def build_ffmpeg_command(
+    clip_file: str,
+    music_file: str,
+    tts_audio_file: str,
+    output_file: str,
+    duration: float,
+    subtitle_filter: str | None = None,
+    copy_video: bool = False,
+    mixed_audio_file: str | None = None,
+    profile: EncoderProfile = PROFILES["upload"],
+) -> list[str]:
+    # A pre-mixed track is muxed untouched; otherwise loop and mix here
+    if mixed_audio_file:
+        audio_inputs = ["-i", mixed_audio_file]
+        audio_chain = None
+        audio_map = "1:a"
+    else:
+        audio_inputs = [
+            "-stream_loop", "-1", "-i", music_file,
+            "-i", tts_audio_file,
+        ]
+        audio_chain = (
+            f"[1:a]volume={MUSIC_VOLUME}[music];"
+            f"[2:a][music]amix=inputs=2:duration=first:dropout_transition=0:normalize=0[aout]"
+        )
+        audio_map = "[aout]"
+
+    # A pre-looped background with nothing to burn or scale can be
+    # stream-copied
+    video_filter = profile.video_filter(subtitle_filter)
+    if copy_video and not video_filter:
+        video_chain = None
+        video_map = "0:v"
+        video_codec = ["-c:v", "copy"]
+    else:
+        video_chain = f"[0:v]{video_filter or 'null'}[vout]"
+        video_map = "[vout]"
+        video_codec = profile.codec_args()
+
+    chains = [chain for chain in (video_chain, audio_chain) if chain]
+    filter_args = ["-filter_complex", ";".join(chains)] if chains else []
+
+    return [
         "ffmpeg",
         "-y",
-        "-i", temp_video,
-        "-vf", subtitle_filter,
-        "-c:a", "copy",
+        "-stream_loop", "-1", "-i", clip_file,
+        *audio_inputs,
+        *filter_args,
+        "-map", video_map,
+        "-map", audio_map,
+        "-t", f"{duration:.3f}",
+        *video_codec,
+        "-c:a", "aac",
         output_file,
     ]
 
+def render_ffmpeg(
+    clip_file: str,
+    music_file: str,
+    tts_audio_file: str,
+    output_file: str,
+    subtitle_filter: str | None = None,
+    copy_video: bool = False,
+    mixed_audio_file: str | None = None,
+    profile: EncoderProfile = PROFILES["upload"],
+):
+    duration = sf.info(tts_audio_file).duration
+    logger.info("Rendering with ffmpeg filtergraph (%.1fs)", duration)
+
+    ffmpeg_cmd = build_ffmpeg_command(
+        clip_file,
+        music_file,
+        tts_audio_file,
+        output_file,
+        duration,
+        subtitle_filter,
+        copy_video,
+        mixed_audio_file,
+        profile,
+    )
     subprocess.run(ffmpeg_cmd, check=True)
 
-    os.remove(temp_video)
-    os.remove(subtitle_file)
-    logger.info("Removed temp subtitle: %s", subtitle_file)
-
-else:
-    logger.warning("No subtitles found, skipping burn-in")
-    os.rename(temp_video, output_file)
-
-# -------------------------
-# Cleanup temp audio
-# -------------------------
-if os.path.exists(tts_audio_file):
-    os.remove(tts_audio_file)
-    logger.info("Removed temp audio: %s", tts_audio_file)
-
 # -------------------------
-# Done
+# Render
 # -------------------------
-logger.info("Final video ready: %s", output_file)
-print(output_file)
+def render_video(
+    tts_audio_file: str,
+    subtitle_file: str | None = None,
+    single_pass: bool = SINGLE_PASS_RENDER,
+    backend: str = RENDER_BACKEND,
+    preloop: bool = PRELOOP_BACKGROUND,
+    store: ArtifactStore | None = None,
+    cues: list[Cue] | None = None,
+    mix: bool = MIX_AUDIO,
+    assets: AssetRegistry | None = None,
+    profile: str = RENDER_PROFILE,
+) -> str:
+    base_name = os.path.splitext(os.path.basename(tts_audio_file))[0]
+
+    # SRT lives next to wav (temp/)
+    if subtitle_file is None:
+        subtitle_file = os.path.splitext(tts_audio_file)[0] + ".srt"
+
+    # -------------------------
+    # Random assets (only ones that exist and probed cleanly)
+    # -------------------------
+    selection = (assets or get_registry()).choose()
+
+    music_file = selection.music.path
+    clip_file = selection.clip.path
+    subtitle_color = selection.subtitle_color
+
+    # "auto" benchmarks on the chosen clip (once per host)
+    encoder = get_profile(profile, sample_file=clip_file)
+
+    output_file = os.path.join(OUTPUT_DIR, f"{base_name}.mp4")
+
+    # Cues normally come straight from synthesis; the SRT is only
+    # read back when rendering a narration from disk
+    if cues is None and os.path.exists(subtitle_file):
+        cues = read_srt(subtitle_file)
+
+    ass_file = os.path.join(TEMP_DIR, f"{base_name}.ass")
+    subtitle_filter = None
+    if cues:
+        write_ass(cues, ass_file, subtitle_color)
+        subtitle_filter = build_subtitle_filter(ass_file)
+        logger.info(
+            "Burning subtitles | clip=%s | color=%s",
+            clip_file,
+            subtitle_color
+        )
+    else:
+        logger.warning("No subtitles found, skipping burn-in")
+
+    # -------------------------
+    # Artifact store lookup
+    # -------------------------
+    key = None
+    if store is not None:
+        key = store.key(
+            "video",
+            audio=file_digest(tts_audio_file),
+            subtitles=file_digest(ass_file) if subtitle_filter else None,
+            clip=file_identity(clip_file),
+            music=file_identity(music_file),
+            music_volume=MUSIC_VOLUME,
+            font=file_identity(font_path),
+            color=subtitle_color,
+            backend=backend,
+            preloop=preloop,
+            mix=mix_settings() if mix else None,
+            encoder=describe(encoder),
+        )
+
+    if key and store.restore(key, {".mp4": output_file}):
+        logger.info("Reusing stored video for: %s", base_name)
+    else:
+        render_assets(
+            clip_file,
+            music_file,
+            tts_audio_file,
+            output_file,
+            subtitle_filter,
+            single_pass,
+            backend,
+            preloop,
+            mix,
+            encoder,
+        )
+        if key:
+            store.save(key, {".mp4": output_file})
+
+    # -------------------------
+    # Cleanup temp inputs
+    # The artifact store keeps its own copies under its retention
+    # policy; KEEP_TEMP_FILES leaves the temp/ copies in place too.
+    # -------------------------
+    if not KEEP_TEMP_FILES:
+        for temp_subtitle in (subtitle_file, ass_file):
+            if os.path.exists(temp_subtitle):
+                os.remove(temp_subtitle)
+                logger.info("Removed temp subtitle: %s", temp_subtitle)
+
+        if os.path.exists(tts_audio_file):
+            os.remove(tts_audio_file)
+            logger.info("Removed temp audio: %s", tts_audio_file)
+
+    logger.info("Final video ready: %s", output_file)
+    return output_file
+
+def render_assets(
+    clip_file: str,
+    music_file: str,
+    tts_audio_file: str,
+    output_file: str,
+    subtitle_filter: str | None,
+    single_pass: bool,
+    backend: str,
+    preloop: bool,
+    mix: bool = MIX_AUDIO,
+    profile: EncoderProfile = PROFILES["upload"],
+):
+    base_name = os.path.splitext(os.path.basename(output_file))[0]
+
+    # -------------------------
+    # Final audio track (looped, ducked, loudness-normalized)
+    # -------------------------
+    mixed_audio_file = None
+    if mix:
+        mixed_audio_file = mix_audio(
+            tts_audio_file,
+            music_file,
+            os.path.join(TEMP_DIR, f"{base_name}_mix.wav"),
+        )
+
+    # -------------------------
+    # Pre-looped background (stream-copied from the clip cache)
+    # -------------------------
+    # Chunked encoding splits on the background's keyframes, so it
+    # always works from the pre-looped copy
+    background_file = None
+    if preloop or backend == "chunked":
+        background_file = build_looped_background(
+            clip_file,
+            sf.info(tts_audio_file).duration,
+            os.path.join(TEMP_DIR, f"{base_name}_background.mp4"),
+        )
+        clip_file = background_file
+
+    temp_files = [background_file, mixed_audio_file]
+    try:
+        if backend == "ffmpeg":
+            render_ffmpeg(
+                clip_file,
+                music_file,
+                tts_audio_file,
+                output_file,
+                subtitle_filter,
+                copy_video=background_file is not None,
+                mixed_audio_file=mixed_audio_file,
+                profile=profile,
+            )
+        elif backend == "chunked":
+            joined_file = os.path.join(TEMP_DIR, f"{base_name}_video.mp4")
+            temp_files.append(joined_file)
+            render_chunked_video(
+                background_file,
+                joined_file,
+                sf.info(tts_audio_file).duration,
+                subtitle_filter,
+                profile=profile,
+            )
+            # Chunks are already scaled and burned; only mux audio
+            render_ffmpeg(
+                joined_file,
+                music_file,
+                tts_audio_file,
+                output_file,
+                copy_video=True,
+                mixed_audio_file=mixed_audio_file,
+                profile=replace(profile, height=None),
+            )
+        elif backend == "moviepy":
+            render_moviepy(
+                clip_file,
+                music_file,
+                tts_audio_file,
+                output_file,
+                subtitle_filter,
+                single_pass,
+                mixed_audio_file,
+                profile,
+            )
+        else:
+            raise ValueError(f"Unknown render backend: {backend}")
+    finally:
+        for temp_file in temp_files:
+            if temp_file and os.path.exists(temp_file):
+                os.remove(temp_file)
+
+
+if __name__ == "__main__":
+    # -------------------------
+    # Args
+    # -------------------------
+    if len(sys.argv) < 2:
+        logger.error("Usage: python video.py <tts_audio_file>")
+        sys.exit(1)
+
+    print(render_video(sys.argv[1]))
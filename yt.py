@@ -1,8 +1,17 @@
 import sys
 import os
+import json
+import time
+import random
+import hashlib
 import logging
+import threading
+import http.client
+
+import httplib2
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
@@ -20,8 +29,38 @@ SCOPES = ["https://www.googleapis.com/auth/youtube"]
 CLIENT_SECRETS = "client_secret.json"
 TOKEN_FILE = "youtube_token.json"
 
+# Resumable uploads: chunk size must be a multiple of 256 KiB
+UPLOAD_CHUNK_MB = int(os.getenv("YT_UPLOAD_CHUNK_MB", "16"))
+UPLOAD_RETRIES = int(os.getenv("YT_UPLOAD_RETRIES", "8"))
+UPLOAD_BACKOFF_MAX = 64.0
+UPLOAD_SESSION_DIR = os.getenv("YT_UPLOAD_SESSION_DIR") or os.path.join("cache", "uploads")
+
+RETRIABLE_STATUSES = {500, 502, 503, 504}
+# Error reasons that mean "out of quota until the daily reset"
+QUOTA_REASONS = {"quotaExceeded", "dailyLimitExceeded", "uploadLimitExceeded"}
+RETRIABLE_EXCEPTIONS = (
+    httplib2.HttpLib2Error,
+    http.client.HTTPException,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+# Built once per thread (httplib2 connections aren't thread-safe):
+# build() parses the discovery document bundled with the client
+# library, and attached credentials refresh themselves on expiry.
+_clients = threading.local()
+
 
 def get_youtube():
+    youtube = getattr(_clients, "youtube", None)
+    if youtube is None:
+        youtube = build("youtube", "v3", credentials=get_credentials(), static_discovery=True)
+        _clients.youtube = youtube
+    return youtube
+
+
+def get_credentials():
     creds = None
 
     if os.path.exists(TOKEN_FILE):
@@ -43,7 +82,7 @@ def get_youtube():
         with open(TOKEN_FILE, "w") as f:
             f.write(creds.to_json())
 
-    return build("youtube", "v3", credentials=creds)
+    return creds
 
 
 def build_description(experience_url: str | None):
@@ -69,10 +108,144 @@ def build_description(experience_url: str | None):
     return description
 
 
-def upload_video(video_path, title, playlist_id=None, experience_url=None):
-    youtube = get_youtube()
+# -------------------------
+# Upload sessions
+# The resumable session URI for a file is kept on disk until the
+# upload finishes, so a restarted process asks the server how far
+# it got and continues from the last confirmed byte.
+# -------------------------
+def session_path(video_path):
+    stat = os.stat(video_path)
+    raw = f"{os.path.abspath(video_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    name = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(UPLOAD_SESSION_DIR, f"{name}.json")
+
+def load_session(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def save_session(path, session):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(session, f)
+    os.replace(tmp_path, path)
+
+def clear_session(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+def has_session(video_path):
+    return load_session(session_path(video_path)) is not None
+
+
+def is_quota_error(error):
+    if not isinstance(error, HttpError) or error.resp.status != 403:
+        return False
+    try:
+        details = json.loads(error.content.decode("utf-8"))["error"]["errors"]
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return False
+    return any(detail.get("reason") in QUOTA_REASONS for detail in details)
+
+
+def run_resumable_upload(request, video_path, retries=UPLOAD_RETRIES, sleep=time.sleep, on_new_session=None):
+    # on_new_session() runs once for every session the server creates
+    # (what videos.insert is billed for); resuming a saved one is free
+    session_file = session_path(video_path)
+    session = load_session(session_file)
+
+    if session:
+        logger.info("Resuming upload session for %s", video_path)
+        request.resumable_uri = session["uri"]
+        # Makes next_chunk() ask the server for the confirmed range first
+        request._in_error_state = True
+
+    total = request.resumable.size()
+    # Throughput is measured from the first confirmed chunk of this
+    # process, so bytes from an earlier run don't inflate it
+    started = None
+    start_progress = 0
+    failures = 0
+    response = None
+
+    def remember_session():
+        # Saved as soon as the server hands out a URI, even if the
+        # first chunk then failed
+        nonlocal session
+        if request.resumable_uri and not session:
+            session = {"uri": request.resumable_uri, "video_path": os.path.abspath(video_path)}
+            save_session(session_file, session)
+            if on_new_session is not None:
+                on_new_session()
+
+    while response is None:
+        try:
+            status, response = request.next_chunk()
+        except HttpError as e:
+            if e.resp.status in (404, 410) and session:
+                logger.warning("Upload session expired, starting over")
+                clear_session(session_file)
+                session = None
+                request.resumable_uri = None
+                request.resumable_progress = 0
+                request._in_error_state = False
+                continue
+            if e.resp.status not in RETRIABLE_STATUSES:
+                remember_session()
+                raise
+            error = e
+        except RETRIABLE_EXCEPTIONS as e:
+            error = e
+        else:
+            error = None
+            failures = 0
+
+            progress = request.resumable_progress if status else total
+            if started is None:
+                started = time.monotonic()
+                start_progress = progress
+
+            if status:
+                elapsed = max(time.monotonic() - started, 1e-6)
+                rate = (progress - start_progress) / elapsed / (1024 * 1024)
+                logger.info(
+                    "Uploaded %.1f%% (%.1f / %.1f MB, %.2f MB/s)",
+                    status.progress() * 100,
+                    progress / (1024 * 1024),
+                    total / (1024 * 1024),
+                    rate,
+                )
+
+        remember_session()
+
+        if error is not None:
+            failures += 1
+            if failures > retries:
+                raise error
 
-    body = {
+            delay = min(UPLOAD_BACKOFF_MAX, 2 ** failures) * random.uniform(0.5, 1.0)
+            logger.warning(
+                "Upload error (%s), retry %d/%d in %.1fs", error, failures, retries, delay
+            )
+            sleep(delay)
+
+    clear_session(session_file)
+
+    elapsed = max(time.monotonic() - started, 1e-6)
+    logger.info(
+        "Upload finished (%.1f MB, %.2f MB/s)",
+        total / (1024 * 1024),
+        (total - start_progress) / elapsed / (1024 * 1024),
+    )
+    return response
+
+
+def build_video_body(title, experience_url=None):
+    return {
         "snippet": {
             "title": title,
             "description": build_description(experience_url),
@@ -96,9 +269,23 @@ def upload_video(video_path, title, playlist_id=None, experience_url=None):
         }
     }
 
+
+def build_playlist_item(playlist_id, video_id):
+    return {
+        "snippet": {
+            "playlistId": playlist_id,
+            "resourceId": {
+                "kind": "youtube#video",
+                "videoId": video_id,
+            }
+        }
+    }
+
+
+def insert_video(youtube, video_path, title, experience_url=None, on_new_session=None):
     media = MediaFileUpload(
         video_path,
-        chunksize=-1,
+        chunksize=UPLOAD_CHUNK_MB * 1024 * 1024,
         resumable=True,
         mimetype="video/*"
     )
@@ -106,27 +293,25 @@ def upload_video(video_path, title, playlist_id=None, experience_url=None):
     logger.info("Uploading video to YouTube...")
     request = youtube.videos().insert(
         part="snippet,status",
-        body=body,
+        body=build_video_body(title, experience_url),
         media_body=media
     )
 
-    response = request.execute()
+    response = run_resumable_upload(request, video_path, on_new_session=on_new_session)
     video_id = response["id"]
 
     logger.info("Uploaded video ID: %s", video_id)
+    return video_id
+
+
+def upload_video(video_path, title, playlist_id=None, experience_url=None):
+    youtube = get_youtube()
+    video_id = insert_video(youtube, video_path, title, experience_url)
 
     if playlist_id:
         youtube.playlistItems().insert(
             part="snippet",
-            body={
-                "snippet": {
-                    "playlistId": playlist_id,
-                    "resourceId": {
-                        "kind": "youtube#video",
-                        "videoId": video_id,
-                    }
-                }
-            }
+            body=build_playlist_item(playlist_id, video_id)
         ).execute()
 
         logger.info("Added video to playlist: %s", playlist_id)
@@ -134,6 +319,15 @@ def upload_video(video_path, title, playlist_id=None, experience_url=None):
     return video_id
 
 
+def build_title(video_path, substance=None):
+    base_name = os.path.basename(video_path)
+    base_title = os.path.splitext(base_name)[0].replace("_", " ")
+
+    if substance:
+        return f"{base_title} [{substance} Trip Report]"
+    return base_title
+
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print(
@@ -146,13 +340,7 @@ if __name__ == "__main__":
     substance = sys.argv[3] if len(sys.argv) > 3 else None
     experience_url = sys.argv[4] if len(sys.argv) > 4 else None
 
-    base_name = os.path.basename(video_file)
-    base_title = os.path.splitext(base_name)[0].replace("_", " ")
-
-    if substance:
-        title = f"{base_title} [{substance} Trip Report]"
-    else:
-        title = base_title
+    title = build_title(video_file, substance)
 
     upload_video(
         video_file,